@@ -0,0 +1,100 @@
+"""
+INCREMENTAL INDEX AGGREGATOR
+============================
+Running weighted sums per index so one constituent update costs O(1)
+instead of a full pass over the list:
+
+    impact     = sum(change_i * w_i) / 100
+    index PCR  = sum(pcr_i * w_i) / sum(w_i)      (over constituents with a PCR)
+    breadth    = advancers (change > 0) / decliners (change <= 0)
+
+Each update subtracts the constituent's previous contribution and adds the
+new one. Every `recompute_every` updates the sums are rebuilt exactly from
+the stored per-constituent state to bound floating-point drift.
+"""
+
+import threading
+
+RECOMPUTE_EVERY = 1000
+
+
+class IndexAggregator:
+    def __init__(self, name, weights, recompute_every=RECOMPUTE_EVERY):
+        self.name = name
+        self.weights = dict(weights)
+        self.recompute_every = recompute_every
+        self._changes = {}
+        self._pcrs = {}
+        self._impact_sum = 0.0
+        self._pcr_numerator = 0.0
+        self._pcr_denominator = 0.0
+        self._positive = 0
+        self._negative = 0
+        self._updates_since_recompute = 0
+        self._lock = threading.Lock()
+
+    def update(self, symbol, change=None, pcr_ratio=None):
+        """Apply a new change % and/or PCR for one constituent in O(1)"""
+        weight = self.weights.get(symbol)
+        if weight is None:
+            return
+        with self._lock:
+            if change is not None:
+                old = self._changes.get(symbol)
+                if old is not None:
+                    self._impact_sum -= old * weight / 100
+                    if old > 0:
+                        self._positive -= 1
+                    else:
+                        self._negative -= 1
+                self._changes[symbol] = change
+                self._impact_sum += change * weight / 100
+                if change > 0:
+                    self._positive += 1
+                else:
+                    self._negative += 1
+
+            if pcr_ratio is not None:
+                old = self._pcrs.get(symbol)
+                if old is not None:
+                    self._pcr_numerator -= old * weight
+                else:
+                    self._pcr_denominator += weight
+                self._pcrs[symbol] = pcr_ratio
+                self._pcr_numerator += pcr_ratio * weight
+
+            self._updates_since_recompute += 1
+            if self._updates_since_recompute >= self.recompute_every:
+                self._recompute_locked()
+
+    def on_tick(self, tick):
+        self.update(tick.get('symbol'), tick.get('change'), tick.get('pcr_ratio'))
+
+    def recompute(self):
+        """Rebuild the running sums exactly from per-constituent state"""
+        with self._lock:
+            self._recompute_locked()
+
+    def _recompute_locked(self):
+        self._impact_sum = sum(c * self.weights[s] / 100 for s, c in self._changes.items())
+        self._positive = sum(1 for c in self._changes.values() if c > 0)
+        self._negative = len(self._changes) - self._positive
+        self._pcr_numerator = sum(p * self.weights[s] for s, p in self._pcrs.items())
+        self._pcr_denominator = sum(self.weights[s] for s in self._pcrs)
+        self._updates_since_recompute = 0
+
+    def impact(self):
+        """Same shape as calculate_impact()"""
+        total_impact = self._impact_sum
+        return {
+            'total_impact': total_impact,
+            'positive_count': self._positive,
+            'negative_count': self._negative,
+            'sentiment': 'Bullish' if total_impact > 0.5 else 'Bearish' if total_impact < -0.5 else 'Neutral'
+        }
+
+    def pcr(self):
+        """Same result as calculate_index_pcr()"""
+        if self._pcr_denominator > 0:
+            return round(self._pcr_numerator / self._pcr_denominator, 2)
+        return 1.0
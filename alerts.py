@@ -0,0 +1,391 @@
+"""
+ALERT RULES
+===========
+Rules on tick and snapshot fields, checked as updates arrive:
+
+    above / below   value crosses a threshold upwards / downwards
+    outside         value leaves a [low, high] band (e.g. PCR 0.7-1.3)
+    change          value changes (e.g. sentiment Bullish -> Neutral)
+    spike           value moves by at least `value` % between two updates
+                    (e.g. an OI spike)
+
+Rules are indexed by (symbol, field), so an update only touches the rules
+for the fields it carries. Threshold rules are kept sorted per key: a move
+from `previous` to `current` fires exactly the thresholds in between, found
+with two bisects, so thousands of price levels cost a few microseconds.
+
+Fired alerts go on a bounded queue and a background thread delivers them to
+the sinks (a webhook, or MemorySink as a local stand-in), so evaluation
+never waits on the network.
+
+With a JSON file the rules are shared by every worker on the host: adds and
+deletes are read-modify-write under an flock on <path>.lock, ids are
+allocated from the file, and each process reloads the file when it has been
+replaced, so a rule added through any worker is evaluated by the producer.
+"""
+
+import bisect
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; rule changes are only serialized within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ABOVE = 'above'
+BELOW = 'below'
+OUTSIDE = 'outside'
+CHANGE = 'change'
+SPIKE = 'spike'
+OPS = (ABOVE, BELOW, OUTSIDE, CHANGE, SPIKE)
+
+ALERT_COOLDOWN = 60.0     # seconds before the same rule can fire again
+QUEUE_SIZE = 1000
+RECENT_ALERTS = 100
+
+
+class _KeyRules:
+    """Rules for one (symbol, field): sorted thresholds per direction, the rest in a list"""
+
+    __slots__ = ('above_levels', 'above_rules', 'below_levels', 'below_rules', 'other')
+
+    def __init__(self):
+        self.above_levels, self.above_rules = [], []
+        self.below_levels, self.below_rules = [], []
+        self.other = []
+
+    def add(self, rule):
+        if rule['op'] in (ABOVE, BELOW):
+            levels, rules = (self.above_levels, self.above_rules) if rule['op'] == ABOVE else (self.below_levels, self.below_rules)
+            i = bisect.bisect_right(levels, rule['value'])
+            levels.insert(i, rule['value'])
+            rules.insert(i, rule)
+        else:
+            self.other.append(rule)
+
+    def remove(self, rule_id):
+        for levels, rules in ((self.above_levels, self.above_rules), (self.below_levels, self.below_rules)):
+            for i, rule in enumerate(rules):
+                if rule['id'] == rule_id:
+                    del levels[i], rules[i]
+                    return
+        self.other = [r for r in self.other if r['id'] != rule_id]
+
+    def __len__(self):
+        return len(self.above_rules) + len(self.below_rules) + len(self.other)
+
+    def matches(self, previous, current):
+        """Rules triggered by a move from previous to current"""
+        if previous is None or previous == current:
+            return []
+        fired = []
+        numeric = isinstance(current, (int, float)) and isinstance(previous, (int, float))
+        if numeric and current > previous and self.above_levels:
+            # previous < level <= current
+            fired.extend(self.above_rules[bisect.bisect_right(self.above_levels, previous):
+                                          bisect.bisect_right(self.above_levels, current)])
+        elif numeric and current < previous and self.below_levels:
+            # current <= level < previous
+            fired.extend(self.below_rules[bisect.bisect_left(self.below_levels, current):
+                                          bisect.bisect_left(self.below_levels, previous)])
+        for rule in self.other:
+            op = rule['op']
+            if op == CHANGE:
+                fired.append(rule)
+            elif not numeric:
+                continue
+            elif op == OUTSIDE:
+                inside = lambda v: rule['low'] <= v <= rule['high']
+                if inside(previous) and not inside(current):
+                    fired.append(rule)
+            elif op == SPIKE and previous and abs(current / previous - 1) * 100 >= rule['value']:
+                fired.append(rule)
+        return fired
+
+
+def _number(rule, name):
+    if rule.get(name) is None:
+        raise ValueError(f"missing field '{name}'")
+    try:
+        return float(rule[name])
+    except (TypeError, ValueError):
+        raise ValueError(f"field '{name}' must be a number")
+
+
+def validate_rule(rule):
+    """Normalized copy of a rule dict; raises ValueError when it is incomplete"""
+    if not isinstance(rule, dict):
+        raise ValueError("rule must be an object")
+    op = rule.get('op')
+    if op not in OPS:
+        raise ValueError(f"op must be one of {list(OPS)}")
+    if not rule.get('symbol') or not rule.get('field'):
+        raise ValueError("symbol and field are required")
+    clean = {'symbol': str(rule['symbol']).upper(), 'field': str(rule['field']), 'op': op,
+             'cooldown': _number(rule, 'cooldown') if 'cooldown' in rule else ALERT_COOLDOWN}
+    if op == OUTSIDE:
+        clean['low'], clean['high'] = _number(rule, 'low'), _number(rule, 'high')
+        if clean['low'] > clean['high']:
+            raise ValueError("low must not exceed high")
+    elif op != CHANGE:
+        clean['value'] = _number(rule, 'value')
+    if rule.get('note'):
+        clean['note'] = str(rule['note'])
+    return clean
+
+
+class AlertEngine:
+    """Indexed rules, optionally persisted to a JSON list shared by every worker"""
+
+    def __init__(self, dispatcher=None, path=None):
+        self.dispatcher = dispatcher
+        self.path = path
+        self._index = {}
+        self._rules = {}
+        self._last = {}
+        self._last_fired = {}
+        self._file_id = None
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=RECENT_ALERTS)
+        self.evaluated = 0
+        self.load()
+
+    def add(self, rule):
+        """Add a rule dict ({'symbol', 'field', 'op', 'value' | 'low'/'high', 'cooldown'?}); returns it with its id"""
+        rule = validate_rule(rule)
+        with self._file_lock():
+            self.reload()
+            with self._lock:
+                rule['id'] = max(self._rules, default=0) + 1
+                self._rules[rule['id']] = rule
+                self._index.setdefault((rule['symbol'], rule['field']), _KeyRules()).add(rule)
+            self.save()
+        return rule
+
+    def remove(self, rule_id):
+        with self._file_lock():
+            self.reload()
+            with self._lock:
+                rule = self._rules.pop(rule_id, None)
+                if rule is None:
+                    return False
+                key = (rule['symbol'], rule['field'])
+                self._index[key].remove(rule_id)
+                if not self._index[key]:
+                    del self._index[key]
+                self._last_fired.pop(rule_id, None)
+            self.save()
+        return True
+
+    def rules(self):
+        self.reload()
+        return list(self._rules.values())
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize read-modify-write of the file across worker processes"""
+        if not self.path or fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stat(self):
+        # saves replace the file, so a new inode means another process wrote it
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def reload(self):
+        """Adopt the file if another process replaced it since this one last read or wrote it"""
+        if self.path and self._stat() != self._file_id:
+            self.load()
+
+    def load(self):
+        """Rules from the file; rules stored without an id are numbered after the highest one, in file order"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        file_id = self._stat()
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+            if not isinstance(stored, list):
+                raise ValueError("expected a JSON list of rules")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load alert rules from {self.path}: {e}")
+            return
+        rules, unnumbered = {}, []
+        for stored_rule in stored:
+            try:
+                rule = validate_rule(stored_rule)
+            except ValueError as e:
+                logger.warning(f"⚠️ Skipping stored alert rule {stored_rule}: {e}")
+                continue
+            rule_id = stored_rule.get('id')
+            if isinstance(rule_id, int) and rule_id > 0 and rule_id not in rules:
+                rule['id'] = rule_id
+                rules[rule_id] = rule
+            else:
+                unnumbered.append(rule)
+        for rule in unnumbered:
+            rule['id'] = max(rules, default=0) + 1
+            rules[rule['id']] = rule
+        index = {}
+        for rule in rules.values():
+            index.setdefault((rule['symbol'], rule['field']), _KeyRules()).add(rule)
+        with self._lock:
+            self._rules, self._index, self._file_id = rules, index, file_id
+            # last values are kept, so a reload does not miss or repeat a crossing
+            self._last_fired = {i: t for i, t in self._last_fired.items() if i in rules}
+        logger.info(f"🔔 Loaded {len(rules)} alert rules")
+
+    def save(self):
+        if not self.path:
+            return
+        # written under the lock through a temp file of its own, so concurrent saves cannot interleave
+        with self._lock:
+            stored = sorted(self._rules.values(), key=lambda rule: rule['id'])
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                                prefix='.alert-rules-', suffix='.tmp')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(stored, f)
+                os.replace(tmp_path, self.path)
+                self._file_id = self._stat()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not save alert rules to {self.path}: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def on_tick(self, tick):
+        """Check one update ({'symbol', field: value, ...}) against the rules of its fields"""
+        symbol = tick.get('symbol')
+        for field, value in tick.items():
+            key = (symbol, field)
+            key_rules = self._index.get(key)
+            if key_rules is None or value is None:
+                continue
+            previous = self._last.get(key)
+            self._last[key] = value
+            self.evaluated += 1
+            for rule in key_rules.matches(previous, value):
+                self._fire(rule, previous, value, tick.get('ts'))
+
+    def on_snapshot(self, market_data):
+        """Index-level fields of a snapshot as updates for NIFTY and BANKNIFTY"""
+        for name, prefix in (('NIFTY', 'nifty'), ('BANKNIFTY', 'bank')):
+            impact = market_data.get(f"{prefix}_impact") or {}
+            self.on_tick({
+                'symbol': name,
+                'pcr': market_data.get(f"{prefix}_pcr"),
+                'sentiment': impact.get('sentiment'),
+                'total_impact': impact.get('total_impact'),
+                'spot': market_data.get(f"{name.lower()}_spot"),
+                'ts': market_data.get('fetched_at')
+            })
+
+    def _fire(self, rule, previous, value, ts):
+        now = time.time()
+        if now - self._last_fired.get(rule['id'], 0) < rule['cooldown']:
+            return
+        self._last_fired[rule['id']] = now
+        alert = {
+            'rule_id': rule['id'],
+            'symbol': rule['symbol'],
+            'field': rule['field'],
+            'op': rule['op'],
+            'previous': previous,
+            'value': value,
+            'rule': {k: rule[k] for k in ('value', 'low', 'high', 'note') if k in rule},
+            'ts': ts or now
+        }
+        self.recent.append(alert)
+        logger.info(f"🔔 Alert {rule['id']}: {rule['symbol']} {rule['field']} {rule['op']} ({previous} -> {value})")
+        if self.dispatcher is not None:
+            self.dispatcher.submit(alert)
+
+
+class AlertDispatcher:
+    """Delivers alerts to sinks from a background thread (started on first use in each process)"""
+
+    def __init__(self, sinks, max_queue=QUEUE_SIZE):
+        self.sinks = list(sinks)
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, alert):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"⚠️ Alert queue full, dropped alert for rule {alert['rule_id']}")
+
+    def _ensure_worker(self):
+        # threads do not survive a fork, so each worker process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                threading.Thread(target=self._run, name='alert-dispatcher', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            alert = self._queue.get()
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    logger.warning(f"⚠️ Alert sink {type(sink).__name__} failed: {e}")
+            self._queue.task_done()
+
+    def flush(self, timeout=5.0):
+        """Wait until queued alerts are delivered (for tests and shutdown)"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+
+class WebhookSink:
+    """POSTs each alert as JSON"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        response = requests.post(self.url, json=alert, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class MemorySink:
+    """Keeps delivered alerts in memory; a local stand-in for the webhook"""
+
+    def __init__(self, maxlen=RECENT_ALERTS):
+        self.alerts = deque(maxlen=maxlen)
+
+    def send(self, alert):
+        self.alerts.append(alert)
@@ -0,0 +1,464 @@
+"""
+ANGEL ONE REST CLIENT
+=====================
+Synchronous SmartAPI client shared by the web and mobile dashboards.
+
+Every upstream call goes through its endpoint's circuit breaker and is clamped
+to the current request deadline. Calls are sharded across the credential pool
+(see credentials.py): each symbol or batch goes to a healthy credential with
+a rate-limit token, its owner on a consistent-hash ring when possible. Logins
+are per credential and coalesced (across gunicorn workers when
+SINGLEFLIGHT_LOCK_DIR is set); sessions are kept for the life of the process,
+re-logging in only when a token is missing, expired or old.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import pyotp
+import requests
+
+from angel_config import (
+    CREDENTIALS, SYMBOL_TOKENS, INDEX_TOKENS,
+    BASE_URL, LOGIN_URL, LTP_URL, CANDLE_URL, OI_DATA_URL, GAINERS_LOSERS_URL, OPTION_GREEK_URL, QUOTE_URL,
+    login_headers, auth_headers
+)
+from circuit_breaker import CircuitOpenError, get_breaker
+from credentials import CredentialPool
+from deadline import call_timeout, run_parallel
+from endpoint_health import get_health
+from market_calendar import candle_range, last_session_day, previous_trading_day
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+TOKEN_MAX_AGE = 6 * 3600        # re-login after this many seconds
+LOGIN_RETRY_SECONDS = 30        # minimum gap between failed login attempts
+QUOTE_BATCH = 50                # tokens per market quote call (API limit)
+
+# Concurrent cold-path fetches share one upstream call
+login_flight = SingleFlight(lock_dir=os.getenv('SINGLEFLIGHT_LOCK_DIR'))
+upstream_flight = SingleFlight()
+
+
+def upstream_post(endpoint, url, payload, headers, credential, timeout=10):
+    """POST to Angel One on a credential's connections, through the endpoint's circuit breaker, within the request deadline"""
+    call_budget = call_timeout(timeout)
+    breaker = get_breaker(endpoint)
+    if not breaker.allow_request():
+        raise CircuitOpenError(endpoint)
+
+    health = get_health(endpoint)
+    started = time.time()
+    try:
+        response = credential.http_session().post(url, json=payload, headers=headers, timeout=call_budget)
+    except requests.Timeout as e:
+        health.record_failure(e, time.time() - started)
+        # Running out of our own budget says nothing about upstream health
+        if call_budget < timeout:
+            breaker.release()
+        else:
+            breaker.record_failure()
+        raise
+    except Exception as e:
+        health.record_failure(e, time.time() - started)
+        breaker.record_failure()
+        raise
+
+    # Server errors count against the breaker, client errors do not; a 429 is one
+    # account's throttle, which takes that credential out of rotation instead
+    elapsed = time.time() - started
+    credential.check_response(response)
+    if response.status_code >= 500:
+        health.record_failure(f"HTTP {response.status_code}", elapsed)
+        breaker.record_failure()
+    elif response.status_code == 429:
+        health.record_failure(f"HTTP 429 ({credential.name})", elapsed)
+        breaker.release()
+    else:
+        health.record_success(elapsed)
+        breaker.record_success(elapsed)
+    return response
+
+
+def extract_base_symbol(trading_symbol):
+    """Extract base symbol from futures/options trading symbol"""
+    # Examples: HDFCBANK25JAN24FUT -> HDFCBANK, RELIANCE25JAN24CE -> RELIANCE
+    base_symbol = re.sub(r'\d{2}[A-Z]{3}\d{2}(FUT|CE|PE)$', '', trading_symbol)
+    base_symbol = re.sub(r'(FUT|CE|PE)$', '', base_symbol)
+    return base_symbol if base_symbol else None
+
+
+class AngelClient:
+    def __init__(self, on_candles=None, instruments=None, credentials=None):
+        self.credentials = CredentialPool(credentials or CREDENTIALS)
+        # Called with (symbol, candles) for every candle response, e.g. to extend bars
+        self.on_candles = on_candles
+        # Optional InstrumentMaster; the built-in SYMBOL_TOKENS are the fallback
+        self.instruments = instruments
+        # Previous session's closing OI per NFO token, loaded in the background once per day
+        self._previous_oi = {}
+        self._previous_oi_day = None
+        self._previous_oi_loading = False
+        self._previous_oi_lock = threading.Lock()
+
+    @property
+    def authenticated(self):
+        """True while at least one credential has a session"""
+        return any(c.authenticated for c in self.credentials)
+
+    @property
+    def logged_in_at(self):
+        return max(c.logged_in_at for c in self.credentials)
+
+    @property
+    def last_login_attempt(self):
+        return max(c.last_login_attempt for c in self.credentials)
+
+    def ensure_session(self):
+        """Log in every credential without a usable token (failed attempts are retried every LOGIN_RETRY_SECONDS)"""
+        now = time.time()
+        due = [
+            c for c in self.credentials
+            if not (c.authenticated and now - c.logged_in_at < TOKEN_MAX_AGE)
+            and now - c.last_login_attempt >= LOGIN_RETRY_SECONDS
+        ]
+        if len(due) == 1:
+            self.try_login(due[0])
+        elif due:
+            run_parallel(self.try_login, due)
+        return bool(self.credentials.healthy())
+
+    def try_login(self, credential):
+        """Try to authenticate one credential with Angel One API (concurrent logins share one call)"""
+        credential.last_login_attempt = time.time()
+        try:
+            auth_token = login_flight.do(f"login:{credential.name}", self.request_login_token, credential)
+        except Exception as e:
+            logger.warning(f"⚠️ Angel One connection failed for {credential.name}: {e}")
+            auth_token = None
+        if auth_token is not None:
+            credential.auth_token = auth_token
+            credential.logged_in_at = time.time()
+        return credential.authenticated
+
+    def request_login_token(self, credential):
+        """Log in one credential with Angel One and return the JWT (None on failure)"""
+        try:
+            login_data = {
+                "clientcode": credential.username,
+                "password": credential.password,
+                "totp": pyotp.TOTP(credential.totp_token).now()
+            }
+            response = upstream_post('login', LOGIN_URL, payload=login_data, headers=login_headers(credential.api_key),
+                                     credential=credential, timeout=10)
+
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('status'):
+                    logger.info(f"✅ Angel One login successful ({credential.name})")
+                    return data['data']['jwtToken']
+
+            logger.warning(f"⚠️ Angel One login failed ({credential.name})")
+            return None
+        except CircuitOpenError:
+            logger.warning("⚡ Angel One login skipped, circuit open")
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Angel One connection failed: {e}")
+            return None
+
+    def open_pool(self):
+        """Open a keep-alive connection per credential so the first real calls skip the TLS handshake"""
+        for credential in self.credentials:
+            credential.http_session().head(BASE_URL, timeout=5)
+
+    def post(self, endpoint, url, payload, key, timeout=10):
+        """Authenticated POST for `key` (a symbol or batch) on the credential the pool picks for it"""
+        credential = self.credentials.acquire(key, endpoint, call_timeout(timeout))
+        headers = auth_headers(credential.auth_token, credential.api_key)
+        return upstream_post(endpoint, url, payload, headers, credential=credential, timeout=timeout)
+
+    def get_symbol_token(self, symbol):
+        """Symbol token for API calls"""
+        token = (self.instruments.token(symbol) if self.instruments else None) or SYMBOL_TOKENS.get(symbol)
+        logger.debug(f"🔍 Symbol token for {symbol}: {token}")
+        return token
+
+    def fetch_quote(self, symbol, symbol_token=None):
+        """LTP for one symbol from the quote API (None if unavailable)"""
+        quote_request = {
+            "exchange": "NSE",
+            "tradingsymbol": symbol,
+            "symboltoken": symbol_token or self.get_symbol_token(symbol)
+        }
+        quote_response = self.post('ltp', LTP_URL, quote_request, key=symbol)
+
+        if quote_response.status_code != 200:
+            logger.warning(f"⚠️ Quote API failed for {symbol}: {quote_response.status_code} - {quote_response.text[:200]}")
+            return None
+
+        quote_result = quote_response.json()
+        if not (quote_result.get('status') and quote_result.get('data')):
+            logger.warning(f"⚠️ Quote API returned no data for {symbol}: {quote_result}")
+            return None
+
+        return float(quote_result['data']['ltp'])
+
+    def get_index_spots(self):
+        """Live NIFTY / BANKNIFTY levels from the index tokens"""
+        if not self.authenticated:
+            return {}
+
+        def fetch_index(name):
+            index = INDEX_TOKENS[name]
+            return upstream_flight.do(f"ltp:{name}", self.fetch_quote, index['tradingsymbol'], index['token'])
+
+        spots, missed = run_parallel(fetch_index, list(INDEX_TOKENS))
+        if missed:
+            logger.warning(f"⏱️ No live index level for {missed}")
+        return spots
+
+    def get_live_equity_prices(self, symbols):
+        """Latest 1-minute close per symbol from candleData, fetched in parallel within the deadline"""
+        if not self.authenticated:
+            return {}
+
+        try:
+            # Candle window from the last two trading sessions (handles weekends and holidays)
+            fromdate, todate = candle_range()
+
+            def fetch_symbol(symbol):
+                # Concurrent requests for the same symbol share one candle call
+                candles = upstream_flight.do(
+                    f"candle:{symbol}", self.fetch_candles, symbol, fromdate, todate
+                )
+                return float(candles[-1][4]) if candles else None
+
+            live_prices, missed = run_parallel(fetch_symbol, symbols)
+            if missed:
+                logger.warning(f"⏱️ No fresh price for {len(missed)} symbols: {missed}")
+
+            logger.info(f"📈 Successfully fetched live prices for {len(live_prices)} symbols")
+            return live_prices
+
+        except Exception as e:
+            logger.error(f"❌ Live equity prices fetch failed: {str(e)}")
+            return {}
+
+    def fetch_candles(self, symbol, fromdate=None, todate=None):
+        """1-minute candles [timestamp, open, high, low, close, volume] for one symbol (None if unavailable)"""
+        symbol_token = self.get_symbol_token(symbol)
+        if not symbol_token:
+            logger.warning(f"⚠️ No symbol token found for {symbol}")
+            return None
+        if fromdate is None or todate is None:
+            fromdate, todate = candle_range()
+
+        candle_request = {
+            "exchange": "NSE",
+            "symboltoken": symbol_token,
+            "interval": "ONE_MINUTE",
+            "fromdate": fromdate.strftime("%Y-%m-%d %H:%M"),
+            "todate": todate.strftime("%Y-%m-%d %H:%M")
+        }
+        candle_response = self.post('candles', CANDLE_URL, candle_request, key=symbol)
+
+        if candle_response.status_code != 200:
+            logger.warning(f"⚠️ Candle API failed for {symbol}: {candle_response.status_code} - {candle_response.text[:200]}")
+            return None
+
+        try:
+            candle_result = candle_response.json()
+        except Exception as candle_json_error:
+            logger.error(f"❌ Candle JSON parse error for {symbol}: {str(candle_json_error)}, Response: {candle_response.text[:200]}")
+            return None
+
+        if not (candle_result.get('status') and candle_result.get('data')):
+            logger.warning(f"⚠️ Candle API returned no data for {symbol}: {candle_result}")
+            return None
+
+        candles = candle_result['data']
+        if self.on_candles is not None:
+            try:
+                self.on_candles(symbol, candles)
+            except Exception as e:
+                logger.warning(f"⚠️ Candle consumer failed for {symbol}: {e}")
+        return candles
+
+    def get_oi_movers(self, symbols=None):
+        """Change % and OI change per underlying from the near-expiry OI gainers/losers lists"""
+        if not self.authenticated:
+            return {}
+
+        def fetch_list(datatype):
+            response = self.post('gainers_losers', GAINERS_LOSERS_URL,
+                                 {"datatype": datatype, "expirytype": "NEAR"}, key=datatype)
+            if response.status_code != 200:
+                return None
+            result = response.json()
+            return (result.get('data') or []) if result.get('status') else None
+
+        lists, missed = run_parallel(fetch_list, ['PercOIGainers', 'PercOILosers'])
+        if missed:
+            logger.warning(f"⏱️ OI movers incomplete, missed {missed}")
+
+        movers = {}
+        for items in lists.values():
+            for item in items:
+                base_symbol = extract_base_symbol(item.get('tradingSymbol', '').upper())
+                if not base_symbol or base_symbol in movers or (symbols is not None and base_symbol not in symbols):
+                    continue
+                movers[base_symbol] = {
+                    'change': item.get('percentChange', 0),
+                    'oi_change': item.get('netChangeOpnInterest', 0)
+                }
+        return movers
+
+    def get_option_greeks(self, name, expirydate):
+        """Strike-wise greeks and IV for an underlying and expiry (DDMMMYYYY), [] if unavailable"""
+        if not self.authenticated:
+            return []
+        response = self.post('option_greeks', OPTION_GREEK_URL,
+                             {"name": name, "expirydate": expirydate}, key=f"{name}:{expirydate}")
+        if response.status_code != 200:
+            logger.warning(f"⚠️ Option greeks failed for {name}: {response.status_code}")
+            return []
+        result = response.json()
+        return (result.get('data') or []) if result.get('status') else []
+
+    def get_market_quotes(self, tokens_by_exchange, mode='FULL'):
+        """{(exchange, token): quote} from the market quote API, QUOTE_BATCH tokens per call in parallel"""
+        if not self.authenticated:
+            return {}
+        batches = [
+            (exchange, tuple(tokens[i:i + QUOTE_BATCH]))
+            for exchange, tokens in tokens_by_exchange.items()
+            for i in range(0, len(tokens), QUOTE_BATCH)
+        ]
+
+        def fetch_batch(batch):
+            exchange, tokens = batch
+            response = self.post('quote', QUOTE_URL,
+                                 {"mode": mode, "exchangeTokens": {exchange: list(tokens)}}, key=f"{exchange}:{tokens[0]}")
+            if response.status_code != 200:
+                return None
+            result = response.json()
+            return (result.get('data') or {}).get('fetched') if result.get('status') else None
+
+        fetched, missed = run_parallel(fetch_batch, batches)
+        if missed:
+            logger.warning(f"⏱️ {len(missed)}/{len(batches)} quote batches missed")
+        return {
+            (item.get('exchange'), str(item.get('symbolToken'))): item
+            for items in fetched.values() for item in items
+        }
+
+    def get_futures_quotes(self, underlyings):
+        """Near-month futures price, change % and OI per underlying from batched market quotes"""
+        if not (self.instruments and self.instruments.loaded):
+            return {}
+        contracts = {}
+        for underlying in underlyings:
+            contract = self.instruments.near_future(underlying)
+            if contract is not None:
+                contracts[underlying] = contract
+        quotes = self.get_market_quotes({'NFO': [c.token for c in contracts.values()]})
+        previous_oi = self.get_previous_oi([c.token for c in contracts.values()])
+        futures = {}
+        for underlying, contract in contracts.items():
+            quote = quotes.get(('NFO', contract.token))
+            if quote and quote.get('ltp'):
+                futures[underlying] = {
+                    'price': float(quote['ltp']),
+                    'change': float(quote.get('percentChange') or 0),
+                    'oi': int(quote.get('opnInterest') or 0),
+                    'prev_oi': previous_oi.get(contract.token)
+                }
+        return futures
+
+    def get_previous_oi(self, tokens):
+        """Previous session's closing OI per NFO token, from the cache only (missing ones load in the background)
+
+        Quotes carry no prior-day OI, so build-up percentages would otherwise be
+        measured from the first OI this process saw. The historical OI lookups
+        are paced by the rate limiter in one background thread per process,
+        off the refresh path.
+        """
+        day = previous_trading_day(last_session_day())
+        with self._previous_oi_lock:
+            if day != self._previous_oi_day:
+                self._previous_oi, self._previous_oi_day = {}, day
+            missing = [t for t in tokens if t not in self._previous_oi]
+            if missing and self.authenticated and not self._previous_oi_loading:
+                self._previous_oi_loading = True
+                threading.Thread(target=self._load_previous_oi, args=(missing, day),
+                                 name='previous-oi', daemon=True).start()
+            return {t: self._previous_oi[t] for t in tokens if self._previous_oi.get(t)}
+
+    def _load_previous_oi(self, tokens, day):
+        loaded = 0
+        try:
+            for token in tokens:
+                try:
+                    oi = self.fetch_previous_oi(token, day)
+                except Exception as e:
+                    # retried when the next refresh asks again
+                    logger.debug(f"Previous OI lookup failed for {token}: {e}")
+                    continue
+                with self._previous_oi_lock:
+                    if day != self._previous_oi_day:
+                        return
+                    # None (no history) is cached too, so it is not asked for again today
+                    self._previous_oi[token] = oi
+                loaded += oi is not None
+        finally:
+            self._previous_oi_loading = False
+            logger.info(f"📚 Loaded previous-session OI for {loaded}/{len(tokens)} futures contracts")
+
+    def fetch_previous_oi(self, token, day):
+        """Closing OI of one NFO contract on `day` (None if it has no history); raises on HTTP errors"""
+        oi_request = {
+            "exchange": "NFO",
+            "symboltoken": token,
+            "interval": "ONE_DAY",
+            "fromdate": f"{day:%Y-%m-%d} 09:15",
+            "todate": f"{day:%Y-%m-%d} 15:30"
+        }
+        response = self.post('oi_history', OI_DATA_URL, oi_request, key=token)
+        response.raise_for_status()
+        result = response.json()
+        data = (result.get('data') or []) if result.get('status') else []
+        return int(data[-1]['oi']) if data and data[-1].get('oi') else None
+
+    def get_option_chain(self, name, expiry):
+        """Spot plus call/put LTP, OI and volume per strike for one expiry (DDMMMYYYY), None if unavailable"""
+        if not (self.instruments and self.instruments.loaded):
+            return None
+        expiry_date = datetime.strptime(expiry, '%d%b%Y').date()
+        contracts = [c for c in self.instruments.contracts(name, expiry_date) if c.option_type != 'FUT']
+        spot_token = INDEX_TOKENS[name]['token'] if name in INDEX_TOKENS else self.get_symbol_token(name)
+        if not contracts or not spot_token:
+            return None
+
+        quotes = self.get_market_quotes({'NSE': [spot_token], 'NFO': [c.token for c in contracts]})
+        spot = (quotes.get(('NSE', spot_token)) or {}).get('ltp')
+        if not spot:
+            return None
+        strikes = {}
+        for contract in contracts:
+            quote = quotes.get(('NFO', contract.token))
+            if quote is None:
+                continue
+            side = 'call' if contract.option_type == 'CE' else 'put'
+            row = strikes.setdefault(contract.strike, {'strike': contract.strike})
+            row[f"{side}_ltp"] = float(quote.get('ltp') or 0)
+            row[f"{side}_oi"] = int(quote.get('opnInterest') or 0)
+            row[f"{side}_volume"] = int(quote.get('tradeVolume') or 0)
+        if not strikes:
+            return None
+        return {'symbol': name, 'expiry': expiry, 'spot': float(spot), 'rows': [strikes[k] for k in sorted(strikes)]}
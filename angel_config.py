@@ -0,0 +1,87 @@
+"""
+ANGEL ONE SHARED CONFIGURATION
+==============================
+Credentials, endpoints and symbol tokens shared by the web and mobile clients
+"""
+
+import json
+import os
+
+# Configuration from environment variables
+API_KEY = os.getenv('ANGEL_API_KEY', 'tKo2xsA5')
+USERNAME = os.getenv('ANGEL_USERNAME', 'C125633')
+PASSWORD = os.getenv('ANGEL_PASSWORD', '4111')
+TOTP_TOKEN = os.getenv('ANGEL_TOTP_TOKEN', 'TZZ2VTRBUWPB33SLOSA3NXSGWA')
+
+
+def load_credentials():
+    """API credentials to shard upstream calls across
+
+    ANGEL_CREDENTIALS is a JSON list (or the path of a JSON file with one) of
+    {"api_key", "username", "password", "totp_token"}; without it the single
+    pair above is the whole pool.
+    """
+    raw = os.getenv('ANGEL_CREDENTIALS', '').strip()
+    if not raw:
+        return [{'api_key': API_KEY, 'username': USERNAME, 'password': PASSWORD, 'totp_token': TOTP_TOKEN}]
+    if not raw.startswith('['):
+        with open(raw) as f:
+            raw = f.read()
+    return json.loads(raw)
+
+
+CREDENTIALS = load_credentials()
+
+# Angel One REST endpoints
+BASE_URL = "https://apiconnect.angelone.in"
+LOGIN_URL = f"{BASE_URL}/rest/auth/angelbroking/user/v1/loginByPassword"
+LTP_URL = f"{BASE_URL}/rest/secure/angelbroking/order/v1/getLTP"
+CANDLE_URL = f"{BASE_URL}/rest/secure/angelbroking/historical/v1/getCandleData"
+OI_DATA_URL = f"{BASE_URL}/rest/secure/angelbroking/historical/v1/getOIData"
+GAINERS_LOSERS_URL = f"{BASE_URL}/rest/secure/angelbroking/marketData/v1/gainersLosers"
+OPTION_GREEK_URL = f"{BASE_URL}/rest/secure/angelbroking/marketData/v1/optionGreek"
+QUOTE_URL = f"{BASE_URL}/rest/secure/angelbroking/market/v1/quote/"
+
+# NSE equity symbol tokens
+SYMBOL_TOKENS = {
+    'RELIANCE': '2885',      # Reliance Industries
+    'HDFCBANK': '1333',      # HDFC Bank
+    'TCS': '11536',          # Tata Consultancy Services
+    'BHARTIARTL': '10604',   # Bharti Airtel
+    'ICICIBANK': '4963',     # ICICI Bank
+    'SBIN': '3045',          # State Bank of India
+    'BAJFINANCE': '16675',   # Bajaj Finance
+    'INFY': '1594',          # Infosys
+    'HINDUNILVR': '13611',   # Hindustan Unilever
+    'ITC': '424',            # ITC
+    'KOTAKBANK': '1922',     # Kotak Mahindra Bank
+    'AXISBANK': '5900',      # Axis Bank
+    'BANKBARODA': '4668'     # Bank of Baroda
+}
+
+# NSE index tokens (LTP/candle calls use these like any equity token)
+INDEX_TOKENS = {
+    'NIFTY': {'tradingsymbol': 'Nifty 50', 'token': '99926000'},
+    'BANKNIFTY': {'tradingsymbol': 'Nifty Bank', 'token': '99926009'}
+}
+
+
+def login_headers(api_key=API_KEY):
+    """Headers for the login call"""
+    return {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json',
+        'X-UserType': 'USER',
+        'X-SourceID': 'WEB',
+        'X-ClientLocalIP': '192.168.1.1',
+        'X-ClientPublicIP': '192.168.1.1',
+        'X-MACAddress': '00:00:00:00:00:00',
+        'X-PrivateKey': api_key
+    }
+
+
+def auth_headers(auth_token, api_key=API_KEY):
+    """Headers for authenticated calls"""
+    headers = login_headers(api_key)
+    headers['Authorization'] = f'Bearer {auth_token}'
+    return headers
@@ -0,0 +1,341 @@
+"""
+STREAMING MULTI-TIMEFRAME BARS
+==============================
+Builds 1/3/5/15/60-minute bars from incoming 1-minute candles or trade ticks
+and keeps indicators up to date in O(1) per update:
+
+    VWAP  session volume-weighted average price (resets each trading day)
+    EMA   exponential moving averages (9 and 21 periods)
+    RSI   14-period, Wilder smoothing
+    ATR   14-period, Wilder smoothing
+    OI Δ  open interest change over the last closed bar
+
+Bars align to the NSE session open (09:15 IST), so a 15-minute bar covers
+09:15-09:30 and so on. Indicators advance when a bar closes; the forming
+bar is exposed separately. Candles that were already seen are skipped and a
+re-sent forming minute replaces the previous version of that minute.
+"""
+
+import threading
+from collections import deque
+from datetime import datetime
+
+from market_calendar import IST
+
+TIMEFRAMES = (1, 3, 5, 15, 60)   # minutes
+MAX_BARS = 500                   # closed bars kept per symbol and timeframe
+EXPORT_BARS = 100                # closed bars per symbol and timeframe in export()
+SESSION_OPEN_MINUTE = 9 * 60 + 15
+
+
+class Bar:
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'volume', 'oi')
+
+    def __init__(self, start, open_, high, low, close, volume=0, oi=None):
+        self.start = start
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.oi = oi
+
+    def to_dict(self):
+        return {
+            'start': self.start.isoformat(),
+            'open': self.open, 'high': self.high, 'low': self.low, 'close': self.close,
+            'volume': self.volume, 'oi': self.oi
+        }
+
+
+class EMA:
+    def __init__(self, period):
+        self.alpha = 2 / (period + 1)
+        self.value = None
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class WilderRSI:
+    def __init__(self, period=14):
+        self.period = period
+        self.avg_gain = self.avg_loss = None
+        self.prev_close = None
+        self._seed = []
+
+    def update(self, close):
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            if self.avg_gain is None:
+                self._seed.append((gain, loss))
+                if len(self._seed) == self.period:
+                    self.avg_gain = sum(g for g, _ in self._seed) / self.period
+                    self.avg_loss = sum(l for _, l in self._seed) / self.period
+                    self._seed = None
+            else:
+                self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+                self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        self.prev_close = close
+        return self.value
+
+    @property
+    def value(self):
+        if self.avg_gain is None:
+            return None
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+
+class WilderATR:
+    def __init__(self, period=14):
+        self.period = period
+        self.value = None
+        self.prev_close = None
+        self._seed = []
+
+    def update(self, high, low, close):
+        true_range = high - low
+        if self.prev_close is not None:
+            true_range = max(true_range, abs(high - self.prev_close), abs(low - self.prev_close))
+        if self.value is None:
+            self._seed.append(true_range)
+            if len(self._seed) == self.period:
+                self.value = sum(self._seed) / self.period
+                self._seed = None
+        else:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+        self.prev_close = close
+        return self.value
+
+
+class TimeframeSeries:
+    """Closed bars, the forming bar and indicators for one timeframe"""
+
+    def __init__(self, minutes):
+        self.minutes = minutes
+        self.bars = deque(maxlen=MAX_BARS)
+        self.forming = None
+        self.ema_fast = EMA(9)
+        self.ema_slow = EMA(21)
+        self.rsi = WilderRSI(14)
+        self.atr = WilderATR(14)
+        self.oi_delta = None
+
+    def bucket(self, ts):
+        minute = ts.hour * 60 + ts.minute
+        offset = (minute - SESSION_OPEN_MINUTE) // self.minutes * self.minutes
+        start_minute = SESSION_OPEN_MINUTE + offset
+        return ts.replace(hour=start_minute // 60, minute=start_minute % 60, second=0, microsecond=0)
+
+    def add_minute(self, ts, open_, high, low, close, volume, oi=None):
+        start = self.bucket(ts)
+        bar = self.forming
+        if bar is not None and start != bar.start:
+            self._close(bar)
+            bar = None
+        if bar is None:
+            self.forming = Bar(start, open_, high, low, close, volume, oi)
+            return
+        bar.high = max(bar.high, high)
+        bar.low = min(bar.low, low)
+        bar.close = close
+        bar.volume += volume
+        if oi is not None:
+            bar.oi = oi
+
+    def revise_minute(self, high, low, close, volume_delta, oi=None):
+        """Update the forming bar with a newer version of its latest minute"""
+        bar = self.forming
+        if bar is None:
+            return
+        bar.high = max(bar.high, high)
+        bar.low = min(bar.low, low)
+        bar.close = close
+        bar.volume += volume_delta
+        if oi is not None:
+            bar.oi = oi
+
+    def _close(self, bar):
+        if self.bars and bar.oi is not None and self.bars[-1].oi is not None:
+            self.oi_delta = bar.oi - self.bars[-1].oi
+        self.bars.append(bar)
+        self.ema_fast.update(bar.close)
+        self.ema_slow.update(bar.close)
+        self.rsi.update(bar.close)
+        self.atr.update(bar.high, bar.low, bar.close)
+
+    def indicators(self):
+        return {
+            'timeframe': self.minutes,
+            'last_close': self.forming.close if self.forming else (self.bars[-1].close if self.bars else None),
+            'ema_9': self.ema_fast.value,
+            'ema_21': self.ema_slow.value,
+            'rsi_14': self.rsi.value,
+            'atr_14': self.atr.value,
+            'oi_delta': self.oi_delta,
+            'closed_bars': len(self.bars)
+        }
+
+
+class SymbolBars:
+    """All timeframes plus session VWAP for one symbol"""
+
+    def __init__(self, timeframes=TIMEFRAMES):
+        self.series = {tf: TimeframeSeries(tf) for tf in timeframes}
+        self.last_minute = None          # (ts, typical price, volume) of the latest 1m bar
+        self.session_date = None
+        self._pv = 0.0
+        self._volume = 0.0
+
+    @property
+    def vwap(self):
+        return self._pv / self._volume if self._volume else None
+
+    def add_candle(self, ts, open_, high, low, close, volume, oi=None):
+        """Feed one 1-minute candle; returns False if it was already seen"""
+        last = self.last_minute
+        if last is not None and ts < last[0]:
+            return False
+
+        if ts.date() != self.session_date:
+            self.session_date = ts.date()
+            self._pv = self._volume = 0.0
+
+        typical = (high + low + close) / 3
+        if last is not None and ts == last[0]:
+            # newer version of the forming minute: swap its contribution
+            _, last_typical, last_volume = last
+            volume_delta = volume - last_volume
+            self._pv += typical * volume - last_typical * last_volume
+            self._volume += volume_delta
+            for series in self.series.values():
+                series.revise_minute(high, low, close, volume_delta, oi)
+        else:
+            self._pv += typical * volume
+            self._volume += volume
+            for series in self.series.values():
+                series.add_minute(ts, open_, high, low, close, volume, oi)
+        self.last_minute = (ts, typical, volume)
+        return True
+
+
+class BarBuilder:
+    """Bars and indicators for every symbol in the universe"""
+
+    def __init__(self, timeframes=TIMEFRAMES):
+        self.timeframes = timeframes
+        self._symbols = {}
+        self._ticks = {}
+        self._lock = threading.Lock()
+
+    def _get(self, symbol):
+        bars = self._symbols.get(symbol)
+        if bars is None:
+            bars = self._symbols[symbol] = SymbolBars(self.timeframes)
+        return bars
+
+    def on_candles(self, symbol, candles):
+        """Feed Angel One 1-minute candles: [timestamp, open, high, low, close, volume]
+
+        Only candles at or after the last one seen are applied, so re-sending
+        a whole day's window costs O(new candles).
+        """
+        with self._lock:
+            bars = self._get(symbol)
+            last_ts = bars.last_minute[0] if bars.last_minute else None
+            start = len(candles)
+            while start > 0 and (last_ts is None or _parse_ts(candles[start - 1][0]) >= last_ts):
+                start -= 1
+            applied = 0
+            for candle in candles[start:]:
+                ts = _parse_ts(candle[0])
+                applied += bars.add_candle(ts, float(candle[1]), float(candle[2]), float(candle[3]),
+                                           float(candle[4]), float(candle[5]))
+            return applied
+
+    def on_tick(self, tick):
+        """Build 1-minute bars from trade ticks (ticks without volume are ignored)"""
+        if tick.get('price') is None or tick.get('volume') is None:
+            return
+        # naive IST like candle timestamps, whatever the server's timezone
+        ts = datetime.fromtimestamp(tick['ts'], IST).replace(tzinfo=None, second=0, microsecond=0)
+        price = tick['price']
+        with self._lock:
+            bars = self._get(tick['symbol'])
+            minute = self._ticks.get(tick['symbol'])
+            if minute is None or minute[0] != ts:
+                minute = [ts, price, price, price, price, 0.0]
+            minute[2] = max(minute[2], price)
+            minute[3] = min(minute[3], price)
+            minute[4] = price
+            minute[5] += tick['volume']
+            self._ticks[tick['symbol']] = minute
+            bars.add_candle(ts, minute[1], minute[2], minute[3], minute[4], minute[5], tick.get('oi'))
+
+    def symbols(self):
+        with self._lock:
+            return sorted(self._symbols)
+
+    def get_bars(self, symbol, timeframe, limit=100):
+        with self._lock:
+            bars = self._symbols.get(symbol)
+            if bars is None or timeframe not in bars.series:
+                return None
+            series = bars.series[timeframe]
+            closed = [bar.to_dict() for bar in list(series.bars)[-limit:]]
+            return {
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'bars': closed,
+                'forming': series.forming.to_dict() if series.forming else None
+            }
+
+    def get_indicators(self, symbol, timeframe):
+        with self._lock:
+            bars = self._symbols.get(symbol)
+            if bars is None or timeframe not in bars.series:
+                return None
+            return dict(bars.series[timeframe].indicators(), symbol=symbol, vwap=bars.vwap)
+
+    def export(self, limit=EXPORT_BARS):
+        """Plain-dict copy of recent bars and indicators, e.g. to share with other processes"""
+        return {
+            symbol: {
+                tf: {
+                    'bars': self.get_bars(symbol, tf, limit),
+                    'indicators': self.get_indicators(symbol, tf)
+                }
+                for tf in self.timeframes
+            }
+            for symbol in self.symbols()
+        }
+
+
+class ExportedBars:
+    """Read-only BarBuilder view over the output of BarBuilder.export()"""
+
+    def __init__(self, exported):
+        self.exported = exported
+
+    def symbols(self):
+        return sorted(self.exported)
+
+    def get_bars(self, symbol, timeframe, limit=100):
+        series = self.exported.get(symbol, {}).get(timeframe)
+        if series is None:
+            return None
+        bars = series['bars']
+        return dict(bars, bars=bars['bars'][-limit:])
+
+    def get_indicators(self, symbol, timeframe):
+        series = self.exported.get(symbol, {}).get(timeframe)
+        return series['indicators'] if series is not None else None
+
+
+def _parse_ts(value):
+    """Candle timestamps look like 2024-01-05T09:15:00+05:30; compare as naive IST"""
+    return datetime.fromisoformat(value).replace(tzinfo=None)
@@ -0,0 +1,131 @@
+"""
+UPSTREAM CIRCUIT BREAKERS
+=========================
+Per-endpoint breakers so a slow or down broker fails fast instead of tying up
+every request for the full timeout.
+
+CLOSED     calls flow; consecutive failures (errors, 5xx/429 or calls slower
+           than slow_call_threshold) are counted
+OPEN       calls are refused immediately with CircuitOpenError
+HALF_OPEN  after reset_timeout a limited number of probe calls are let
+           through; a success closes the breaker, a failure re-opens it
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the breaker is open"""
+
+    def __init__(self, name):
+        super().__init__(f"Circuit '{name}' is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0,
+                 half_open_probes=1, slow_call_threshold=5.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.slow_call_threshold = slow_call_threshold
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.total_rejected = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """True if a call may go upstream now (reserves a probe slot when half-open)"""
+        with self._lock:
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self.probes_in_flight = 0
+                logger.info(f"🟡 Circuit '{self.name}' half-open, probing upstream")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self.probes_in_flight < self.half_open_probes:
+                self.probes_in_flight += 1
+                return True
+            self.total_rejected += 1
+            return False
+
+    def record_success(self, duration=0.0):
+        if duration > self.slow_call_threshold:
+            self.record_failure()
+            return
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"🟢 Circuit '{self.name}' closed, upstream recovered")
+            self.state = CLOSED
+            self.failures = 0
+            self.probes_in_flight = 0
+
+    def release(self):
+        """Give back a probe slot for a call that ended without a verdict"""
+        with self._lock:
+            if self.state == HALF_OPEN and self.probes_in_flight > 0:
+                self.probes_in_flight -= 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"🔴 Circuit '{self.name}' opened after {self.failures} failures")
+                self.state = OPEN
+                self.opened_at = time.time()
+                self.probes_in_flight = 0
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker; exceptions count as failures and propagate"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name)
+        started = time.time()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.time() - started)
+        return result
+
+    @property
+    def is_open(self):
+        return self.state == OPEN and time.time() - self.opened_at < self.reset_timeout
+
+    def to_dict(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'opened_at': self.opened_at or None,
+            'rejected': self.total_rejected
+        }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, **settings):
+    """Process-wide breaker for an endpoint name, created on first use"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **settings)
+        return breaker
+
+
+def all_breakers():
+    with _breakers_lock:
+        return dict(_breakers)
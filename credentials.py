@@ -0,0 +1,196 @@
+"""
+API CREDENTIAL POOL
+===================
+Shards upstream calls across several Angel One API credentials, so throughput
+is not capped at one account's rate limits.
+
+Each credential has its own session token, keep-alive connection pool and
+token buckets (one per endpoint, RATE_LIMITS calls per second). A call for a
+key (a symbol, a quote batch) goes to the key's owner on a consistent-hash
+ring, so the same symbol keeps hitting the same account and adding or losing a
+credential only moves that credential's share of the keys. If the owner is
+out of tokens the next healthy credential clockwise takes the call; if all
+are, the call waits for the first token as long as its deadline allows.
+
+A credential leaves the rotation while it is throttled (HTTP 429, for
+THROTTLE_COOLDOWN seconds) or its session is missing or expired (login failed,
+HTTP 401/403 or an invalid-token error), until the next login succeeds.
+
+Credentials are named by their position in the list (credential-1, ...), so
+logs and /debug never show account usernames, and two API keys on the same
+client code stay two pool members.
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import time
+
+import requests
+
+from rate_limit import get_bucket
+
+logger = logging.getLogger(__name__)
+
+# Documented SmartAPI per-second limits per account; ANGEL_RATE_LIMITS (JSON) overrides
+RATE_LIMITS = dict({
+    'ltp': 10,
+    'quote': 10,
+    'candles': 3,
+    'oi_history': 3,
+    'gainers_losers': 1,
+    'option_greeks': 1
+}, **json.loads(os.getenv('ANGEL_RATE_LIMITS', '{}')))
+DEFAULT_RATE_LIMIT = 5
+THROTTLE_COOLDOWN = 30.0    # seconds out of rotation after an HTTP 429
+RING_REPLICAS = 160         # points per credential on the hash ring
+POOL_SIZE = 32              # keep-alive connections per credential per process
+TOKEN_ERRORS = (b'AG8001', b'AG8002', b'AG8003')   # invalid / expired / missing token
+
+
+class NoCredentialError(Exception):
+    """Raised when no healthy credential can take a call within its budget"""
+
+    def __init__(self, endpoint, reason):
+        super().__init__(f"No credential for '{endpoint}': {reason}")
+        self.endpoint = endpoint
+
+
+class Credential:
+    """One API account: login details, session token and health"""
+
+    def __init__(self, api_key, username, password, totp_token, name):
+        self.api_key = api_key
+        self.username = username
+        self.password = password
+        self.totp_token = totp_token
+        self.name = name
+        self.auth_token = None
+        self.logged_in_at = 0.0
+        self.last_login_attempt = 0.0
+        self.throttled_until = 0.0
+        self.throttles = 0
+        self.expirations = 0
+        self._http = (None, None)
+
+    @property
+    def authenticated(self):
+        return self.auth_token is not None
+
+    def healthy(self):
+        return self.auth_token is not None and time.time() >= self.throttled_until
+
+    def http_session(self):
+        """Keep-alive session for this credential in this process (a forked worker gets its own sockets)"""
+        pid, session = self._http
+        if pid != os.getpid():
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            self._http = (os.getpid(), session)
+        return session
+
+    def bucket(self, endpoint):
+        rate = RATE_LIMITS.get(endpoint, DEFAULT_RATE_LIMIT)
+        return get_bucket(f"{self.name}:{endpoint}", rate=rate, capacity=rate)
+
+    def throttle(self, seconds=THROTTLE_COOLDOWN):
+        self.throttles += 1
+        self.throttled_until = time.time() + seconds
+        logger.warning(f"🐢 Credential {self.name} throttled, out of rotation for {seconds:.0f}s")
+
+    def expire(self):
+        """Drop the session token; the credential rejoins after its next login"""
+        if self.auth_token is not None:
+            self.expirations += 1
+            logger.warning(f"🔑 Credential {self.name} session expired, out of rotation until re-login")
+        self.auth_token = None
+
+    def check_response(self, response):
+        """Update health from an upstream response (429 throttles, auth errors expire)"""
+        if response.status_code == 429:
+            self.throttle()
+        elif response.status_code in (401, 403) or any(code in response.content[:512] for code in TOKEN_ERRORS):
+            self.expire()
+
+    def to_dict(self):
+        now = time.time()
+        return {
+            'authenticated': self.authenticated,
+            'healthy': self.healthy(),
+            'token_age': round(now - self.logged_in_at, 1) if self.logged_in_at else None,
+            'throttled_for': round(self.throttled_until - now, 1) if self.throttled_until > now else None,
+            'throttles': self.throttles,
+            'expirations': self.expirations
+        }
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent-hash ring of names with RING_REPLICAS points each"""
+
+    def __init__(self, names, replicas=RING_REPLICAS):
+        points = sorted((_hash(f"{name}#{i}"), name) for name in names for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._names = [name for _, name in points]
+        self._count = len(set(names))
+
+    def walk(self, key):
+        """Distinct names clockwise from the key's position, its owner first"""
+        if not self._names:
+            return []
+        start = bisect.bisect(self._hashes, _hash(key))
+        seen = []
+        for i in range(len(self._names)):
+            name = self._names[(start + i) % len(self._names)]
+            if name not in seen:
+                seen.append(name)
+                if len(seen) == self._count:
+                    break
+        return seen
+
+
+class CredentialPool:
+    def __init__(self, credentials):
+        self.credentials = {}
+        for i, details in enumerate(credentials):
+            credential = Credential(details['api_key'], details['username'], details['password'], details['totp_token'],
+                                    name=f"credential-{i + 1}")
+            self.credentials[credential.name] = credential
+        self.ring = HashRing(list(self.credentials))
+
+    def __iter__(self):
+        return iter(self.credentials.values())
+
+    def __len__(self):
+        return len(self.credentials)
+
+    def healthy(self):
+        return [c for c in self.credentials.values() if c.healthy()]
+
+    def candidates(self, key):
+        """Healthy credentials for a key in ring order (its owner first)"""
+        return [c for c in (self.credentials[name] for name in self.ring.walk(key)) if c.healthy()]
+
+    def acquire(self, key, endpoint, budget):
+        """Credential to make one `endpoint` call for `key`, waiting up to `budget` seconds for a token"""
+        give_up_at = time.monotonic() + budget
+        while True:
+            candidates = self.candidates(key)
+            if not candidates:
+                raise NoCredentialError(endpoint, "no healthy credential")
+            for credential in candidates:
+                if credential.bucket(endpoint).try_acquire():
+                    return credential
+            wait = min(c.bucket(endpoint).retry_after() for c in candidates)
+            if time.monotonic() + wait > give_up_at:
+                raise NoCredentialError(endpoint, "rate limited")
+            time.sleep(wait)
+
+    def to_dict(self):
+        return {name: credential.to_dict() for name, credential in self.credentials.items()}
@@ -0,0 +1,170 @@
+"""
+REQUEST DEADLINES
+=================
+A latency budget set once per request/refresh and propagated (via contextvars)
+to every upstream call made on its behalf.
+
+    with deadline_scope(0.5):
+        prices, missed = run_parallel(fetch_price, symbols)
+
+Upstream calls use call_timeout() so no single call can outlive the budget;
+run_parallel() stops waiting at the deadline and reports which items missed it.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_current_deadline = contextvars.ContextVar('deadline', default=None)
+
+MIN_CALL_TIMEOUT = 0.05  # seconds; below this a call is not worth starting
+
+
+class DeadlineExceeded(Exception):
+    """Raised when there is no budget left to start an upstream call"""
+
+
+class Deadline:
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+
+@contextmanager
+def deadline_scope(budget):
+    """Apply a budget (seconds) to everything run inside the block
+
+    A nested scope can only tighten an outer deadline, never extend it.
+    """
+    outer = _current_deadline.get()
+    deadline = Deadline(budget)
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline():
+    return _current_deadline.get()
+
+
+def call_timeout(default):
+    """Timeout for one upstream call: `default` clamped to the remaining budget"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    remaining = deadline.remaining()
+    if remaining < MIN_CALL_TIMEOUT:
+        raise DeadlineExceeded(f"Deadline of {deadline.budget}s exceeded")
+    return min(default, remaining)
+
+
+_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='upstream')
+
+
+def _reset_pool():
+    # a forked worker inherits the executor but not its threads
+    global _pool
+    _pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='upstream')
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool)
+
+
+def run_parallel(fn, items, limit=None):
+    """Run fn(item) concurrently until the current deadline
+
+    Returns ({item: result}, [missed items]). Items that raised, returned
+    None or did not finish in time are reported as missed; unfinished calls
+    are cancelled if still queued and otherwise abandoned (their own timeouts
+    are clamped to the same deadline).
+
+    With `limit`, at most that many items run at once, which leaves pool
+    threads for the parallel calls each item makes itself.
+    """
+    items = list(items)
+    if limit is not None and limit < len(items):
+        return _run_limited(fn, items, limit)
+    futures = {}
+    for item in items:
+        # each task gets its own copy so the deadline propagates into the pool
+        context = contextvars.copy_context()
+        futures[_pool.submit(context.run, fn, item)] = item
+
+    deadline = _current_deadline.get()
+    done, not_done = wait(futures, timeout=deadline.remaining() if deadline else None)
+
+    results, missed = {}, []
+    for future in done:
+        item = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.debug(f"Parallel call for {item} failed: {e}")
+            result = None
+        if result is None:
+            missed.append(item)
+        else:
+            results[item] = result
+    for future in not_done:
+        future.cancel()
+        missed.append(futures[future])
+    if not_done:
+        logger.warning(f"⏱️ {len(not_done)} calls missed the {deadline.budget}s deadline")
+    return results, missed
+
+
+def _run_limited(fn, items, limit):
+    """run_parallel() through `limit` pool threads that take items in order"""
+    pending = iter(items)
+    results = {}
+    completed = []
+    lock = threading.Lock()
+    stopped = False
+    end = object()
+
+    def drain():
+        while True:
+            with lock:
+                item = end if stopped else next(pending, end)
+            if item is end:
+                return
+            try:
+                result = fn(item)
+            except Exception as e:
+                logger.debug(f"Parallel call for {item} failed: {e}")
+                result = None
+            with lock:
+                completed.append(item)
+                if result is not None:
+                    results[item] = result
+
+    workers = [_pool.submit(contextvars.copy_context().run, drain) for _ in range(limit)]
+    deadline = _current_deadline.get()
+    _, not_done = wait(workers, timeout=deadline.remaining() if deadline else None)
+    with lock:
+        # items not started by now are not started at all
+        stopped = True
+        finished = dict(results)
+        late = len(items) - len(completed)
+    missed = [item for item in items if item not in finished]
+    if not_done:
+        logger.warning(f"⏱️ {late} calls missed the {deadline.budget}s deadline")
+    return finished, missed
@@ -0,0 +1,71 @@
+"""
+UPSTREAM ENDPOINT HEALTH
+========================
+Passive per-endpoint statistics recorded by every upstream call: call and
+failure counts, the last success and failure (with its error) and latency
+percentiles over the most recent calls. Reading them costs no upstream
+traffic, so monitoring can poll as often as it likes.
+"""
+
+import threading
+import time
+from collections import deque
+
+LATENCY_SAMPLES = 256     # recent calls kept per endpoint for percentiles
+
+
+class EndpointHealth:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.failures = 0
+        self.last_success_at = None
+        self.last_failure_at = None
+        self.last_error = None
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.last_success_at = time.time()
+            self.latencies.append(seconds)
+
+    def record_failure(self, error, seconds=None):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self.last_failure_at = time.time()
+            self.last_error = str(error)[:200]
+            if seconds is not None:
+                self.latencies.append(seconds)
+
+    def to_dict(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            last_success, last_failure = self.last_success_at, self.last_failure_at
+            info = {'calls': self.calls, 'failures': self.failures, 'last_error': self.last_error}
+        now = time.time()
+        info['last_success_ago'] = round(now - last_success, 1) if last_success else None
+        info['last_failure_ago'] = round(now - last_failure, 1) if last_failure else None
+        for label, q in (('p50_ms', 0.5), ('p90_ms', 0.9), ('p99_ms', 0.99)):
+            info[label] = round(latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000, 1) if latencies else None
+        return info
+
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+def get_health(name):
+    """Process-wide health record for an endpoint name, created on first use"""
+    with _health_lock:
+        health = _health.get(name)
+        if health is None:
+            health = _health[name] = EndpointHealth(name)
+        return health
+
+
+def all_health():
+    with _health_lock:
+        return dict(_health)
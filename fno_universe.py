@@ -0,0 +1,69 @@
+"""
+NSE F&O UNIVERSE
+================
+Underlyings with stock futures & options, grouped by sector. Used where the
+whole universe is needed without the instrument master (the simulator, and
+as the default list for universe-wide scans).
+"""
+
+FNO_SECTORS = {
+    'BANK': [
+        'HDFCBANK', 'ICICIBANK', 'SBIN', 'KOTAKBANK', 'AXISBANK', 'BANKBARODA', 'INDUSINDBK',
+        'PNB', 'CANBK', 'FEDERALBNK', 'IDFCFIRSTB', 'AUBANK', 'BANDHANBNK', 'RBLBANK',
+        'YESBANK', 'UNIONBANK', 'INDIANB', 'BANKINDIA'
+    ],
+    'FINANCIALS': [
+        'BAJFINANCE', 'BAJAJFINSV', 'SHRIRAMFIN', 'CHOLAFIN', 'MUTHOOTFIN', 'MANAPPURAM',
+        'LICHSGFIN', 'PFC', 'RECLTD', 'SBICARD', 'HDFCLIFE', 'SBILIFE', 'ICICIGI',
+        'ICICIPRULI', 'LICI', 'HDFCAMC', 'ANGELONE', 'CDSL', 'BSE', 'MCX', 'IRFC', 'IEX',
+        'LTF', 'ABCAPITAL', 'M&MFIN', 'JIOFIN', 'PAYTM', 'POLICYBZR', 'CAMS', 'KFINTECH',
+        'HUDCO', 'IREDA', 'PNBHOUSING', '360ONE', 'NUVAMA'
+    ],
+    'IT': [
+        'TCS', 'INFY', 'HCLTECH', 'WIPRO', 'TECHM', 'LTIM', 'PERSISTENT', 'COFORGE',
+        'MPHASIS', 'OFSS', 'KPITTECH', 'TATAELXSI', 'TATATECH', 'NAUKRI'
+    ],
+    'ENERGY': [
+        'RELIANCE', 'ONGC', 'BPCL', 'IOC', 'HINDPETRO', 'GAIL', 'OIL', 'PETRONET', 'NTPC',
+        'POWERGRID', 'TATAPOWER', 'ADANIGREEN', 'ADANIENSOL', 'NHPC', 'JSWENERGY',
+        'TORNTPOWER', 'COALINDIA', 'IGL', 'CESC'
+    ],
+    'AUTO': [
+        'MARUTI', 'M&M', 'TATAMOTORS', 'BAJAJ-AUTO', 'HEROMOTOCO', 'EICHERMOT', 'TVSMOTOR',
+        'ASHOKLEY', 'BHARATFORG', 'MOTHERSON', 'BOSCHLTD', 'EXIDEIND', 'TIINDIA',
+        'SONACOMS', 'UNOMINDA'
+    ],
+    'FMCG': [
+        'HINDUNILVR', 'ITC', 'NESTLEIND', 'BRITANNIA', 'DABUR', 'MARICO', 'GODREJCP',
+        'COLPAL', 'TATACONSUM', 'VBL', 'UNITDSPR', 'PATANJALI'
+    ],
+    'PHARMA': [
+        'SUNPHARMA', 'DRREDDY', 'CIPLA', 'DIVISLAB', 'LUPIN', 'AUROPHARMA', 'ZYDUSLIFE',
+        'TORNTPHARM', 'ALKEM', 'BIOCON', 'GLENMARK', 'LAURUSLABS', 'MANKIND', 'APOLLOHOSP',
+        'MAXHEALTH', 'FORTIS'
+    ],
+    'METALS': [
+        'TATASTEEL', 'JSWSTEEL', 'HINDALCO', 'VEDL', 'SAIL', 'JINDALSTEL', 'NMDC',
+        'NATIONALUM', 'HINDZINC'
+    ],
+    'INFRA': [
+        'LT', 'ULTRACEMCO', 'SHREECEM', 'GRASIM', 'AMBUJACEM', 'DALBHARAT', 'ADANIPORTS',
+        'ADANIENT', 'DLF', 'GODREJPROP', 'OBEROIRLTY', 'PRESTIGE', 'LODHA', 'PHOENIXLTD',
+        'NCC', 'NBCC', 'CONCOR', 'GMRAIRPORT'
+    ],
+    'CAPITAL_GOODS': [
+        'SIEMENS', 'ABB', 'BHEL', 'HAL', 'BEL', 'CUMMINSIND', 'POLYCAB', 'HAVELLS', 'CGPOWER',
+        'BDL', 'MAZDOCK', 'SOLARINDS', 'INOXWIND', 'SUZLON', 'KEI', 'APLAPOLLO', 'ASTRAL',
+        'SUPREMEIND', 'DIXON', 'AMBER', 'KAYNES', 'PGEL', 'BLUESTARCO', 'VOLTAS', 'CROMPTON'
+    ],
+    'CONSUMER': [
+        'TITAN', 'ASIANPAINT', 'PIDILITIND', 'TRENT', 'DMART', 'ETERNAL', 'NYKAA',
+        'KALYANKJIL', 'JUBLFOOD', 'PAGEIND', 'INDHOTEL', 'IRCTC'
+    ],
+    'TELECOM': ['BHARTIARTL', 'IDEA', 'INDUSTOWER'],
+    'CHEMICALS': ['UPL', 'PIIND', 'SRF']
+}
+
+FNO_UNIVERSE = [symbol for symbols in FNO_SECTORS.values() for symbol in symbols]
+
+SYMBOL_SECTOR = {symbol: sector for sector, symbols in FNO_SECTORS.items() for symbol in symbols}
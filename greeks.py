@@ -0,0 +1,357 @@
+"""
+OPTION GREEKS & IMPLIED VOLATILITY
+==================================
+Vectorized Black-Scholes engine: implied volatility plus delta, gamma, vega
+and theta for every option of many chains in one NumPy pass.
+
+IV is solved with a safeguarded Newton iteration over arrays: each option
+keeps a [lo, hi] bracket that shrinks with every evaluation, a Newton step
+is taken when it stays inside the bracket and a bisection step otherwise
+(the same idea as Brent's method, but it vectorizes). Options that converge
+drop out of the working set, so later iterations only touch the stragglers.
+Prices outside the no-arbitrage bounds get NaN.
+
+Conventions: European options on spot with no dividends, time in years
+(expiry at 15:30 IST), vega per 1 vol point, theta per calendar day.
+
+    python greeks.py --strikes 200 --expiries 12     # full index chain vs the refresh interval
+"""
+
+import argparse
+import math
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from market_calendar import CONTINUOUS, IST, MARKET_CLOSE, POLL_INTERVALS
+
+RISK_FREE_RATE = float(os.getenv('RISK_FREE_RATE', '0.065'))
+IV_TOLERANCE = 1e-6       # relative price error at which a volatility is accepted
+MAX_ITERATIONS = 50
+MIN_VOL, MAX_VOL = 1e-4, 5.0
+SECONDS_PER_YEAR = 365 * 86400
+SQRT_2 = np.sqrt(2.0)
+SQRT_2PI = np.sqrt(2.0 * np.pi)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def norm_cdf(x):
+    """Standard normal CDF from a Chebyshev fit of erfc (relative error < 1.2e-7)"""
+    z = np.abs(x) / SQRT_2
+    t = 1.0 / (1.0 + 0.5 * z)
+    erfc = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (-0.82215223 + t * 0.17087277)))))))))
+    return np.where(x >= 0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def _d1_d2(spot, strike, years, vol, rate):
+    vol_sqrt_t = vol * np.sqrt(years)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * vol * vol) * years) / vol_sqrt_t
+    return d1, d1 - vol_sqrt_t
+
+
+def bs_price(spot, strike, years, vol, is_call, rate=RISK_FREE_RATE):
+    """Black-Scholes prices for arrays of options"""
+    d1, d2 = _d1_d2(spot, strike, years, vol, rate)
+    discounted_strike = strike * np.exp(-rate * years)
+    call = spot * norm_cdf(d1) - discounted_strike * norm_cdf(d2)
+    put = discounted_strike * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def implied_vol(price, spot, strike, years, is_call, rate=RISK_FREE_RATE,
+                tol=IV_TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """Implied volatility for arrays of option prices (NaN where no volatility fits)"""
+    price, spot, strike, years, is_call = (
+        np.array(a, dtype=float if i < 4 else bool) for i, a in
+        enumerate(np.broadcast_arrays(price, spot, strike, years, is_call))
+    )
+    discounted_strike = strike * np.exp(-rate * np.maximum(years, 0.0))
+    intrinsic = np.where(is_call, np.maximum(spot - discounted_strike, 0.0),
+                         np.maximum(discounted_strike - spot, 0.0))
+    upper = np.where(is_call, spot, discounted_strike)
+    valid = np.isfinite(price) & (years > 0) & (price > intrinsic) & (price < upper)
+
+    vol = np.full(price.shape, np.nan)
+    lo = np.full(price.shape, MIN_VOL)
+    hi = np.full(price.shape, MAX_VOL)
+    # Brenner-Subrahmanyam starting point, kept inside the bracket
+    with np.errstate(divide='ignore', invalid='ignore'):
+        guess = np.sqrt(2 * np.pi / years) * price / spot
+    vol[valid] = np.clip(guess[valid], 0.05, 2.0)
+
+    active = np.nonzero(valid)[0]
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+        s, k, t, c, p = spot[active], strike[active], years[active], is_call[active], price[active]
+        sigma = vol[active]
+        d1, _ = _d1_d2(s, k, t, sigma, rate)
+        diff = bs_price(s, k, t, sigma, c, rate) - p
+        vega = s * norm_pdf(d1) * np.sqrt(t)
+
+        # price rises with vol, so the sign of the error tells which side of the root we are on
+        too_high = diff > 0
+        hi[active] = np.where(too_high, sigma, hi[active])
+        lo[active] = np.where(too_high, lo[active], sigma)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = sigma - diff / vega
+        bracket_lo, bracket_hi = lo[active], hi[active]
+        use_newton = (vega > 1e-12) & (newton > bracket_lo) & (newton < bracket_hi)
+        vol[active] = np.where(use_newton, newton, 0.5 * (bracket_lo + bracket_hi))
+
+        converged = (np.abs(diff) <= tol * p) | (bracket_hi - bracket_lo < 1e-10)
+        vol[active[converged]] = sigma[converged]
+        active = active[~converged]
+
+    vol[active] = np.nan
+    return vol
+
+
+def greeks(spot, strike, years, vol, is_call, rate=RISK_FREE_RATE):
+    """Delta, gamma, vega (per vol point) and theta (per day) for arrays of options"""
+    d1, d2 = _d1_d2(spot, strike, years, vol, rate)
+    pdf = norm_pdf(d1)
+    sqrt_t = np.sqrt(years)
+    discounted_strike = strike * np.exp(-rate * years)
+    decay = -spot * pdf * vol / (2 * sqrt_t)
+    return {
+        'delta': np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0),
+        'gamma': pdf / (spot * vol * sqrt_t),
+        'vega': spot * pdf * sqrt_t / 100,
+        'theta': np.where(is_call,
+                          decay - rate * discounted_strike * norm_cdf(d2),
+                          decay + rate * discounted_strike * norm_cdf(-d2)) / 365
+    }
+
+
+def years_to_expiry(expiry, now=None):
+    """Years until 15:30 IST on an expiry given as DDMMMYYYY (e.g. 30OCT2026)"""
+    now = now or time.time()
+    expiry_day = datetime.strptime(expiry, '%d%b%Y')
+    expires_at = datetime(expiry_day.year, expiry_day.month, expiry_day.day, *MARKET_CLOSE, tzinfo=IST)
+    return (expires_at.timestamp() - now) / SECONDS_PER_YEAR
+
+
+def solve_chains(chains, rate=RISK_FREE_RATE, now=None):
+    """IV and greeks for every call and put of many chains in one vectorized pass
+
+    A chain is {'symbol', 'expiry', 'spot', 'rows': [{'strike', 'call_ltp',
+    'put_ltp', 'call_oi', 'put_oi', ...}]} and may carry 'time_to_expiry' in
+    years. Returns the chains with call_/put_ iv, delta, gamma, vega and
+    theta added to each row, plus the ATM IV and OI put-call ratio.
+    """
+    now = now or time.time()
+    chains = [c for c in chains if c and c.get('spot') and c.get('rows')]
+    years_by_chain = [c.get('time_to_expiry') or years_to_expiry(c['expiry'], now) for c in chains]
+
+    # Flatten once: option i belongs to chain chain_ids[i], row row_ids[i]
+    chain_ids, row_ids, sides, prices, strikes = [], [], [], [], []
+    for ci, chain in enumerate(chains):
+        for ri, row in enumerate(chain['rows']):
+            for side in ('call', 'put'):
+                ltp = row.get(f"{side}_ltp")
+                if ltp:
+                    chain_ids.append(ci)
+                    row_ids.append(ri)
+                    sides.append(side == 'call')
+                    prices.append(ltp)
+                    strikes.append(row['strike'])
+
+    chain_ids = np.array(chain_ids, dtype=int)
+    spot = np.array([c['spot'] for c in chains], dtype=float)[chain_ids] if chains else np.empty(0)
+    years = np.array(years_by_chain, dtype=float)[chain_ids] if chains else np.empty(0)
+    strike = np.array(strikes, dtype=float)
+    is_call = np.array(sides, dtype=bool)
+
+    started = time.perf_counter()
+    iv = implied_vol(np.array(prices, dtype=float), spot, strike, years, is_call, rate)
+    solved = np.isfinite(iv)
+    values = {name: np.full(iv.shape, np.nan) for name in ('delta', 'gamma', 'vega', 'theta')}
+    if solved.any():
+        computed = greeks(spot[solved], strike[solved], years[solved], iv[solved], is_call[solved], rate)
+        for name, array in computed.items():
+            values[name][solved] = array
+    values['iv'] = iv
+    solve_seconds = time.perf_counter() - started
+
+    # every row gets every field, None where there was no price or no volatility fits
+    blank = {f"{side}_{name}": None for side in ('call', 'put') for name in ('iv', 'delta', 'gamma', 'vega', 'theta')}
+    results = [dict(c, time_to_expiry=y, rows=[dict(blank, **r) for r in c['rows']])
+               for c, y in zip(chains, years_by_chain)]
+    columns = {name: array.tolist() for name, array in values.items()}
+    for i, (ci, ri, call) in enumerate(zip(chain_ids.tolist(), row_ids, sides)):
+        row = results[ci]['rows'][ri]
+        prefix = 'call' if call else 'put'
+        for name, column in columns.items():
+            value = column[i]
+            row[f"{prefix}_{name}"] = None if value != value else round(value, 6)   # NaN -> None
+
+    for chain in results:
+        chain.update(chain_summary(chain))
+    return results, {'options': int(iv.size), 'solved': int(solved.sum()), 'seconds': solve_seconds}
+
+
+def chain_summary(chain):
+    """ATM implied volatility and OI put-call ratio of a solved chain"""
+    rows = chain['rows']
+    atm = min(rows, key=lambda r: abs(r['strike'] - chain['spot']))
+    atm_ivs = [v for v in (atm.get('call_iv'), atm.get('put_iv')) if v is not None]
+    call_oi = sum(r.get('call_oi') or 0 for r in rows)
+    put_oi = sum(r.get('put_oi') or 0 for r in rows)
+    return {
+        'atm_strike': atm['strike'],
+        'atm_iv': round(sum(atm_ivs) / len(atm_ivs), 4) if atm_ivs else None,
+        'pcr': round(put_oi / call_oi, 2) if call_oi else None
+    }
+
+
+class GreeksEngine:
+    """Latest solved chains per underlying and expiry"""
+
+    def __init__(self, rate=RISK_FREE_RATE):
+        self.rate = rate
+        self.chains = {}
+        self.stats = {}
+
+    def update(self, chains):
+        """Solve a batch of chains and keep the results
+
+        Chains not in the batch keep their last solve (with its `solved_at`)
+        until their expiry date has passed.
+        """
+        results, stats = solve_chains(chains, self.rate)
+        now = time.time()
+        stats['updated_at'] = now
+        solved = dict(self.chains)
+        solved.update(((c['symbol'], c['expiry']), dict(c, solved_at=now)) for c in results)
+        today = datetime.now(IST).date()
+        for key in set(solved) - {(c['symbol'], c['expiry']) for c in results}:
+            if _expiry_day(key[1]) < today:
+                del solved[key]
+        self.chains = solved
+        self.stats = stats
+        return stats
+
+    def export(self):
+        """Plain-dict copy of the solved chains, e.g. to share with other processes"""
+        return {'chains': list(self.chains.values()), 'stats': dict(self.stats)}
+
+    def load(self, exported):
+        """Adopt chains solved by another process's engine"""
+        self.chains = {(c['symbol'], c['expiry']): c for c in exported['chains']}
+        self.stats = exported['stats']
+
+    def get(self, symbol):
+        """Solved chains of one underlying, nearest expiry first"""
+        chains = [c for (s, _), c in self.chains.items() if s == symbol]
+        return sorted(chains, key=lambda c: c['time_to_expiry'])
+
+    def pcr(self, symbol):
+        """OI put-call ratio of the nearest solved expiry (None if not solved)"""
+        chains = self.get(symbol)
+        return chains[0]['pcr'] if chains else None
+
+    def summary(self):
+        return {
+            'stats': self.stats,
+            'chains': [
+                {k: c[k] for k in ('symbol', 'expiry', 'spot', 'time_to_expiry', 'atm_strike', 'atm_iv', 'pcr')}
+                for c in sorted(self.chains.values(), key=lambda c: (c['symbol'], c['time_to_expiry']))
+            ]
+        }
+
+
+def _expiry_day(expiry):
+    """Date of a DDMMMYYYY expiry (date.max when it does not parse)"""
+    try:
+        return datetime.strptime(expiry, '%d%b%Y').date()
+    except (TypeError, ValueError):
+        return datetime.max.date()
+
+
+def scalar_implied_vol(price, spot, strike, years, is_call, rate=RISK_FREE_RATE, tol=IV_TOLERANCE):
+    """Per-option Newton/bisection in plain Python, the baseline the benchmark compares against"""
+    n = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    lo, hi, vol = MIN_VOL, MAX_VOL, 0.3
+    for _ in range(MAX_ITERATIONS):
+        sqrt_t = math.sqrt(years)
+        d1 = (math.log(spot / strike) + (rate + 0.5 * vol * vol) * years) / (vol * sqrt_t)
+        d2 = d1 - vol * sqrt_t
+        discounted_strike = strike * math.exp(-rate * years)
+        model = spot * n(d1) - discounted_strike * n(d2) if is_call else discounted_strike * n(-d2) - spot * n(-d1)
+        diff = model - price
+        if abs(diff) <= tol * price:
+            return vol
+        if diff > 0:
+            hi = vol
+        else:
+            lo = vol
+        vega = spot * math.exp(-0.5 * d1 * d1) / math.sqrt(2 * math.pi) * sqrt_t
+        newton = vol - diff / vega if vega > 1e-12 else lo
+        vol = newton if lo < newton < hi else 0.5 * (lo + hi)
+    return float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a full option chain IV + greeks solve on one core")
+    parser.add_argument('--spot', type=float, default=25000)
+    parser.add_argument('--strikes', type=int, default=200, help="strikes per expiry (50 points apart)")
+    parser.add_argument('--expiries', type=int, default=12, help="weekly expiries")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # A NIFTY-like chain priced off a volatility smile, so the solved IVs can be checked
+    now = time.time()
+    atm = round(args.spot / 50) * 50
+    strikes = atm + 50 * (np.arange(args.strikes) - args.strikes // 2)
+    chains = []
+    for week in range(args.expiries):
+        years = (week * 7 + 3) / 365
+        smile = 0.13 + 0.4 * np.log(strikes / args.spot) ** 2 / max(years, 0.02) ** 0.5 * 0.1
+        calls = bs_price(args.spot, strikes, years, smile, True)
+        puts = bs_price(args.spot, strikes, years, smile, False)
+        chains.append({
+            'symbol': 'NIFTY', 'expiry': f"W{week}", 'spot': args.spot, 'time_to_expiry': years,
+            'rows': [
+                {'strike': float(k), 'call_ltp': round(float(c), 2), 'put_ltp': round(float(p), 2),
+                 'call_oi': 1000, 'put_oi': 900, 'true_iv': float(v)}
+                for k, c, p, v in zip(strikes, calls, puts, smile)
+            ]
+        })
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        results, stats = solve_chains(chains, now=now)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+
+    # out-of-the-money options carry the volatility information (ITM time value drowns in the tick size)
+    errors = [abs(r[f"{side}_iv"] - r['true_iv']) for c in results for r in c['rows']
+              for side, otm in (('call', r['strike'] > c['spot']), ('put', r['strike'] < c['spot']))
+              if otm and r.get(f"{side}_iv") is not None and r[f"{side}_ltp"] >= 1]
+    sample = [(r[f"{side}_ltp"], c['spot'], r['strike'], c['time_to_expiry'], side == 'call')
+              for c in results for r in c['rows'] for side in ('call', 'put')][:2000]
+    started = time.perf_counter()
+    for option in sample:
+        scalar_implied_vol(*option)
+    scalar_per_option = (time.perf_counter() - started) / len(sample)
+
+    interval = POLL_INTERVALS[CONTINUOUS]
+    print(f"options={stats['options']} solved={stats['solved']} "
+          f"best={best * 1000:.1f}ms (solver {stats['seconds'] * 1000:.1f}ms) "
+          f"throughput={stats['options'] / best:,.0f} options/s")
+    print(f"max IV error={max(errors):.2e} (OTM options priced >= 1)  "
+          f"scalar loop estimate={scalar_per_option * stats['options'] * 1000:.0f}ms  "
+          f"budget={best / interval:.2%} of the {interval}s refresh interval")
+
+
+if __name__ == '__main__':
+    main()
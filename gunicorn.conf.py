@@ -0,0 +1,31 @@
+"""
+GUNICORN CONFIGURATION
+======================
+gunicorn loads ./gunicorn.conf.py automatically:
+
+    gunicorn app:app
+
+The app is imported once in the master (preload_app), which runs the
+fork-safe boot warm-up there: instrument master, compiled templates and the
+login token are shared by every worker. Each worker then opens its own
+connection pool, joins the producer election and fetches its first snapshot
+before /healthz reports ready.
+"""
+
+import os
+
+# Tell app.py to run only the boot phase at import; workers finish in post_fork
+os.environ.setdefault('WARMUP_MODE', 'preload')
+
+wsgi_app = 'app:app'
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+preload_app = True
+timeout = 60
+
+
+def post_fork(server, worker):
+    from app import start_worker
+    start_worker()
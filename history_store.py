@@ -0,0 +1,253 @@
+"""
+SNAPSHOT HISTORY
+================
+Per-symbol time series of price, OI change, PCR and index impact in a local
+SQLite database (WAL mode, so workers read while the producer writes):
+
+    samples   one row per symbol per refresh, kept RETENTION['raw'] seconds
+    rollups   1m / 5m / 1h OHLC buckets maintained with UPSERTs as each new
+              sample is inserted, each kept for its own retention
+
+Writes are queued and flushed in batches by a background thread, so the
+refresh path never waits on the disk; the same thread prunes expired rows
+every PRUNE_INTERVAL. Queries read the coarsest rollup that divides the
+requested step, so a month of hourly points is ~700 rows, not 250k samples.
+Raw reads stop at MAX_POINTS samples and say so with a `truncated` flag.
+"""
+
+import logging
+import math
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from market_calendar import IST
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv('HISTORY_DB', os.path.join(tempfile.gettempdir(), 'bounce-back-history.sqlite3'))
+ROLLUP_STEPS = (60, 300, 3600)
+ROLLUP_NAMES = {60: '1m', 300: '5m', 3600: '1h'}
+RETENTION = {                         # seconds
+    'raw': int(os.getenv('HISTORY_RAW_RETENTION', str(2 * 86400))),
+    60: 7 * 86400,
+    300: 30 * 86400,
+    3600: 365 * 86400
+}
+FLUSH_INTERVAL = 1.0
+PRUNE_INTERVAL = 600
+MAX_POINTS = 5000
+MAX_TIME = 1e11                       # unix seconds (year ~5100); later times are rejected
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    symbol TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    price REAL,
+    oi_change REAL,
+    pcr REAL,
+    impact REAL,
+    PRIMARY KEY (symbol, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    step INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL,
+    oi_change REAL,
+    pcr REAL,
+    impact REAL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (step, symbol, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollups_bucket ON rollups (step, bucket);
+"""
+
+# a sample for a (symbol, second) already stored is ignored, so it is never counted into the rollups twice
+INSERT_SAMPLE = "INSERT OR IGNORE INTO samples VALUES (?, ?, ?, ?, ?, ?)"
+UPSERT_ROLLUP = """
+INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (step, symbol, bucket) DO UPDATE SET
+    high = max(coalesce(high, excluded.high), coalesce(excluded.high, high)),
+    low = min(coalesce(low, excluded.low), coalesce(excluded.low, low)),
+    close = coalesce(excluded.close, close),
+    oi_change = coalesce(excluded.oi_change, oi_change),
+    pcr = coalesce(excluded.pcr, pcr),
+    impact = coalesce(excluded.impact, impact),
+    samples = samples + 1
+"""
+
+RAW_QUERY = (
+    "SELECT ts, price, price, price, price, oi_change, pcr, impact FROM samples "
+    f"WHERE symbol = ? AND ts >= ? AND ts < ? ORDER BY ts LIMIT {MAX_POINTS + 1}"
+)
+ROLLUP_QUERY = (
+    "SELECT bucket, open, high, low, close, oi_change, pcr, impact FROM rollups "
+    "WHERE step = ? AND symbol = ? AND bucket >= ? AND bucket < ? ORDER BY bucket"
+)
+
+FIELDS = ('open', 'high', 'low', 'close', 'oi_change', 'pcr', 'impact')
+
+
+def parse_step(value):
+    """Seconds from '300', '5m', '1h' or '1d' (None for raw samples)"""
+    if value in (None, '', '0', 'raw'):
+        return None
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if value[-1] in units:
+        return int(value[:-1]) * units[value[-1]]
+    return int(value)
+
+
+def parse_time(value, default):
+    """Unix seconds from epoch seconds or an ISO datetime (naive times are IST); raises ValueError"""
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        seconds = (moment if moment.tzinfo else moment.replace(tzinfo=IST)).timestamp()
+    if not (math.isfinite(seconds) and abs(seconds) < MAX_TIME):
+        raise ValueError(f"time out of range: {value}")
+    return seconds
+
+
+class HistoryStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=10000)
+        self._local = threading.local()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _reader(self):
+        # one connection per thread and process; SQLite handles must not cross a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection, self._local.pid = self._connect(), os.getpid()
+        return self._local.connection
+
+    def record(self, ts, points):
+        """Queue {symbol: {'price', 'oi_change', 'pcr', 'impact'}} observed at ts; never blocks"""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((int(ts), points))
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_writer(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                threading.Thread(target=self._run_writer, name='history-writer', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run_writer(self):
+        connection = self._connect()
+        last_prune = 0.0
+        while True:
+            batch = [self._queue.get()]
+            time.sleep(FLUSH_INTERVAL)
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(connection, batch)
+                if time.time() - last_prune >= PRUNE_INTERVAL:
+                    self.prune(connection)
+                    last_prune = time.time()
+            except Exception as e:
+                logger.error(f"❌ History write failed: {e}")
+
+    def _write(self, connection, batch):
+        written = 0
+        with connection:
+            for ts, points in batch:
+                for symbol, p in points.items():
+                    price, oi_change, pcr, impact = p.get('price'), p.get('oi_change'), p.get('pcr'), p.get('impact')
+                    # rollups only take samples that were actually new
+                    if connection.execute(INSERT_SAMPLE, (symbol, ts, price, oi_change, pcr, impact)).rowcount != 1:
+                        continue
+                    connection.executemany(UPSERT_ROLLUP, [
+                        (step, symbol, ts - ts % step, price, price, price, price, oi_change, pcr, impact)
+                        for step in ROLLUP_STEPS
+                    ])
+                    written += 1
+        self.written += written
+
+    def prune(self, connection=None):
+        """Delete samples and rollups past their retention"""
+        connection = connection or self._reader()
+        now = int(time.time())
+        with connection:
+            deleted = connection.execute("DELETE FROM samples WHERE ts < ?", (now - RETENTION['raw'],)).rowcount
+            for step in ROLLUP_STEPS:
+                deleted += connection.execute(
+                    "DELETE FROM rollups WHERE step = ? AND bucket < ?", (step, now - RETENTION[step])
+                ).rowcount
+        if deleted:
+            logger.info(f"🧹 History retention removed {deleted} rows")
+
+    def _raw_rows(self, connection, symbol, start, end):
+        """Up to MAX_POINTS samples from start, and whether more were left out"""
+        rows = connection.execute(RAW_QUERY, (symbol, start, end)).fetchall()
+        return rows[:MAX_POINTS], len(rows) > MAX_POINTS
+
+    def query(self, symbol, start, end, step=None):
+        """(source, points, truncated) for one symbol in [start, end), raw or downsampled to `step` seconds"""
+        connection = self._reader()
+        if step is None:
+            rows, truncated = self._raw_rows(connection, symbol, start, end)
+            return 'raw', [dict(zip(('ts',) + FIELDS, row)) for row in rows], truncated
+
+        # coarsest rollup that divides the step (else raw samples, merged below)
+        source = max((s for s in ROLLUP_STEPS if step % s == 0), default=None)
+        truncated = False
+        if source is None:
+            source_name = 'raw'
+            rows, truncated = self._raw_rows(connection, symbol, start, end)
+        else:
+            source_name = ROLLUP_NAMES[source]
+            rows = connection.execute(ROLLUP_QUERY, (source, symbol, start - start % source, end)).fetchall()
+
+        points = []
+        for row in rows:
+            bucket = row[0] - row[0] % step
+            if not points or points[-1]['ts'] != bucket:
+                points.append(dict.fromkeys(('ts',) + FIELDS))
+                points[-1]['ts'] = bucket
+            _merge(points[-1], dict(zip(FIELDS, row[1:])))
+        return source_name, points, truncated
+
+
+def _merge(point, row):
+    """Fold a later row into a downsampled point: first open, extreme high/low, last of the rest"""
+    for key, value in row.items():
+        if value is None:
+            continue
+        if key == 'open':
+            point[key] = value if point[key] is None else point[key]
+        elif key == 'high':
+            point[key] = value if point[key] is None else max(point[key], value)
+        elif key == 'low':
+            point[key] = value if point[key] is None else min(point[key], value)
+        else:
+            point[key] = value
@@ -0,0 +1,132 @@
+"""
+INSTRUMENT MASTER
+=================
+Angel One scrip master (every tradable token) loaded once per process:
+
+    equity        NSE cash symbol -> token          (RELIANCE -> 2885)
+    indices       NSE index name -> token           (Nifty 50 -> 99926000)
+    derivatives   NFO underlying -> futures/options contracts
+
+The ~40 MB master is downloaded at most once per CACHE_MAX_AGE and cached on
+disk (SCRIP_MASTER_CACHE), so restarts and the other workers on the host
+reuse it. If it cannot be loaded, callers fall back to the built-in tokens.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+SCRIP_MASTER_URL = os.getenv(
+    'SCRIP_MASTER_URL',
+    "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
+)
+CACHE_PATH = os.getenv('SCRIP_MASTER_CACHE', os.path.join(tempfile.gettempdir(), 'angel-scrip-master.json'))
+CACHE_MAX_AGE = 12 * 3600     # seconds; the master changes once a day
+
+Contract = namedtuple('Contract', 'token symbol underlying expiry strike option_type lot_size')
+
+
+class InstrumentMaster:
+    def __init__(self, url=SCRIP_MASTER_URL, cache_path=CACHE_PATH):
+        self.url = url
+        self.cache_path = cache_path
+        self.equity = {}
+        self.indices = {}
+        self.derivatives = {}
+        self.loaded_at = None
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def load(self, timeout=30):
+        """Load from the disk cache if recent, else download; returns the number of instruments"""
+        rows = None
+        if os.path.exists(self.cache_path) and time.time() - os.path.getmtime(self.cache_path) < CACHE_MAX_AGE:
+            try:
+                with open(self.cache_path) as f:
+                    rows = json.load(f)
+                logger.info(f"📇 Instrument master loaded from {self.cache_path}")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not read cached instrument master: {e}")
+
+        if rows is None:
+            response = requests.get(self.url, timeout=timeout)
+            response.raise_for_status()
+            rows = response.json()
+            try:
+                tmp_path = f"{self.cache_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(rows, f)
+                os.replace(tmp_path, self.cache_path)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not cache instrument master: {e}")
+            logger.info(f"📇 Instrument master downloaded ({len(rows)} instruments)")
+
+        self._index(rows)
+        return len(rows)
+
+    def _index(self, rows):
+        equity, indices, derivatives = {}, {}, {}
+        for row in rows:
+            segment = row.get('exch_seg')
+            if segment == 'NSE':
+                symbol = row.get('symbol', '')
+                if symbol.endswith('-EQ'):
+                    equity[symbol[:-3]] = row['token']
+                elif row.get('instrumenttype') == 'AMXIDX':
+                    indices[row.get('name')] = row['token']
+            elif segment == 'NFO':
+                symbol = row.get('symbol', '')
+                option_type = symbol[-2:] if symbol[-2:] in ('CE', 'PE') else 'FUT'
+                try:
+                    expiry = datetime.strptime(row['expiry'], '%d%b%Y').date()
+                except (KeyError, ValueError):
+                    continue
+                contract = Contract(
+                    token=row['token'],
+                    symbol=symbol,
+                    underlying=row.get('name'),
+                    expiry=expiry,
+                    strike=float(row.get('strike') or 0) / 100,   # the master quotes strikes in paise
+                    option_type=option_type,
+                    lot_size=int(float(row.get('lotsize') or 0))
+                )
+                derivatives.setdefault(contract.underlying, []).append(contract)
+        for contracts in derivatives.values():
+            contracts.sort(key=lambda c: (c.expiry, c.option_type, c.strike))
+        self.equity, self.indices, self.derivatives = equity, indices, derivatives
+        self.loaded_at = time.time()
+
+    def token(self, symbol):
+        """NSE cash token for a symbol (None if unknown)"""
+        return self.equity.get(symbol)
+
+    def underlyings(self):
+        """Names with futures & options on NFO"""
+        return sorted(self.derivatives)
+
+    def expiries(self, underlying):
+        return sorted({c.expiry for c in self.derivatives.get(underlying, ())})
+
+    def contracts(self, underlying, expiry=None, option_type=None):
+        return [
+            c for c in self.derivatives.get(underlying, ())
+            if (expiry is None or c.expiry == expiry) and (option_type is None or c.option_type == option_type)
+        ]
+
+    def near_future(self, underlying, today=None):
+        """Nearest unexpired futures contract (None if there is none)"""
+        today = today or datetime.now().date()
+        for contract in self.derivatives.get(underlying, ()):
+            if contract.option_type == 'FUT' and contract.expiry >= today:
+                return contract
+        return None
@@ -0,0 +1,209 @@
+"""
+NSE SESSION CALENDAR & REFRESH SCHEDULER
+========================================
+Knows the NSE equity/F&O session phases and trading holidays (all times IST):
+
+    pre_open     09:00 - 09:15
+    continuous   09:15 - 15:30
+    closing      15:30 - 15:40   (closing price session)
+    post_close   15:40 - 16:00
+    closed       any other time, weekends and trading holidays
+
+RefreshScheduler polls upstream fast while the market trades, slower around
+the open and close, takes one closing snapshot and then stays idle until the
+next session. Extra holidays can be added with NSE_EXTRA_HOLIDAYS=YYYY-MM-DD,...
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30), 'IST')
+
+PRE_OPEN = (9, 0)
+MARKET_OPEN = (9, 15)
+MARKET_CLOSE = (15, 30)
+CLOSING_END = (15, 40)
+POST_CLOSE_END = (16, 0)
+
+PRE_OPEN_PHASE = 'pre_open'
+CONTINUOUS = 'continuous'
+CLOSING = 'closing'
+POST_CLOSE = 'post_close'
+CLOSED = 'closed'
+
+# Seconds between upstream refreshes per phase; None means frozen (no polling)
+POLL_INTERVALS = {
+    PRE_OPEN_PHASE: 30,
+    CONTINUOUS: int(os.getenv('LIVE_REFRESH_SECONDS', '10')),
+    CLOSING: 30,
+    POST_CLOSE: 120,
+    CLOSED: None
+}
+
+# NSE trading holidays (weekday closures only), per the exchange circulars
+NSE_HOLIDAYS = {
+    # 2025
+    date(2025, 2, 26), date(2025, 3, 14), date(2025, 3, 31), date(2025, 4, 10),
+    date(2025, 4, 14), date(2025, 4, 18), date(2025, 5, 1), date(2025, 8, 15),
+    date(2025, 8, 27), date(2025, 10, 2), date(2025, 10, 21), date(2025, 10, 22),
+    date(2025, 11, 5), date(2025, 12, 25),
+    # 2026
+    date(2026, 1, 15), date(2026, 1, 26), date(2026, 3, 3), date(2026, 3, 26),
+    date(2026, 3, 31), date(2026, 4, 3), date(2026, 4, 14), date(2026, 5, 1),
+    date(2026, 5, 28), date(2026, 6, 26), date(2026, 9, 14), date(2026, 10, 2),
+    date(2026, 10, 20), date(2026, 11, 10), date(2026, 11, 24), date(2026, 12, 25),
+}
+NSE_HOLIDAYS.update(
+    date.fromisoformat(d.strip()) for d in os.getenv('NSE_EXTRA_HOLIDAYS', '').split(',') if d.strip()
+)
+
+
+def now_ist():
+    return datetime.now(IST)
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in NSE_HOLIDAYS
+
+
+def previous_trading_day(day):
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def next_trading_day(day):
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def _at(day, hour_minute):
+    return datetime(day.year, day.month, day.day, *hour_minute, tzinfo=IST)
+
+
+def session_phase(now=None):
+    """Current NSE session phase"""
+    now = now or now_ist()
+    if not is_trading_day(now.date()):
+        return CLOSED
+    hm = (now.hour, now.minute)
+    if PRE_OPEN <= hm < MARKET_OPEN:
+        return PRE_OPEN_PHASE
+    if MARKET_OPEN <= hm < MARKET_CLOSE:
+        return CONTINUOUS
+    if MARKET_CLOSE <= hm < CLOSING_END:
+        return CLOSING
+    if CLOSING_END <= hm < POST_CLOSE_END:
+        return POST_CLOSE
+    return CLOSED
+
+
+def is_market_active(now=None):
+    """True while upstream data can change (pre-open through post-close)"""
+    return session_phase(now) != CLOSED
+
+
+def last_session_day(now=None):
+    """Most recent trading day whose continuous session has started"""
+    now = now or now_ist()
+    today = now.date()
+    if is_trading_day(today) and (now.hour, now.minute) >= MARKET_OPEN:
+        return today
+    return previous_trading_day(today)
+
+
+def last_close_time(now=None):
+    """When the most recently finished session stopped changing (end of post-close)"""
+    now = now or now_ist()
+    today = now.date()
+    if is_trading_day(today) and (now.hour, now.minute) >= POST_CLOSE_END:
+        return _at(today, POST_CLOSE_END)
+    return _at(previous_trading_day(today), POST_CLOSE_END)
+
+
+def next_session_start(now=None):
+    """Start of the next pre-open"""
+    now = now or now_ist()
+    today = now.date()
+    if is_trading_day(today) and (now.hour, now.minute) < PRE_OPEN:
+        return _at(today, PRE_OPEN)
+    return _at(next_trading_day(today), PRE_OPEN)
+
+
+def candle_range(now=None):
+    """(fromdate, todate) for 1-minute candles covering the last two sessions
+
+    Naive IST datetimes as the candle API expects. Unlike "yesterday to
+    today", this still returns data on Mondays and after holidays.
+    """
+    now = now or now_ist()
+    session = last_session_day(now)
+    start = _at(previous_trading_day(session), MARKET_OPEN)
+    end = min(now, _at(session, MARKET_CLOSE))
+    return start.replace(tzinfo=None), end.replace(tzinfo=None)
+
+
+def closing_snapshot_is_current(published_at, now=None):
+    """True if a snapshot taken at `published_at` (epoch) already reflects the last close"""
+    now = now or now_ist()
+    return session_phase(now) == CLOSED and published_at >= last_close_time(now).timestamp()
+
+
+class RefreshScheduler:
+    """Background poller that refreshes the snapshot according to the session phase"""
+
+    def __init__(self, refresh_fn, store, max_idle_sleep=300):
+        self.refresh_fn = refresh_fn
+        self.store = store
+        self.max_idle_sleep = max_idle_sleep
+        self.last_refresh = 0.0
+        self.phase = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='refresh-scheduler', daemon=True)
+        self._thread.start()
+        logger.info("🗓️ Refresh scheduler started")
+
+    def stop(self):
+        self._stop.set()
+
+    def next_delay(self, now=None):
+        """Seconds until the next refresh is due"""
+        now = now or now_ist()
+        self.phase = session_phase(now)
+        interval = POLL_INTERVALS[self.phase]
+        if interval is None:
+            snapshot = self.store.get()
+            if snapshot is None or not closing_snapshot_is_current(snapshot.get('fetched_at', 0), now):
+                # one closing snapshot, then freeze (retry at most once a minute)
+                return max(0.0, self.last_refresh + 60 - time.time())
+            until_open = (next_session_start(now) - now).total_seconds()
+            return max(1.0, min(until_open, self.max_idle_sleep))
+        return max(0.0, self.last_refresh + interval - time.time())
+
+    def _run(self):
+        while not self._stop.is_set():
+            delay = self.next_delay()
+            if delay > 0:
+                self._stop.wait(delay)
+                continue
+            try:
+                self.refresh_fn()
+            except Exception as e:
+                logger.error(f"❌ Scheduled refresh failed: {e}")
+            self.last_refresh = time.time()
+            if self.phase == CLOSED:
+                logger.info("🌙 Market closed, serving frozen closing snapshot until next session")
@@ -5,11 +5,14 @@ Simplified version that will definitely work on Render
 """
 
 import os
-import requests
-import pyotp
 from flask import Flask, render_template_string
 import logging
 from datetime import datetime
+from angel_client import AngelClient
+from deadline import deadline_scope
+from providers import OI, INDEX, ProviderRouter, RestPollingProvider, SimulatorProvider
+from simulator import MarketSimulator
+from tick_pipeline import TickPipeline
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,11 +20,6 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Configuration from environment variables
-API_KEY = os.getenv('ANGEL_API_KEY', 'tKo2xsA5')
-USERNAME = os.getenv('ANGEL_USERNAME', 'C125633')
-PASSWORD = os.getenv('ANGEL_PASSWORD', '4111')
-TOTP_TOKEN = os.getenv('ANGEL_TOTP_TOKEN', 'TZZ2VTRBUWPB33SLOSA3NXSGWA')
 
 # Sample data for fallback
 SAMPLE_NIFTY_DATA = [
@@ -37,6 +35,9 @@ SAMPLE_NIFTY_DATA = [
     {'symbol': 'ITC', 'change': 1.95, 'oi_change': 7000, 'weight': 2.57}
 ]
 
+# Last indicative index levels, shown only when the live print is unavailable
+FALLBACK_SPOTS = {'NIFTY': 25145.75, 'BANKNIFTY': 52380.25}
+
 SAMPLE_BANK_DATA = [
     {'symbol': 'HDFCBANK', 'change': 1.82, 'oi_change': 12000, 'weight': 32.06},
     {'symbol': 'ICICIBANK', 'change': 0.85, 'oi_change': 8000, 'weight': 21.20},
@@ -46,162 +47,45 @@ SAMPLE_BANK_DATA = [
     {'symbol': 'BANKBARODA', 'change': 1.25, 'oi_change': 2000, 'weight': 2.90}
 ]
 
-class SimpleAngelClient:
-    def __init__(self):
-        self.auth_token = None
-        self.authenticated = False
-        self.try_login()
-    
-    def try_login(self):
-        """Try to authenticate with Angel One API"""
-        try:
-            totp = pyotp.TOTP(TOTP_TOKEN).now()
-            
-            login_data = {
-                "clientcode": USERNAME,
-                "password": PASSWORD,
-                "totp": totp
-            }
-            
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'X-UserType': 'USER',
-                'X-SourceID': 'WEB',
-                'X-ClientLocalIP': '192.168.1.1',
-                'X-ClientPublicIP': '192.168.1.1',
-                'X-MACAddress': '00:00:00:00:00:00',
-                'X-PrivateKey': API_KEY
-            }
-            
-            response = requests.post(
-                "https://apiconnect.angelone.in/rest/auth/angelbroking/user/v1/loginByPassword",
-                json=login_data,
-                headers=headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('status'):
-                    self.auth_token = data['data']['jwtToken']
-                    self.authenticated = True
-                    logger.info("✅ Angel One login successful")
-                    return True
-            
-            logger.warning("⚠️ Angel One login failed, using sample data")
-            return False
-        except Exception as e:
-            logger.warning(f"⚠️ Angel One connection failed: {e}, using sample data")
-            return False
-    
-    def get_market_data(self):
-        """Get market data (real or sample)"""
-        if self.authenticated:
-            try:
-                # Try to get real data
-                return self.fetch_real_data()
-            except:
-                logger.warning("⚠️ Real data fetch failed, using sample data")
-                return self.get_sample_data()
-        else:
-            return self.get_sample_data()
-    
-    def fetch_real_data(self):
-        """Fetch real data from Angel One API"""
-        headers = {
-            'Authorization': f'Bearer {self.auth_token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'X-UserType': 'USER',
-            'X-SourceID': 'WEB',
-            'X-PrivateKey': API_KEY
-        }
-        
-        # Get OI gainers
-        response = requests.post(
-            "https://apiconnect.angelone.in/rest/secure/angelbroking/marketData/v1/gainersLosers",
-            json={"datatype": "PercOIGainers", "expirytype": "NEAR"},
-            headers=headers,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('status'):
-                real_data = data.get('data', [])[:10]
-                logger.info(f"✅ Fetched {len(real_data)} real market records")
-                return self.process_real_data(real_data)
-        
-        return self.get_sample_data()
-    
-    def process_real_data(self, raw_data):
-        """Process real API data"""
-        nifty_data = []
-        bank_data = []
-        
-        # Define key stocks to look for
-        nifty_symbols = ['RELIANCE', 'HDFCBANK', 'TCS', 'BHARTIARTL', 'ICICIBANK', 'SBIN', 'BAJFINANCE', 'INFY']
-        bank_symbols = ['HDFCBANK', 'ICICIBANK', 'SBIN', 'KOTAKBANK', 'AXISBANK']
-        
-        for item in raw_data:
-            symbol = item.get('tradingSymbol', '').upper()
-            
-            # Check if it's a NIFTY stock
-            for nifty_symbol in nifty_symbols:
-                if nifty_symbol in symbol:
-                    nifty_data.append({
-                        'symbol': nifty_symbol,
-                        'change': item.get('percentChange', 0),
-                        'oi_change': item.get('netChangeOpnInterest', 0),
-                        'weight': self.get_weight(nifty_symbol, 'nifty')
-                    })
-                    break
-            
-            # Check if it's a Bank NIFTY stock
-            for bank_symbol in bank_symbols:
-                if bank_symbol in symbol:
-                    bank_data.append({
-                        'symbol': bank_symbol,
-                        'change': item.get('percentChange', 0),
-                        'oi_change': item.get('netChangeOpnInterest', 0),
-                        'weight': self.get_weight(bank_symbol, 'bank')
-                    })
-                    break
-        
-        # If we don't have enough real data, supplement with sample data
-        if len(nifty_data) < 5:
-            nifty_data.extend(SAMPLE_NIFTY_DATA[:10-len(nifty_data)])
-        
-        if len(bank_data) < 3:
-            bank_data.extend(SAMPLE_BANK_DATA[:6-len(bank_data)])
-        
-        return {
-            'nifty_data': nifty_data[:10],
-            'bank_data': bank_data[:6],
-            'data_source': 'Real + Sample' if len(raw_data) > 0 else 'Sample',
-            'timestamp': datetime.now().strftime("%H:%M:%S")
-        }
+# Same data providers as the main dashboard: Angel One REST when it answers,
+# otherwise the seeded simulator
+tick_pipeline = TickPipeline()
+market_router = ProviderRouter([
+    RestPollingProvider(AngelClient()),
+    SimulatorProvider(
+        MarketSimulator(
+            seed=int(os.getenv('SIMULATOR_SEED', '42')),
+            universe=sorted({s['symbol'] for s in SAMPLE_NIFTY_DATA + SAMPLE_BANK_DATA})
+        ),
+        tick_pipeline
+    )
+])
+
+# Latency budget for one page load
+REFRESH_DEADLINE = float(os.getenv('REFRESH_DEADLINE_MS', '1000')) / 1000
+
+def get_market_data():
+    """Sample rows updated with change and OI change from the best available provider"""
+    symbols = sorted({s['symbol'] for s in SAMPLE_NIFTY_DATA + SAMPLE_BANK_DATA})
+    with deadline_scope(REFRESH_DEADLINE):
+        oi_data, provider = market_router.fetch(OI, symbols)
+        index_spots = market_router.fetch(INDEX, live_only=True)[0] or {}
+    oi_data = oi_data or {}
     
-    def get_weight(self, symbol, index_type):
-        """Get stock weightage"""
-        if index_type == 'nifty':
-            weights = {'RELIANCE': 9.37, 'HDFCBANK': 7.50, 'TCS': 5.33, 'BHARTIARTL': 5.76, 
-                      'ICICIBANK': 4.96, 'SBIN': 4.03, 'BAJFINANCE': 3.11, 'INFY': 3.04}
-        else:
-            weights = {'HDFCBANK': 32.06, 'ICICIBANK': 21.20, 'SBIN': 17.24, 
-                      'KOTAKBANK': 8.87, 'AXISBANK': 7.78}
-        
-        return weights.get(symbol, 1.0)
+    if provider is not None and provider.live:
+        data_source = f"Real + Sample ({len(oi_data)}/{len(symbols)} live)"
+    elif provider is not None:
+        data_source = 'Sample Data (Simulated)'
+    else:
+        data_source = 'Sample Data'
     
-    def get_sample_data(self):
-        """Return sample data"""
-        return {
-            'nifty_data': SAMPLE_NIFTY_DATA,
-            'bank_data': SAMPLE_BANK_DATA,
-            'data_source': 'Sample Data',
-            'timestamp': datetime.now().strftime("%H:%M:%S")
-        }
+    return {
+        'nifty_data': [dict(row, **oi_data.get(row['symbol'], {})) for row in SAMPLE_NIFTY_DATA],
+        'bank_data': [dict(row, **oi_data.get(row['symbol'], {})) for row in SAMPLE_BANK_DATA],
+        'index_spots': index_spots,
+        'data_source': data_source,
+        'timestamp': datetime.now().strftime("%H:%M:%S")
+    }
 
 def calculate_impact(data):
     """Calculate weighted impact"""
@@ -233,16 +117,18 @@ def mobile_dashboard():
     
     try:
         # Get market data
-        client = SimpleAngelClient()
-        market_data = client.get_market_data()
+        market_data = get_market_data()
         
         # Calculate impacts
         nifty_impact = calculate_impact(market_data['nifty_data'])
         bank_impact = calculate_impact(market_data['bank_data'])
         
-        # Mock index values
-        nifty_spot = 25145.75
-        banknifty_spot = 52380.25
+        # Live index levels, indicative values if the print is unavailable
+        index_spots = market_data['index_spots']
+        nifty_spot = index_spots.get('NIFTY', FALLBACK_SPOTS['NIFTY'])
+        banknifty_spot = index_spots.get('BANKNIFTY', FALLBACK_SPOTS['BANKNIFTY'])
+        nifty_spot_label = 'Live Index' if 'NIFTY' in index_spots else 'Indicative'
+        banknifty_spot_label = 'Live Index' if 'BANKNIFTY' in index_spots else 'Indicative'
         
     except Exception as e:
         logger.error(f"Dashboard error: {str(e)}")
@@ -255,8 +141,9 @@ def mobile_dashboard():
         }
         nifty_impact = calculate_impact(SAMPLE_NIFTY_DATA)
         bank_impact = calculate_impact(SAMPLE_BANK_DATA)
-        nifty_spot = 25145.75
-        banknifty_spot = 52380.25
+        nifty_spot = FALLBACK_SPOTS['NIFTY']
+        banknifty_spot = FALLBACK_SPOTS['BANKNIFTY']
+        nifty_spot_label = banknifty_spot_label = 'Indicative'
 
     # Simple mobile template
     template = """
@@ -345,14 +232,14 @@ def mobile_dashboard():
                 <div class="index-card">
                     <h5>📈 NIFTY 50</h5>
                     <h2>{{ "%.2f"|format(nifty_spot) }}</h2>
-                    <small>Live Index</small>
+                    <small>{{ nifty_spot_label }}</small>
                 </div>
             </div>
             <div class="col-6">
                 <div class="index-card">
                     <h5>🏦 Bank NIFTY</h5>
                     <h2>{{ "%.2f"|format(banknifty_spot) }}</h2>
-                    <small>Live Index</small>
+                    <small>{{ banknifty_spot_label }}</small>
                 </div>
             </div>
         </div>
@@ -465,7 +352,9 @@ def mobile_dashboard():
         nifty_impact=nifty_impact,
         bank_impact=bank_impact,
         nifty_spot=nifty_spot,
-        banknifty_spot=banknifty_spot
+        banknifty_spot=banknifty_spot,
+        nifty_spot_label=nifty_spot_label,
+        banknifty_spot_label=banknifty_spot_label
     )
 
 if __name__ == '__main__':
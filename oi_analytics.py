@@ -0,0 +1,199 @@
+"""
+OPTION OI ANALYTICS
+===================
+Per-expiry open-interest analytics on option-chain arrays:
+
+    max pain      settlement price that minimises the total payout to option
+                  holders
+    OI walls      strikes with the largest call OI (resistance) and put OI
+                  (support), with their share of the side's total
+    OI heatmap    change in call/put OI per strike since the session's first
+                  chain, around the money
+
+Max pain uses cumulative sums rather than the O(strikes^2) payoff matrix:
+settling at strike K_j, the calls below it pay K_j * sum(oi) - sum(oi * K)
+and the puts above it pay the mirror image. Each (underlying, expiry) keeps
+its payout curve and a chain version that moves only when OI changes; an
+unchanged chain is a cache hit, and a chain where only a few strikes moved
+updates the curve with those strikes' payoffs instead of recomputing it.
+"""
+
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from market_calendar import IST
+
+WALLS = 3                 # strikes reported per side
+HEATMAP_STRIKES = 10      # strikes each side of ATM in the heatmap
+INCREMENTAL_MAX = 0.125   # update in place when at most this share of strikes changed
+
+
+def payout_curve(strikes, call_oi, put_oi):
+    """Total payout to option holders if the underlying settles at each strike (strikes ascending)"""
+    call_below = np.cumsum(call_oi) - call_oi                    # OI of calls struck strictly below K_j
+    call_value_below = np.cumsum(call_oi * strikes) - call_oi * strikes
+    put_above = put_oi.sum() - np.cumsum(put_oi)                 # OI of puts struck strictly above K_j
+    put_value_above = (put_oi * strikes).sum() - np.cumsum(put_oi * strikes)
+    return (strikes * call_below - call_value_below) + (put_value_above - strikes * put_above)
+
+
+def payout_delta(strikes, changed, call_change, put_change):
+    """Change of the payout curve when only the `changed` strikes' OI moved"""
+    moneyness = strikes[:, None] - strikes[changed][None, :]
+    return np.maximum(moneyness, 0) @ call_change + np.maximum(-moneyness, 0) @ put_change
+
+
+def oi_walls(strikes, oi, count=WALLS):
+    """Largest-OI strikes, biggest first, with their share of the total"""
+    if oi.size == 0:
+        return []
+    count = min(count, oi.size)
+    top = np.argpartition(oi, -count)[-count:]
+    top = top[np.argsort(oi[top])[::-1]]
+    total = oi.sum()
+    return [
+        {'strike': float(strikes[i]), 'oi': int(oi[i]), 'share': round(float(oi[i] / total), 4) if total else 0.0}
+        for i in top
+    ]
+
+
+class _ExpiryState:
+    """Arrays and cached result for one (underlying, expiry)"""
+
+    def __init__(self, strikes, call_oi, put_oi, day):
+        self.strikes = strikes
+        self.call_oi = call_oi
+        self.put_oi = put_oi
+        self.base_call = call_oi
+        self.base_put = put_oi
+        self.day = day
+        self.payout = payout_curve(strikes, call_oi, put_oi)
+        self.version = 1
+        self.result = None
+
+
+class OIAnalytics:
+    def __init__(self, walls=WALLS, heatmap_strikes=HEATMAP_STRIKES):
+        self.walls = walls
+        self.heatmap_strikes = heatmap_strikes
+        self._states = {}
+        self.stats = {'hits': 0, 'incremental': 0, 'full': 0}
+        # the producer updates while request threads read results()
+        self._lock = threading.Lock()
+
+    def update(self, chain):
+        """Analytics for one chain, recomputed only where its OI changed"""
+        with self._lock:
+            return self._update(chain)
+
+    def _update(self, chain):
+        rows = sorted(chain['rows'], key=lambda r: r['strike'])
+        strikes = np.array([r['strike'] for r in rows], dtype=float)
+        call_oi = np.array([r.get('call_oi') or 0 for r in rows], dtype=float)
+        put_oi = np.array([r.get('put_oi') or 0 for r in rows], dtype=float)
+        key = (chain['symbol'], chain['expiry'])
+        day = datetime.now(IST).date()
+
+        state = self._states.get(key)
+        if state is None or state.day != day:
+            state = self._states[key] = _ExpiryState(strikes, call_oi, put_oi, day)
+            self.stats['full'] += 1
+        elif not np.array_equal(state.strikes, strikes):
+            # strikes were listed or dropped: rebuild, keeping the session baseline per strike
+            base_call = dict(zip(state.strikes.tolist(), state.base_call.tolist()))
+            base_put = dict(zip(state.strikes.tolist(), state.base_put.tolist()))
+            previous = state
+            state = self._states[key] = _ExpiryState(strikes, call_oi, put_oi, day)
+            state.base_call = np.array([base_call.get(k, c) for k, c in zip(strikes.tolist(), call_oi.tolist())])
+            state.base_put = np.array([base_put.get(k, p) for k, p in zip(strikes.tolist(), put_oi.tolist())])
+            state.version = previous.version + 1
+            self.stats['full'] += 1
+        else:
+            call_change = call_oi - state.call_oi
+            put_change = put_oi - state.put_oi
+            changed = np.nonzero((call_change != 0) | (put_change != 0))[0]
+            if changed.size == 0:
+                # same chain version; only the spot (heatmap window) can have moved
+                self.stats['hits'] += 1
+                if state.result is None or state.result['spot'] != chain.get('spot'):
+                    state.result = self._result(chain, state)
+                return state.result
+            if changed.size <= INCREMENTAL_MAX * strikes.size:
+                state.payout = state.payout + payout_delta(strikes, changed, call_change[changed], put_change[changed])
+                self.stats['incremental'] += 1
+            else:
+                state.payout = payout_curve(strikes, call_oi, put_oi)
+                self.stats['full'] += 1
+            state.call_oi, state.put_oi = call_oi, put_oi
+            state.version += 1
+
+        state.result = self._result(chain, state)
+        return state.result
+
+    def update_many(self, chains):
+        """Update every chain of a refresh and forget expiries that have expired
+
+        Expiries missing from this refresh (e.g. a chain that missed the
+        deadline) keep their state and session baseline until they are
+        fetched again.
+        """
+        chains = [chain for chain in chains if chain and chain.get('rows')]
+        current = {(chain['symbol'], chain['expiry']) for chain in chains}
+        today = datetime.now(IST).date()
+        with self._lock:
+            results = [self._update(chain) for chain in chains]
+            for key in set(self._states) - current:
+                if _expiry_date(key[1]).date() < today:
+                    del self._states[key]
+        return results
+
+    def _result(self, chain, state):
+        strikes = state.strikes
+        max_pain = int(np.argmin(state.payout))
+        spot = chain.get('spot') or strikes[max_pain]
+        atm = int(np.argmin(np.abs(strikes - spot)))
+        window = slice(max(atm - self.heatmap_strikes, 0), atm + self.heatmap_strikes + 1)
+        call_total, put_total = state.call_oi.sum(), state.put_oi.sum()
+        return {
+            'symbol': chain['symbol'],
+            'expiry': chain['expiry'],
+            'version': state.version,
+            'spot': chain.get('spot'),
+            'max_pain': float(strikes[max_pain]),
+            'pcr': round(float(put_total / call_total), 2) if call_total else None,
+            'resistance': oi_walls(strikes, state.call_oi, self.walls),
+            'support': oi_walls(strikes, state.put_oi, self.walls),
+            'heatmap': {
+                'strikes': strikes[window].tolist(),
+                'call_oi_change': (state.call_oi - state.base_call)[window].astype(int).tolist(),
+                'put_oi_change': (state.put_oi - state.base_put)[window].astype(int).tolist()
+            }
+        }
+
+    def results(self):
+        with self._lock:
+            return [s.result for s in self._states.values() if s.result is not None]
+
+    def get(self, symbol):
+        return for_symbol(self.results(), symbol)
+
+    def nearest(self, symbol):
+        """Headline numbers for the nearest expiry (None if not computed)"""
+        results = self.get(symbol)
+        if not results:
+            return None
+        return {k: results[0][k] for k in ('expiry', 'max_pain', 'pcr', 'resistance', 'support')}
+
+
+def for_symbol(results, symbol):
+    """Analytics of one underlying, nearest expiry first"""
+    return sorted((r for r in results if r['symbol'] == symbol), key=lambda r: _expiry_date(r['expiry']))
+
+
+def _expiry_date(expiry):
+    try:
+        return datetime.strptime(expiry, '%d%b%Y')
+    except (TypeError, ValueError):
+        return datetime.max
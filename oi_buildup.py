@@ -0,0 +1,94 @@
+"""
+F&O OI BUILD-UP CLASSIFIER
+==========================
+Classifies every F&O underlying from its near-month futures price and OI:
+
+                    OI up             OI down
+    price up        long build-up     short covering
+    price down      short build-up    long unwinding
+
+Moves smaller than the thresholds are neutral. The price move is the change
+from the previous close; the OI move is against the previous day's OI when
+the source reports it, else against the first OI seen this session.
+
+The whole universe is one set of NumPy arrays per refresh: the quadrant is a
+vectorized select and each class is ranked by OI change % (then by the size
+of the price move) with a single lexsort.
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+from market_calendar import IST
+
+LONG_BUILDUP = 'long_buildup'
+SHORT_BUILDUP = 'short_buildup'
+LONG_UNWINDING = 'long_unwinding'
+SHORT_COVERING = 'short_covering'
+NEUTRAL = 'neutral'
+CLASSES = (LONG_BUILDUP, SHORT_BUILDUP, SHORT_COVERING, LONG_UNWINDING, NEUTRAL)
+
+PRICE_THRESHOLD = 0.1     # % price change below which a move is neutral
+OI_THRESHOLD = 0.5        # % OI change below which a move is neutral
+
+
+def classify(price_change, oi_change, price_threshold=PRICE_THRESHOLD, oi_threshold=OI_THRESHOLD):
+    """Build-up class per element of price change % and OI change % arrays"""
+    price_up, price_down = price_change >= price_threshold, price_change <= -price_threshold
+    oi_up, oi_down = oi_change >= oi_threshold, oi_change <= -oi_threshold
+    return np.select(
+        [price_up & oi_up, price_down & oi_up, price_up & oi_down, price_down & oi_down],
+        [LONG_BUILDUP, SHORT_BUILDUP, SHORT_COVERING, LONG_UNWINDING],
+        default=NEUTRAL
+    )
+
+
+class OIBuildup:
+    def __init__(self, price_threshold=PRICE_THRESHOLD, oi_threshold=OI_THRESHOLD):
+        self.price_threshold = price_threshold
+        self.oi_threshold = oi_threshold
+        self._baseline = {}
+        self._baseline_day = None
+
+    def update(self, quotes):
+        """Ranked build-up table from {symbol: {'price', 'change', 'oi', 'prev_oi'?}}"""
+        started = time.perf_counter()
+        day = datetime.now(IST).date()
+        if day != self._baseline_day:
+            self._baseline, self._baseline_day = {}, day
+
+        symbols = [s for s, q in quotes.items() if q.get('oi') and q.get('price') is not None]
+        for symbol in symbols:
+            quote = quotes[symbol]
+            if quote.get('prev_oi'):
+                self._baseline[symbol] = quote['prev_oi']
+            else:
+                self._baseline.setdefault(symbol, quote['oi'])
+
+        price = np.array([quotes[s]['price'] for s in symbols], dtype=float)
+        price_change = np.array([quotes[s].get('change') or 0 for s in symbols], dtype=float)
+        oi = np.array([quotes[s]['oi'] for s in symbols], dtype=float)
+        baseline = np.array([self._baseline[s] for s in symbols], dtype=float)
+        oi_change = (oi / baseline - 1) * 100 if symbols else oi
+        labels = classify(price_change, oi_change, self.price_threshold, self.oi_threshold)
+
+        # strongest OI move first, ties broken by the bigger price move
+        order = np.lexsort((-np.abs(price_change), -np.abs(oi_change)))
+        table = {name: [] for name in CLASSES}
+        for i in order.tolist():
+            table[labels[i]].append({
+                'symbol': symbols[i],
+                'price': round(float(price[i]), 2),
+                'change': round(float(price_change[i]), 2),
+                'oi': int(oi[i]),
+                'oi_change': int(oi[i] - baseline[i]),
+                'oi_change_pct': round(float(oi_change[i]), 2)
+            })
+        return {
+            'counts': {name: len(rows) for name, rows in table.items()},
+            'table': table,
+            'symbols': len(symbols),
+            'seconds': round(time.perf_counter() - started, 4)
+        }
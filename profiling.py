@@ -0,0 +1,232 @@
+"""
+REQUEST PROFILING
+=================
+Opt-in sampling profiles of single requests, to see where a slow request
+spends its time without profiling every request:
+
+    PROFILE_SAMPLE_RATE   share of requests profiled (0.0 - 1.0, default 0)
+    PROFILE_TOKEN         requests sending `X-Profile: <token>` are always profiled
+    PROFILE_SLOW_MS       sampled requests faster than this are discarded
+
+A profiled request registers its thread with one sampler thread per process,
+which reads the thread's stack every PROFILE_INTERVAL seconds from
+sys._current_frames(). The request runs without tracing hooks, and with no
+profiled request in flight the sampler sleeps. Named spans (fetch, compute,
+render) time the phases of a request and prefix the stacks sampled in them.
+
+Profiles go to PROFILE_DIR as collapsed stacks ("frame;frame;frame count"
+per line, the input of flamegraph.pl, speedscope and inferno) with a JSON
+summary next to each; only the newest PROFILE_KEEP are kept.
+"""
+
+import hmac
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'bounce-back-profiles'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '500'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000
+PROFILE_HEADER = 'X-Profile'
+MAX_DEPTH = 128
+TOP_FRAMES = 5
+
+# profiles in flight by thread id, read by the sampler thread and span()
+_active = {}
+
+
+class Profile:
+    """Stack samples and span timings of one request"""
+
+    def __init__(self, profile_id, method, path, forced):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.forced = forced
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.stacks = Counter()
+        self.spans = {}
+        self.open_spans = []
+
+    def sample(self, frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+            frame = frame.f_back
+        stack.extend(f"[{name}]" for name in reversed(self.open_spans))
+        self.stacks[';'.join(reversed(stack))] += 1
+
+    def add_span(self, name, seconds):
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + seconds, count + 1)
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self):
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'forced': self.forced,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 1) if self.duration is not None else None,
+            'samples': sum(self.stacks.values()),
+            'interval_ms': PROFILE_INTERVAL * 1000,
+            'spans': {name: {'ms': round(total * 1000, 1), 'count': count} for name, (total, count) in self.spans.items()},
+            'top_frames': leaves.most_common(TOP_FRAMES)
+        }
+
+
+@contextmanager
+def span(name):
+    """Time a phase of the current request if it is being profiled (a no-op otherwise)"""
+    profile = _active.get(threading.get_ident())
+    if profile is None:
+        yield
+        return
+    profile.open_spans.append(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.open_spans.pop()
+        profile.add_span(name, time.perf_counter() - started)
+
+
+class RequestProfiler:
+    def __init__(self, directory=PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE, token=PROFILE_TOKEN,
+                 slow_ms=PROFILE_SLOW_MS, keep=PROFILE_KEEP, interval=PROFILE_INTERVAL):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.slow_ms = slow_ms
+        self.keep = keep
+        self.interval = interval
+        self.written = 0
+        self._ids = itertools.count(1)
+        self._wake = threading.Event()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 or bool(self.token)
+
+    def authorized(self, headers):
+        """True if the request carries the profiling token"""
+        return bool(self.token) and hmac.compare_digest(headers.get(PROFILE_HEADER, ''), self.token)
+
+    def start(self, method, path, headers):
+        """Profile for this request if it carries the token or is sampled, else None"""
+        forced = self.authorized(headers)
+        if not forced and not (self.sample_rate > 0 and random.random() < self.sample_rate):
+            return None
+        self._ensure_sampler()
+        profile = Profile(f"{int(time.time() * 1000)}-{os.getpid()}-{next(self._ids)}", method, path, forced)
+        _active[threading.get_ident()] = profile
+        self._wake.set()
+        return profile
+
+    def stop(self, profile, status=None):
+        """Stop sampling and write the profile if it was requested or slow; returns the summary or None"""
+        _active.pop(threading.get_ident(), None)
+        profile.duration = time.perf_counter() - profile.started
+        profile.status = status
+        if not profile.forced and profile.duration * 1000 < self.slow_ms:
+            return None
+        summary = profile.summary()
+        try:
+            self._write(profile, summary)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not write profile {profile.id}: {e}")
+            return None
+        logger.info(f"🔬 Profiled {profile.method} {profile.path}: {summary['duration_ms']}ms, "
+                    f"{summary['samples']} samples -> {profile.id}")
+        return summary
+
+    def _ensure_sampler(self):
+        # threads do not survive a fork, so each worker process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, name='profile-sampler', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            if not _active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            for thread_id, profile in list(_active.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    profile.sample(frame)
+            del frames
+            time.sleep(self.interval)
+
+    def _write(self, profile, summary):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile.id)
+        with open(f"{base}.folded", 'w') as f:
+            f.write(profile.folded())
+        with open(f"{base}.json", 'w') as f:
+            json.dump(summary, f)
+        self.written += 1
+        for stale in self._ids_on_disk()[self.keep:]:
+            for suffix in ('.json', '.folded'):
+                try:
+                    os.remove(os.path.join(self.directory, stale + suffix))
+                except OSError:
+                    pass
+
+    def _ids_on_disk(self):
+        """Profile ids in the directory, newest first (shared by every worker)"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        ids = [name[:-5] for name in names if name.endswith('.json') and name[:-5].replace('-', '').isdigit()]
+        return sorted(ids, key=lambda i: tuple(int(part) for part in i.split('-')), reverse=True)
+
+    def recent(self, limit=None):
+        """Summaries of the written profiles, newest first"""
+        summaries = []
+        for profile_id in self._ids_on_disk()[:limit]:
+            try:
+                with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return summaries
+
+    def folded(self, profile_id):
+        """Collapsed stacks of one profile (None if unknown)"""
+        if profile_id not in self._ids_on_disk():
+            return None
+        with open(os.path.join(self.directory, f"{profile_id}.folded")) as f:
+            return f.read()
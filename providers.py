@@ -0,0 +1,285 @@
+"""
+MARKET DATA PROVIDERS
+=====================
+One interface over every source of market data, and a router that picks a
+source per data type:
+
+    RestPollingProvider   Angel One SmartAPI over REST (live)
+    ReplayProvider        recorded tick batches from a JSONL file
+    SimulatorProvider     the seeded market simulator
+
+Each provider declares the data types it can serve (LTP, OHLC, OI, CHAIN,
+INDEX, FUTURES) and an expected latency. ProviderRouter ranks the available providers
+for a data type, live sources first and then by observed latency, and fails
+over to the next one when a provider raises or returns nothing. Callers pass
+live_only=True while a live source is up, so simulated or replayed data (and
+the ticks those providers publish) never mixes into a live session.
+"""
+
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LTP = 'ltp'          # {symbol: last price}
+OHLC = 'ohlc'        # [[timestamp, open, high, low, close, volume], ...] for one symbol
+OI = 'oi'            # {symbol: {'change', 'oi_change', 'pcr_ratio'?}}
+CHAIN = 'chain'      # {'symbol', 'expiry', 'spot'?, 'rows': [{'strike', ...}]} for one underlying
+INDEX = 'index'      # {'NIFTY': level, 'BANKNIFTY': level}
+FUTURES = 'futures'  # {underlying: {'price', 'change', 'oi', 'prev_oi'?}} near-month futures
+
+METHODS = {
+    LTP: 'get_ltp',
+    OHLC: 'get_candles',
+    OI: 'get_oi',
+    CHAIN: 'get_option_chain',
+    INDEX: 'get_index_spots',
+    FUTURES: 'get_futures'
+}
+
+
+class MarketDataProvider:
+    """Base provider; subclasses implement the getters for their capabilities"""
+
+    name = 'provider'
+    capabilities = frozenset()
+    latency = 1.0             # expected seconds per call, refined by the router
+    live = True               # False for simulated or recorded data
+    feeds_pipeline = False    # True if the provider publishes its own ticks
+
+    def is_available(self):
+        return True
+
+    def get_ltp(self, symbols):
+        raise NotImplementedError
+
+    def get_candles(self, symbol):
+        raise NotImplementedError
+
+    def get_oi(self, symbols):
+        raise NotImplementedError
+
+    def get_option_chain(self, symbol, expiry=None):
+        raise NotImplementedError
+
+    def get_index_spots(self):
+        raise NotImplementedError
+
+    def get_futures(self, symbols):
+        raise NotImplementedError
+
+
+class RestPollingProvider(MarketDataProvider):
+    name = 'angel_rest'
+    capabilities = frozenset({LTP, OHLC, OI, CHAIN, INDEX, FUTURES})
+    latency = 0.3
+
+    def __init__(self, client):
+        self.client = client
+
+    def is_available(self):
+        return self.client.ensure_session()
+
+    def get_ltp(self, symbols):
+        return self.client.get_live_equity_prices(symbols)
+
+    def get_candles(self, symbol):
+        return self.client.fetch_candles(symbol) or []
+
+    def get_oi(self, symbols):
+        return self.client.get_oi_movers(set(symbols))
+
+    def get_option_chain(self, symbol, expiry=None):
+        """Quoted chain from the instrument master, else optionGreek rows folded per strike (requires an expiry, DDMMMYYYY)"""
+        if expiry is None:
+            return None
+        chain = self.client.get_option_chain(symbol, expiry)
+        if chain:
+            return chain
+        strikes = {}
+        for item in self.client.get_option_greeks(symbol, expiry):
+            strike = float(item['strikePrice'])
+            side = 'call' if item.get('optionType') == 'CE' else 'put'
+            row = strikes.setdefault(strike, {'strike': strike})
+            row[f"{side}_iv"] = float(item.get('impliedVolatility') or 0) / 100
+            row[f"{side}_delta"] = float(item.get('delta') or 0)
+            row[f"{side}_volume"] = float(item.get('tradeVolume') or 0)
+        if not strikes:
+            return None
+        return {'symbol': symbol, 'expiry': expiry, 'rows': [strikes[k] for k in sorted(strikes)]}
+
+    def get_index_spots(self):
+        return self.client.get_index_spots()
+
+    def get_futures(self, symbols):
+        return self.client.get_futures_quotes(symbols)
+
+
+class SimulatorProvider(MarketDataProvider):
+    """Simulated market, advanced one step per poll (at most once per `min_interval` seconds)
+
+    Symbols the simulator does not know yet (e.g. from a new watchlist) join
+    its universe the first time they are asked for.
+    """
+
+    name = 'simulator'
+    capabilities = frozenset({LTP, OI, CHAIN, FUTURES})
+    latency = 0.0
+    live = False
+    feeds_pipeline = True
+
+    def __init__(self, simulator, pipeline, min_interval=1.0):
+        self.simulator = simulator
+        self.pipeline = pipeline
+        self.min_interval = min_interval
+        self.last_step = 0.0
+        self._lock = threading.Lock()
+
+    def _advance(self, symbols=()):
+        # one refresh asks for quotes and OI; both see the same step
+        added = self.simulator.add_symbols(symbols)
+        if added:
+            logger.info(f"🎲 Simulating {len(added)} new symbols")
+        now = time.time()
+        if now - self.last_step >= self.min_interval:
+            self.pipeline.publish_many(self.simulator.step(now=now))
+            self.last_step = now
+
+    def get_ltp(self, symbols):
+        with self._lock:
+            self._advance(symbols)
+            prices = self.simulator.prices
+            return {s: round(prices[s], 2) for s in symbols if s in prices}
+
+    def get_oi(self, symbols):
+        with self._lock:
+            self._advance(symbols)
+            known = self.simulator.prices
+            return {s: oi_fields(self.simulator.row(s)) for s in symbols if s in known}
+
+    def get_futures(self, symbols):
+        with self._lock:
+            self._advance(symbols)
+            sim = self.simulator
+            return {
+                s: {'price': round(sim.prices[s], 2), 'change': sim.row(s)['change'],
+                    'oi': sim.oi[s], 'prev_oi': sim.day_open_oi[s]}
+                for s in symbols if s in sim.prices
+            }
+
+    def get_option_chain(self, symbol, expiry=None):
+        if symbol not in self.simulator.prices:
+            return None
+        with self._lock:
+            return self.simulator.option_chain(symbol)
+
+
+class ReplayProvider(MarketDataProvider):
+    """Recorded tick batches (one JSON list of ticks per line), replayed in a loop"""
+
+    name = 'replay'
+    capabilities = frozenset({LTP, OI})
+    latency = 0.0
+    live = False
+    feeds_pipeline = True
+
+    def __init__(self, path, pipeline):
+        self.path = path
+        self.pipeline = pipeline
+        self.position = 0
+        self._latest = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.batches = [json.loads(line) for line in f if line.strip()]
+            logger.info(f"📼 Loaded {len(self.batches)} tick batches from {path}")
+        except Exception as e:
+            logger.error(f"❌ Could not load replay file {path}: {e}")
+            self.batches = []
+
+    def is_available(self):
+        return bool(self.batches)
+
+    def get_ltp(self, symbols):
+        with self._lock:
+            batch = self.batches[self.position % len(self.batches)]
+            self.position += 1
+            now = time.time()
+            ticks = [dict(tick, ts=now) for tick in batch]
+            self.pipeline.publish_many(ticks)
+            for tick in ticks:
+                self._latest[tick['symbol']] = tick
+        return {s: self._latest[s]['price'] for s in symbols if self._latest.get(s, {}).get('price') is not None}
+
+    def get_oi(self, symbols):
+        return {s: oi_fields(self._latest[s]) for s in symbols if s in self._latest}
+
+
+def oi_fields(tick):
+    """The OI-type fields of a tick or row"""
+    return {k: tick[k] for k in ('change', 'oi_change', 'pcr_ratio') if tick.get(k) is not None}
+
+
+class ProviderRouter:
+    def __init__(self, providers, smoothing=0.2):
+        self.providers = list(providers)
+        self.smoothing = smoothing
+        self._latency = {p.name: p.latency for p in self.providers}
+        self._stats = {p.name: {'calls': 0, 'failures': 0, 'empty': 0} for p in self.providers}
+        self.served_by = {}
+
+    def candidates(self, capability, live_only=False):
+        """Providers that can serve a data type, best first (live before simulated, then fastest)"""
+        ranked = [p for p in self.providers
+                  if capability in p.capabilities and (p.live or not live_only)]
+        ranked.sort(key=lambda p: (not p.live, self._latency[p.name]))
+        return ranked
+
+    def live_available(self, capability):
+        """True if a live provider for the data type is up (e.g. a healthy credential)"""
+        for provider in self.candidates(capability, live_only=True):
+            try:
+                if provider.is_available():
+                    return True
+            except Exception as e:
+                logger.warning(f"🔀 {provider.name} availability check failed: {e}")
+        return False
+
+    def fetch(self, capability, *args, live_only=False):
+        """(data, provider) from the best provider that returns data, (None, None) if none can"""
+        for provider in self.candidates(capability, live_only):
+            stats = self._stats[provider.name]
+            try:
+                if not provider.is_available():
+                    continue
+                started = time.time()
+                stats['calls'] += 1
+                data = getattr(provider, METHODS[capability])(*args)
+                self._observe(provider, time.time() - started)
+            except Exception as e:
+                stats['failures'] += 1
+                logger.warning(f"🔀 {provider.name} failed for {capability}: {e}, failing over")
+                continue
+            if data:
+                self.served_by[capability] = provider.name
+                return data, provider
+            stats['empty'] += 1
+            logger.info(f"🔀 {provider.name} had no {capability} data, failing over")
+        self.served_by[capability] = None
+        return None, None
+
+    def _observe(self, provider, seconds):
+        previous = self._latency[provider.name]
+        self._latency[provider.name] = previous + self.smoothing * (seconds - previous)
+
+    def status(self):
+        return {
+            'providers': [
+                dict(self._stats[p.name], name=p.name, live=p.live, capabilities=sorted(p.capabilities),
+                     latency_ms=round(self._latency[p.name] * 1000, 1))
+                for p in self.providers
+            ],
+            'served_by': dict(self.served_by)
+        }
@@ -0,0 +1,73 @@
+"""
+RATE LIMITERS
+=============
+Token buckets: `rate` tokens are added per second up to `capacity`, and a
+call goes ahead only if it can take a token. Buckets are process-wide per
+name, like the circuit breakers, so /debug can report their state.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.total_allowed = 0
+        self.total_rejected = 0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; never waits"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                self.total_allowed += 1
+                return True
+            self.total_rejected += 1
+            return False
+
+    def retry_after(self, tokens=1):
+        """Seconds until `tokens` will be available"""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self.tokens) / self.rate) if self.rate > 0 else float('inf')
+
+    def to_dict(self):
+        with self._lock:
+            self._refill()
+            return {
+                'rate_per_second': self.rate,
+                'capacity': self.capacity,
+                'tokens': round(self.tokens, 3),
+                'allowed': self.total_allowed,
+                'rejected': self.total_rejected
+            }
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(name, rate, capacity):
+    """Process-wide bucket for a name, created on first use"""
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            bucket = _buckets[name] = TokenBucket(name, rate, capacity)
+        return bucket
+
+
+def all_buckets():
+    with _buckets_lock:
+        return dict(_buckets)
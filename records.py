@@ -0,0 +1,124 @@
+"""
+MARKET ROW RECORDS
+==================
+Immutable per-symbol rows for snapshots, the price table and the shared
+buffer, replacing a dict per stock per refresh.
+
+MarketRow keeps its fields in __slots__ (no per-row dict of repeated string
+keys) and reads like the dict rows it replaces: row['change'], row.get(),
+dict(row) and Jinja's row.change all work. Records cannot be modified, so
+one record can be referenced by any number of snapshots, views and caches.
+
+RowCache returns the previous record when a row's fields did not change, so
+consecutive snapshot versions share every unchanged row structurally: a
+refresh allocates records only for the symbols that moved, and snapshots
+retained for deltas or the stale fallback cost a list of references each.
+"""
+
+from collections.abc import Mapping
+
+FIELDS = ('symbol', 'current_price', 'change', 'oi_change', 'pcr_ratio', 'stale', 'as_of', 'weight')
+_FIELD_SET = frozenset(FIELDS)
+
+
+class MarketRow(Mapping):
+    """One symbol's row; an immutable mapping of FIELDS"""
+
+    __slots__ = FIELDS
+
+    def __init__(self, symbol, current_price=None, change=0.0, oi_change=0, pcr_ratio=None,
+                 stale=False, as_of=None, weight=None):
+        for name, value in zip(FIELDS, (symbol, current_price, change, oi_change, pcr_ratio, stale, as_of, weight)):
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_dict(cls, row):
+        """Record from a dict row (keys outside FIELDS are dropped)"""
+        return cls(**{k: v for k, v in row.items() if k in _FIELD_SET})
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable, use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _FIELD_SET else default
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __contains__(self, key):
+        return key in _FIELD_SET
+
+    def values_tuple(self):
+        return tuple(getattr(self, name) for name in FIELDS)
+
+    def __eq__(self, other):
+        if other is self:
+            return True
+        if isinstance(other, MarketRow):
+            return self.values_tuple() == other.values_tuple()
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return type(self), self.values_tuple()
+
+    def __repr__(self):
+        return f"MarketRow({', '.join(f'{name}={getattr(self, name)!r}' for name in FIELDS)})"
+
+    def replace(self, **changes):
+        """Copy with some fields changed"""
+        return type(self)(**dict(zip(FIELDS, self.values_tuple()), **changes))
+
+    def matches(self, fields):
+        """True if every given field has the given value"""
+        for name, value in fields.items():
+            if getattr(self, name) != value:
+                return False
+        return True
+
+    def to_dict(self):
+        return dict(zip(FIELDS, self.values_tuple()))
+
+
+class RowCache:
+    """Latest record per symbol, reused while its fields are unchanged"""
+
+    def __init__(self):
+        self._rows = {}
+        self._bases = {}
+
+    def row(self, symbol, **fields):
+        """Record for a symbol with these fields (keys outside FIELDS, e.g. 'oi' or 'volume', are dropped)
+
+        Returns the previous record if nothing changed.
+        """
+        fields = {name: value for name, value in fields.items() if name in _FIELD_SET}
+        previous = self._rows.get(symbol)
+        if previous is not None and previous.matches(fields):
+            return previous
+        row = self._rows[symbol] = MarketRow(symbol, **fields)
+        return row
+
+    def weighted(self, row, weight):
+        """`row` with an index weight, reused while both the row object and the weight are unchanged"""
+        previous = self._rows.get(row.symbol)
+        if previous is not None and self._bases.get(row.symbol) is row and previous.weight == weight:
+            return previous
+        weighted = self._rows[row.symbol] = row.replace(weight=weight)
+        self._bases[row.symbol] = row
+        return weighted
+
+    def __len__(self):
+        return len(self._rows)
@@ -0,0 +1,120 @@
+"""
+VERSIONED RENDER CACHE
+======================
+Caches rendered responses per (snapshot version, content type, variant)
+together with pre-compressed gzip/brotli variants. The variant tells apart
+renders of one version that differ otherwise, e.g. deltas from different
+base versions.
+
+A burst of viewers on the same snapshot costs one render and one compression;
+the first caller renders while the others wait on the same entry. Entries for
+older versions are evicted as soon as a newer version is rendered.
+"""
+
+import gzip
+import hashlib
+import logging
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MIN_COMPRESS_SIZE = 512  # bytes; smaller bodies are served as-is
+
+
+class RenderedResponse:
+    """Rendered body plus its compressed variants"""
+
+    def __init__(self, version, content_type, body):
+        self.version = version
+        self.content_type = content_type
+        self.body = body
+        self.variants = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = gzip.compress(body, compresslevel=6)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=5)
+        digest = hashlib.md5(body).hexdigest()[:16]
+        self.etag = f'"v{version}-{digest}"'
+
+    def select(self, accept_encoding):
+        """Pick (body, content_encoding) for an Accept-Encoding header"""
+        encoding = negotiate_encoding(accept_encoding, self.variants)
+        if encoding:
+            return self.variants[encoding], encoding
+        return self.body, None
+
+
+def negotiate_encoding(accept_encoding, available):
+    """Best available encoding from an Accept-Encoding header (br preferred)"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+class RenderCache:
+    """Rendered output keyed by (version, content_type, variant)"""
+
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def get_or_render(self, version, content_type, render_fn, variant=None):
+        """Return the cached response, rendering it at most once per key
+
+        A render_fn returning None has nothing to serve: nothing is cached and
+        None is returned.
+        """
+        key = (version, content_type, variant)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            body = render_fn()
+            if body is None:
+                return None
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            entry = RenderedResponse(version, content_type, body)
+            self.renders += 1
+            with self._lock:
+                self._entries[key] = entry
+                self._evict_older(version)
+        return entry
+
+    def _evict_older(self, version):
+        """Drop entries and locks for versions older than `version`"""
+        for key in [k for k in self._entries if k[0] < version]:
+            del self._entries[key]
+        for key in [k for k in self._locks if k[0] < version]:
+            del self._locks[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._locks.clear()
@@ -0,0 +1,167 @@
+"""
+SNAPSHOT SERIALIZERS
+====================
+Encodings of the market snapshot for API clients, picked from the Accept
+header by /api/snapshot and rendered once per snapshot version:
+
+    application/json                      orjson when installed, else compact json
+    application/msgpack                   MessagePack (needs msgpack)
+    application/vnd.bounceback.snapshot   fixed-layout binary records (below)
+
+Binary layout, little-endian. Header (HEADER, 56 bytes):
+
+    magic "BBS1" | format u8 | flags u8 (1 live, 2 stale) | rows u16
+    snapshot version u64 | fetched_at f64 | nifty_spot f64 | banknifty_spot f64
+    nifty_pcr f32 | bank_pcr f32 | nifty_impact f32 | bank_impact f32
+
+followed by `rows` records (ROW, 48 bytes):
+
+    symbol 12s (ASCII, NUL padded) | flags u8 (1 stale) | pad 3
+    price f64 | change f32 | pcr f32 | nifty_weight f32 | bank_weight f32
+    oi_change i64
+
+A symbol in both indices is one record with both weights; weight 0 means
+not a member. Missing numbers are NaN.
+
+    python serializers.py --symbols 200     # size and time per encoding
+"""
+
+import argparse
+import gzip
+import json
+import math
+import struct
+import time
+from collections.abc import Mapping
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library is the fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is only offered when msgpack is installed
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+BINARY = 'application/vnd.bounceback.snapshot'
+
+MAGIC = b'BBS1'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sBBHQdddffff')
+ROW = struct.Struct('<12sB3xdffffq')
+NAN = float('nan')
+
+
+def encode_default(value):
+    """Row records (any mapping) encode as objects, other unknown types as their str()"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def to_json(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=encode_default, separators=(',', ':')).encode('utf-8')
+
+
+def to_msgpack(payload):
+    return msgpack.packb(payload, default=encode_default, use_bin_type=True)
+
+
+def _number(value):
+    return NAN if value is None else float(value)
+
+
+def to_binary(payload):
+    """Fixed-layout records for the index rows plus the headline aggregates"""
+    rows = {}
+    for key, weight_field in (('nifty_data', 'nifty_weight'), ('bank_data', 'bank_weight')):
+        for row in payload.get(key) or ():
+            record = rows.setdefault(row['symbol'], dict(row, nifty_weight=0.0, bank_weight=0.0))
+            record[weight_field] = row.get('weight') or 0.0
+
+    flags = (1 if payload.get('connection') == 'live' else 0) | (2 if payload.get('stale') else 0)
+    parts = [HEADER.pack(
+        MAGIC, FORMAT_VERSION, flags, len(rows),
+        payload.get('version') or 0, _number(payload.get('fetched_at')),
+        _number(payload.get('nifty_spot')), _number(payload.get('banknifty_spot')),
+        _number(payload.get('nifty_pcr')), _number(payload.get('bank_pcr')),
+        _number((payload.get('nifty_impact') or {}).get('total_impact')),
+        _number((payload.get('bank_impact') or {}).get('total_impact'))
+    )]
+    for symbol, row in rows.items():
+        parts.append(ROW.pack(
+            symbol.encode('ascii', 'replace')[:12], 1 if row.get('stale') else 0,
+            _number(row.get('current_price')), _number(row.get('change')), _number(row.get('pcr_ratio')),
+            row['nifty_weight'], row['bank_weight'], int(row.get('oi_change') or 0)
+        ))
+    return b''.join(parts)
+
+
+def from_binary(body):
+    """Decode to_binary() output (reference decoder for clients and checks)"""
+    header = HEADER.unpack_from(body, 0)
+    if header[0] != MAGIC or header[1] != FORMAT_VERSION:
+        raise ValueError("Not a version 1 snapshot record")
+    names = ('flags', 'rows', 'version', 'fetched_at', 'nifty_spot', 'banknifty_spot',
+             'nifty_pcr', 'bank_pcr', 'nifty_impact', 'bank_impact')
+    snapshot = dict(zip(names, header[2:]))
+    snapshot['rows'] = [
+        dict(zip(('symbol', 'flags', 'price', 'change', 'pcr', 'nifty_weight', 'bank_weight', 'oi_change'),
+                 (fields[0].rstrip(b'\0').decode('ascii'),) + fields[1:]))
+        for fields in ROW.iter_unpack(body[HEADER.size:HEADER.size + header[3] * ROW.size])
+    ]
+    return snapshot
+
+
+ENCODERS = {JSON: to_json, BINARY: to_binary}
+if msgpack is not None:
+    ENCODERS[MSGPACK] = to_msgpack
+
+
+def negotiate(accept_mimetypes):
+    """Best encoding for a werkzeug Accept header (JSON unless another is preferred)"""
+    return accept_mimetypes.best_match([JSON] + [t for t in ENCODERS if t != JSON], default=JSON)
+
+
+def main():
+    import random
+    from fno_universe import FNO_UNIVERSE
+
+    parser = argparse.ArgumentParser(description="Size and serialize time per snapshot encoding")
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    symbols = (FNO_UNIVERSE * 2)[:args.symbols]
+    rows = [{'symbol': s, 'change': round(rng.gauss(0, 1.2), 2), 'oi_change': rng.randint(-50000, 50000),
+             'current_price': round(rng.uniform(100, 5000), 2), 'pcr_ratio': round(rng.uniform(0.5, 1.5), 2),
+             'weight': round(rng.uniform(0.1, 10), 2), 'stale': False, 'as_of': '10:15:30'} for s in symbols]
+    impact = {'total_impact': 0.42, 'positive_count': 120, 'negative_count': 80, 'sentiment': 'Neutral'}
+    payload = {'nifty_data': rows[:len(rows) // 2], 'bank_data': rows[len(rows) // 2:],
+               'nifty_pcr': 0.93, 'bank_pcr': 1.04, 'nifty_impact': impact, 'bank_impact': impact,
+               'nifty_spot': 25145.75, 'banknifty_spot': 52380.25, 'connection': 'live',
+               'data_source': 'Live Prices', 'timestamp': '10:15:30', 'fetched_at': time.time(), 'version': 42}
+
+    encoders = [('json.dumps (current /api/snapshot)', lambda p: json.dumps(p, default=str).encode('utf-8'))]
+    encoders += [(name, ENCODERS[name]) for name in (JSON, MSGPACK, BINARY) if name in ENCODERS]
+    print(f"{len(rows)} symbols, best of {args.repeat}")
+    for name, encode in encoders:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            body = encode(payload)
+            timings.append(time.perf_counter() - started)
+        print(f"  {name:<40} {len(body):>7,} B  gzip {len(gzip.compress(body)):>6,} B  "
+              f"{min(timings) * 1e6:>8.1f} us")
+    decoded = from_binary(to_binary(payload))
+    assert decoded['rows'][0]['symbol'] == rows[0]['symbol'] and not math.isnan(decoded['nifty_pcr'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+SHARED SNAPSHOT ACROSS WORKERS
+==============================
+One producer per host polls upstream; every gunicorn worker reads its result.
+
+ProducerElection picks the producer with a non-blocking flock on a lock
+file. The OS drops the lock when the producer exits, and the other workers
+retry periodically, so a replacement takes over within `retry_interval`.
+
+SharedBuffer is a seqlock-protected memory-mapped file:
+
+    [ seq u64 | length u64 | written_at f64 | padding ][ pickled payload ]
+
+The single writer makes seq odd, writes the payload, then makes it even.
+Readers never lock: they read seq, the payload and seq again, and retry if a
+write overlapped. Each reader decodes a version once and afterwards only
+compares the 8-byte sequence number, so unchanged snapshots cost no copy.
+"""
+
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; every process is its own producer
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('<QQd')
+DATA_OFFSET = 64
+DEFAULT_CAPACITY = int(os.getenv('SHARED_SNAPSHOT_BYTES', str(16 * 1024 * 1024)))
+READ_RETRIES = 100
+
+
+class SharedBuffer:
+    """Single-writer, many-reader object buffer in a memory-mapped file"""
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self._map = None
+        self._writable = False
+        self._seq = 0
+        self._cached_seq = 0
+        self._cached = None
+        self._write_lock = threading.Lock()
+
+    def _open(self, writable):
+        if self._map is not None and (self._writable or not writable):
+            return self._map
+        if writable:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if os.fstat(fd).st_size < DATA_OFFSET + self.capacity:
+                    os.ftruncate(fd, DATA_OFFSET + self.capacity)
+                self._map = mmap.mmap(fd, DATA_OFFSET + self.capacity)
+            finally:
+                os.close(fd)
+            # continue the sequence of a previous producer so readers see it move forward
+            self._seq = (HEADER.unpack_from(self._map, 0)[0] + 1) & ~1
+            self._writable = True
+        else:
+            if not os.path.exists(self.path):
+                return None
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                size = os.fstat(fd).st_size
+                if size <= DATA_OFFSET:
+                    return None
+                self._map = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+        return self._map
+
+    def write(self, obj):
+        """Publish obj to every reader; returns False if it does not fit"""
+        payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.capacity:
+            logger.error(f"❌ Shared snapshot is {len(payload)} bytes, over the {self.capacity} byte buffer")
+            return False
+        with self._write_lock:
+            buffer = self._open(writable=True)
+            seq = self._seq + 1
+            struct.pack_into('<Q', buffer, 0, seq)                   # odd: write in progress
+            buffer[DATA_OFFSET:DATA_OFFSET + len(payload)] = payload
+            HEADER.pack_into(buffer, 0, seq, len(payload), time.time())
+            self._seq = seq + 1
+            struct.pack_into('<Q', buffer, 0, self._seq)             # even: consistent
+            # the writer's own reads never need to decode what it just wrote
+            self._cached_seq, self._cached = self._seq, obj
+        return True
+
+    def read(self):
+        """Latest object (None before the first write); decoded once per version"""
+        buffer = self._map if self._map is not None else self._open(writable=False)
+        if buffer is None:
+            return None
+        for _ in range(READ_RETRIES):
+            seq, length, _ = HEADER.unpack_from(buffer, 0)
+            if seq == self._cached_seq:
+                return self._cached
+            if seq == 0:
+                return None
+            if seq & 1:
+                time.sleep(0)
+                continue
+            payload = buffer[DATA_OFFSET:DATA_OFFSET + length]
+            if HEADER.unpack_from(buffer, 0)[0] != seq:
+                continue
+            try:
+                obj = pickle.loads(payload)
+            except Exception as e:
+                logger.error(f"❌ Could not decode shared snapshot {seq}: {e}")
+                return self._cached
+            self._cached_seq, self._cached = seq, obj
+            return obj
+        logger.warning("⚠️ Shared snapshot kept changing during read, using the previous version")
+        return self._cached
+
+    def age(self):
+        """Seconds since the last write (None before the first write)"""
+        buffer = self._map if self._map is not None else self._open(writable=False)
+        if buffer is None:
+            return None
+        seq, _, written_at = HEADER.unpack_from(buffer, 0)
+        return time.time() - written_at if seq else None
+
+
+class ProducerElection:
+    """Elect one producer process per lock file"""
+
+    def __init__(self, lock_path, retry_interval=5.0):
+        self.lock_path = lock_path
+        self.retry_interval = retry_interval
+        self.is_producer = False
+        self.started = False
+        self._fd = None
+        self._thread = None
+
+    def try_acquire(self):
+        if self.is_producer:
+            return True
+        if fcntl is None:
+            self.is_producer = True
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        self.is_producer = True
+        logger.info(f"👑 Process {os.getpid()} elected snapshot producer")
+        return True
+
+    @property
+    def is_follower(self):
+        """True in workers that read the producer's state instead of polling upstream"""
+        return self.started and not self.is_producer
+
+    def start(self, on_elected):
+        """Call on_elected() once this process becomes the producer (now or after a takeover)"""
+        self.started = True
+        if self.try_acquire():
+            on_elected()
+            return
+
+        def wait_for_takeover():
+            while not self.try_acquire():
+                time.sleep(self.retry_interval)
+            on_elected()
+
+        self._thread = threading.Thread(target=wait_for_takeover, name='producer-election', daemon=True)
+        self._thread.start()
@@ -0,0 +1,269 @@
+"""
+DETERMINISTIC MARKET SIMULATOR
+==============================
+Seeded simulator for sample mode and offline load testing.
+
+Prices follow geometric Brownian motion with a one-factor-per-level
+correlation structure: every shock is a blend of a market factor, a sector
+factor and an idiosyncratic term, so stocks in the same sector move together.
+Open interest drifts with price (build-ups and unwinding) and option chains
+evolve per underlying. The same seed and step sequence always produce the
+same ticks, and ticks go through the same TickPipeline as live data.
+
+Stress test offline at 10x a busy market (~190 names x 50 ticks/s):
+
+    python simulator.py --rate 50 --seconds 60 --seed 7
+
+With --record the steps are also written as JSONL tick batches that the
+replay provider can play back (REPLAY_FILE=ticks.jsonl).
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from fno_universe import FNO_UNIVERSE, SYMBOL_SECTOR
+from market_calendar import IST
+
+TRADING_SECONDS_PER_YEAR = 252 * 375 * 60
+CHAIN_STRIKES = 21                 # strikes each side of ATM is CHAIN_STRIKES // 2
+DEFAULT_START = datetime(2026, 1, 5, 9, 15, tzinfo=IST)
+
+
+class MarketSimulator:
+    def __init__(self, seed=42, universe=None, start_prices=None, annual_vol=0.25,
+                 market_corr=0.3, sector_corr=0.3, step_seconds=1.0, start_time=None):
+        self.seed = seed
+        self.universe = list(universe or FNO_UNIVERSE)
+        self.annual_vol = annual_vol
+        self.market_weight = math.sqrt(market_corr)
+        self.sector_weight = math.sqrt(sector_corr)
+        self.idio_weight = math.sqrt(max(0.0, 1 - market_corr - sector_corr))
+        self.step_seconds = step_seconds
+        self.clock = (start_time or DEFAULT_START).timestamp()
+        self.steps = 0
+        self._rng = random.Random(seed)
+        self._sectors = sorted({SYMBOL_SECTOR.get(s, 'OTHER') for s in self.universe})
+
+        start_prices = start_prices or {}
+        self.prev_close = {}
+        self.prices = {}
+        self.oi = {}
+        self.day_open_oi = {}
+        self.pcr = {}
+        for symbol in self.universe:
+            price = start_prices.get(symbol) or round(self._rng.lognormvariate(math.log(1000), 0.8), 2)
+            self.prev_close[symbol] = self.prices[symbol] = price
+            self.oi[symbol] = self.day_open_oi[symbol] = int(self._rng.uniform(2e6, 5e7))
+            self.pcr[symbol] = round(self._rng.uniform(0.6, 1.3), 2)
+        self._chains = {}
+
+    def add_symbols(self, symbols):
+        """Start simulating symbols not in the universe yet (e.g. added to a watchlist)
+
+        A new symbol's starting state comes from its own RNG, so it does not
+        depend on when the symbol joined. Returns the symbols added.
+        """
+        added = [s for s in dict.fromkeys(symbols) if s not in self.prices]
+        for symbol in added:
+            rng = self._symbol_rng(symbol, 'start')
+            price = round(rng.lognormvariate(math.log(1000), 0.8), 2)
+            self.universe.append(symbol)
+            self.prev_close[symbol] = self.prices[symbol] = price
+            self.oi[symbol] = self.day_open_oi[symbol] = int(rng.uniform(2e6, 5e7))
+            self.pcr[symbol] = round(rng.uniform(0.6, 1.3), 2)
+        if added:
+            self._sectors = sorted({SYMBOL_SECTOR.get(s, 'OTHER') for s in self.universe})
+        return added
+
+    def _symbol_rng(self, symbol, salt):
+        return random.Random(zlib.crc32(f"{self.seed}:{symbol}:{salt}".encode()))
+
+    def step(self, now=None):
+        """Advance one step and return one tick per symbol
+
+        `now` only stamps the ticks (e.g. wall clock in sample mode); the
+        simulated path itself depends on the seed and step count alone.
+        """
+        rng = self._rng
+        self.steps += 1
+        self.clock += self.step_seconds
+        dt = self.step_seconds / TRADING_SECONDS_PER_YEAR
+        sigma = self.annual_vol
+        drift = -0.5 * sigma * sigma * dt
+        diffusion = sigma * math.sqrt(dt)
+        market_shock = rng.gauss(0, 1)
+        sector_shocks = {sector: rng.gauss(0, 1) for sector in self._sectors}
+        ts = now if now is not None else self.clock
+
+        ticks = []
+        for symbol in self.universe:
+            shock = (self.market_weight * market_shock
+                     + self.sector_weight * sector_shocks[SYMBOL_SECTOR.get(symbol, 'OTHER')]
+                     + self.idio_weight * rng.gauss(0, 1))
+            old_price = self.prices[symbol]
+            price = old_price * math.exp(drift + diffusion * shock)
+            self.prices[symbol] = price
+
+            # OI builds when price moves with conviction and slowly mean-reverts otherwise
+            oi_move = 0.002 * abs(shock) * (1 if rng.random() < 0.55 else -1) + rng.gauss(0, 0.0005)
+            self.oi[symbol] = max(1000, int(self.oi[symbol] * (1 + oi_move)))
+            self.pcr[symbol] = min(2.5, max(0.3, self.pcr[symbol] + 0.01 * shock + rng.gauss(0, 0.002)))
+
+            ticks.append({
+                'symbol': symbol,
+                'price': round(price, 2),
+                'change': round((price / self.prev_close[symbol] - 1) * 100, 2),
+                'oi': self.oi[symbol],
+                'oi_change': self.oi[symbol] - self.day_open_oi[symbol],
+                'pcr_ratio': round(self.pcr[symbol], 2),
+                'volume': float(int(rng.expovariate(1 / 500)) + 1),
+                'ts': ts
+            })
+        return ticks
+
+    def row(self, symbol):
+        """Current state of one symbol in the dashboard row shape (without weight)"""
+        price = self.prices[symbol]
+        return {
+            'symbol': symbol,
+            'change': round((price / self.prev_close[symbol] - 1) * 100, 2),
+            'oi_change': self.oi[symbol] - self.day_open_oi[symbol],
+            'current_price': round(price, 2),
+            'pcr_ratio': round(self.pcr[symbol], 2)
+        }
+
+    def option_chain(self, symbol, days_to_expiry=7):
+        """Strike-wise chain (call/put OI, prices, IV) evolved deterministically to the current step"""
+        chain = self._chains.get(symbol)
+        if chain is None:
+            chain = self._chains[symbol] = self._new_chain(symbol)
+        rng = chain['rng']
+        while chain['steps'] < self.steps:
+            for row in chain['rows']:
+                row['call_oi'] = max(0, int(row['call_oi'] * (1 + rng.gauss(0, 0.003))))
+                row['put_oi'] = max(0, int(row['put_oi'] * (1 + rng.gauss(0, 0.003))))
+            chain['steps'] += 1
+
+        spot = self.prices[symbol]
+        expiry = datetime.fromtimestamp(self.clock, IST) + timedelta(days=days_to_expiry)
+        years = max(days_to_expiry, 0.01) / 365
+        rows = []
+        for row in chain['rows']:
+            strike = row['strike']
+            iv = 0.18 + 0.25 * (math.log(strike / spot)) ** 2 + (0.02 if strike < spot else 0.0)
+            rows.append(dict(
+                row,
+                call_ltp=round(black_scholes(spot, strike, years, iv, True), 2),
+                put_ltp=round(black_scholes(spot, strike, years, iv, False), 2),
+                iv=round(iv, 4)
+            ))
+        return {
+            'symbol': symbol,
+            'spot': round(spot, 2),
+            'expiry': expiry.strftime('%d%b%Y').upper(),
+            'time_to_expiry': years,
+            'rows': rows
+        }
+
+    def _new_chain(self, symbol):
+        rng = self._symbol_rng(symbol, 'chain')
+        spot = self.prices[symbol]
+        step = nice_strike_step(spot)
+        atm = round(spot / step) * step
+        rows = []
+        for i in range(-(CHAIN_STRIKES // 2), CHAIN_STRIKES // 2 + 1):
+            strike = round(atm + i * step, 2)
+            # OI concentrates near the money; calls above, puts below
+            closeness = math.exp(-(i / 4) ** 2)
+            rows.append({
+                'strike': strike,
+                'call_oi': int(rng.uniform(0.5, 1.5) * 1e5 * closeness * (1.5 if i > 0 else 1.0)),
+                'put_oi': int(rng.uniform(0.5, 1.5) * 1e5 * closeness * (1.5 if i < 0 else 1.0))
+            })
+        return {'rng': rng, 'rows': rows, 'steps': self.steps}
+
+    def run(self, pipeline, rate, seconds, realtime=False, record=None):
+        """Publish `rate` steps per simulated second for `seconds`; returns ticks published
+
+        `record` is an optional open file that receives each step as one JSON line.
+        """
+        published = 0
+        steps = int(rate * seconds)
+        interval = 1.0 / rate
+        started = time.perf_counter()
+        for i in range(steps):
+            ticks = self.step()
+            if record is not None:
+                record.write(json.dumps(ticks) + '\n')
+            pipeline.publish_many(ticks)
+            published += len(ticks)
+            if realtime:
+                delay = started + (i + 1) * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        return published
+
+
+def nice_strike_step(spot):
+    """Strike spacing of roughly 1% of spot, rounded to exchange-like steps"""
+    for step in (0.5, 1, 2.5, 5, 10, 20, 50, 100, 250, 500):
+        if step >= spot * 0.01:
+            return step
+    return 1000
+
+
+def black_scholes(spot, strike, years, vol, is_call, rate=0.065):
+    """European option price (used to give the simulated chain consistent premiums)"""
+    sqrt_t = math.sqrt(years)
+    d1 = (math.log(spot / strike) + (rate + 0.5 * vol * vol) * years) / (vol * sqrt_t)
+    d2 = d1 - vol * sqrt_t
+    n = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    if is_call:
+        return spot * n(d1) - strike * math.exp(-rate * years) * n(d2)
+    return strike * math.exp(-rate * years) * n(-d2) - spot * n(-d1)
+
+
+def main():
+    from tick_pipeline import TickPipeline
+    from aggregator import IndexAggregator
+    from bars import BarBuilder
+    from synthetic_index import SyntheticIndex
+
+    parser = argparse.ArgumentParser(description="Replay simulated ticks through the ingestion pipeline")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rate', type=float, default=50, help="steps per simulated second (one tick per symbol per step)")
+    parser.add_argument('--seconds', type=float, default=60, help="simulated seconds")
+    parser.add_argument('--realtime', action='store_true', help="pace publishing to wall-clock time")
+    parser.add_argument('--record', help="also write every step to this JSONL file for replay")
+    args = parser.parse_args()
+
+    simulator = MarketSimulator(seed=args.seed, step_seconds=1.0 / args.rate)
+    weights = {symbol: 1.0 for symbol in simulator.universe}
+    pipeline = TickPipeline()
+    aggregator = IndexAggregator('UNIVERSE', weights)
+    synthetic = SyntheticIndex('UNIVERSE', weights)
+    synthetic.anchor(10000, dict(simulator.prices))
+    bars = BarBuilder()
+    for consumer in (aggregator.on_tick, synthetic.on_tick, bars.on_tick):
+        pipeline.subscribe(consumer)
+
+    started = time.perf_counter()
+    record = open(args.record, 'w') if args.record else None
+    try:
+        published = simulator.run(pipeline, args.rate, args.seconds, realtime=args.realtime, record=record)
+    finally:
+        if record is not None:
+            record.close()
+    elapsed = time.perf_counter() - started
+    print(f"seed={args.seed} symbols={len(simulator.universe)} ticks={published} "
+          f"elapsed={elapsed:.2f}s throughput={published / elapsed:,.0f} ticks/s")
+    print(f"final impact={aggregator.impact()['total_impact']:.4f} synthetic={synthetic.level:.2f}")
+
+
+if __name__ == '__main__':
+    main()
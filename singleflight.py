@@ -0,0 +1,126 @@
+"""
+SINGLE-FLIGHT REQUEST COALESCING
+================================
+Concurrent callers asking for the same resource (login, the snapshot, one
+symbol's quote, one option chain) share one in-flight upstream operation and
+get its result or its error.
+
+SingleFlight coalesces threads within a process. Given a lock_dir it also
+coalesces gunicorn workers on the same host: the leader holds an flock on
+<lock_dir>/<key>.lock and leaves its result in <key>.result for workers that
+were waiting on the lock. A failed leader leaves no result, so a waiting worker
+simply tries again itself.
+"""
+
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; cross-process coalescing is disabled
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run fn once per key for all concurrent callers"""
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return fn(*args, **kwargs), sharing one execution per key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if self.lock_dir:
+                call.result = self._do_across_workers(key, fn, args, kwargs)
+            else:
+                call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        if call.waiters:
+            logger.info(f"🔗 Coalesced {call.waiters} concurrent callers into one '{key}' fetch")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _paths(self, key):
+        safe_key = re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+        base = os.path.join(self.lock_dir, safe_key)
+        return f"{base}.lock", f"{base}.result"
+
+    def _do_across_workers(self, key, fn, args, kwargs):
+        """Hold the host-wide lock for key; reuse a result written while we waited"""
+        lock_path, result_path = self._paths(key)
+        started = time.time()
+        with open(lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is already fetching; wait for it and take its result
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                shared = self._read_result(result_path, started)
+                if shared is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    return shared[0]
+            try:
+                result = fn(*args, **kwargs)
+                self._write_result(result_path, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_result(result_path, not_before):
+        try:
+            if os.path.getmtime(result_path) < not_before:
+                return None
+            with open(result_path, 'rb') as f:
+                return (pickle.load(f),)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _write_result(result_path, result):
+        try:
+            tmp_path = f"{result_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(result, f)
+            os.replace(tmp_path, result_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not share single-flight result {result_path}: {e}")
@@ -0,0 +1,180 @@
+"""
+SNAPSHOT DELTAS
+===============
+Changes between two snapshot versions, for clients that already hold one.
+
+A snapshot is flattened into per-symbol rows (keyed by symbol, index weights
+kept apart in `members`) and the remaining top-level fields. The delta from a
+held version is a recursive diff of the two flattened states, where a row
+record shared by both versions is skipped without comparing its fields:
+
+    {'base': 41, 'version': 42,
+     'changes': {'rows': {'RELIANCE': {'current_price': 1372.1, 'change': 0.05}},
+                 'fields': {'timestamp': '10:15:45', 'nifty_pcr': 0.91}},
+     'removed': [['rows', 'YESBANK']]}
+
+Dicts in `changes` are merged key by key into the held state, anything else
+replaces the held value; `removed` lists the key paths to delete.
+apply_delta() is the reference client.
+
+DeltaRing keeps the payloads of the last DELTA_VERSIONS versions served; they
+share their unchanged row records, so each costs little more than its row
+lists. A client whose version has left the ring (or was never served by this
+worker) gets the full snapshot instead.
+
+    python snapshot_delta.py --symbols 200 --moved 2    # full vs delta size
+"""
+
+import argparse
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+DELTA_VERSIONS = 32
+ROW_LISTS = ('nifty_data', 'bank_data')
+
+
+def flatten(payload):
+    """{'rows', 'members', 'fields'} state of a snapshot payload"""
+    rows, members = {}, {}
+    for key in ROW_LISTS:
+        members[key] = []
+        for row in payload.get(key) or ():
+            # rows are referenced, not copied; the weight they carry is overridden from members
+            rows[row['symbol']] = row
+            members[key].append([row['symbol'], row.get('weight')])
+    fields = {k: v for k, v in payload.items() if k not in ROW_LISTS and k != 'version'}
+    return {'rows': rows, 'members': members, 'fields': fields}
+
+
+def unflatten(state, version=None):
+    """Snapshot payload from a flattened state"""
+    payload = dict(state['fields'])
+    for key, members in state['members'].items():
+        payload[key] = [dict(state['rows'][symbol], weight=weight) for symbol, weight in members]
+    if version is not None:
+        payload['version'] = version
+    return payload
+
+
+def diff(old, new, path=(), removed=None):
+    """Changed keys of `new` against `old` (nested mappings recursively) and the removed key paths"""
+    removed = [] if removed is None else removed
+    changes = {}
+    for key, value in new.items():
+        if key not in old:
+            changes[key] = value
+            continue
+        previous = old[key]
+        if previous is value or previous == value:
+            continue
+        if isinstance(value, Mapping) and isinstance(previous, Mapping):
+            changes[key] = diff(previous, value, path + (key,), removed)[0]
+        else:
+            changes[key] = value
+    removed.extend(list(path + (key,)) for key in old if key not in new)
+    return changes, removed
+
+
+def merge(state, changes):
+    """Apply `changes` to a nested dict in place (nested mappings, e.g. row records, are copied into dicts)"""
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(state.get(key), Mapping):
+            state[key] = dict(state[key])
+            merge(state[key], value)
+        else:
+            state[key] = value
+
+
+def apply_delta(payload, delta):
+    """Snapshot payload after a delta (reference client; the base payload is not modified)"""
+    if payload.get('version') != delta['base']:
+        raise ValueError(f"Delta is based on version {delta['base']}, not {payload.get('version')}")
+    state = flatten(payload)
+    merge(state, delta['changes'])
+    for path in delta['removed']:
+        parent = state
+        for key in path[:-1]:
+            parent[key] = dict(parent[key])
+            parent = parent[key]
+        parent.pop(path[-1], None)
+    return unflatten(state, delta['version'])
+
+
+class DeltaRing:
+    """Payloads of the most recent snapshot versions"""
+
+    def __init__(self, size=DELTA_VERSIONS):
+        self.size = size
+        self._payloads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, version, payload):
+        """Remember a served version (once; the oldest is evicted past `size`)"""
+        if version in self._payloads:
+            return
+        with self._lock:
+            self._payloads[version] = payload
+            while len(self._payloads) > self.size:
+                self._payloads.popitem(last=False)
+
+    def __contains__(self, version):
+        return version in self._payloads
+
+    def versions(self):
+        return list(self._payloads)
+
+    def delta(self, base, version):
+        """Delta from `base` to `version`, None when either is not in the ring"""
+        old, new = self._payloads.get(base), self._payloads.get(version)
+        if old is None or new is None:
+            return None
+        changes, removed = diff(flatten(old), flatten(new))
+        return {'base': base, 'version': version, 'changes': changes, 'removed': removed}
+
+
+def main():
+    import gzip
+    import random
+    import time
+    from fno_universe import FNO_UNIVERSE
+    from serializers import to_json
+
+    parser = argparse.ArgumentParser(description="Full snapshot vs delta size")
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--moved', type=int, default=2, help="symbols whose price changes between versions")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    symbols = FNO_UNIVERSE[:args.symbols]
+    rows = [{'symbol': s, 'change': round(rng.gauss(0, 1.2), 2), 'oi_change': rng.randint(-50000, 50000),
+             'current_price': round(rng.uniform(100, 5000), 2), 'pcr_ratio': round(rng.uniform(0.5, 1.5), 2),
+             'weight': round(rng.uniform(0.1, 10), 2), 'stale': False, 'as_of': '10:15:30'} for s in symbols]
+    impact = {'total_impact': 0.42, 'positive_count': 120, 'negative_count': 80, 'sentiment': 'Neutral'}
+    old = {'nifty_data': rows[:len(rows) // 2], 'bank_data': rows[len(rows) // 2:],
+           'nifty_pcr': 0.93, 'bank_pcr': 1.04, 'nifty_impact': impact, 'bank_impact': dict(impact),
+           'connection': 'live', 'timestamp': '10:15:30', 'fetched_at': time.time(), 'version': 41}
+    new = dict(old, timestamp='10:15:45', fetched_at=old['fetched_at'] + 15, version=42,
+               nifty_impact=dict(impact, total_impact=0.44))
+    moved = set(rng.sample(symbols, args.moved))
+    for key in ROW_LISTS:
+        new[key] = [dict(r, current_price=round(r['current_price'] * 1.001, 2)) if r['symbol'] in moved else r
+                    for r in old[key]]
+
+    ring = DeltaRing()
+    ring.add(41, old)
+    ring.add(42, new)
+    started = time.perf_counter()
+    delta = ring.delta(41, 42)
+    seconds = time.perf_counter() - started
+    assert apply_delta(old, delta) == new
+
+    full_body, delta_body = to_json(new), to_json(delta)
+    print(f"{len(rows)} symbols, {len(moved)} moved")
+    print(f"  full   {len(full_body):>7,} B  gzip {len(gzip.compress(full_body)):>6,} B")
+    print(f"  delta  {len(delta_body):>7,} B  gzip {len(gzip.compress(delta_body)):>6,} B  "
+          f"diff {seconds * 1e6:.0f} us")
+
+
+if __name__ == '__main__':
+    main()
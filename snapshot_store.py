@@ -0,0 +1,72 @@
+"""
+MARKET SNAPSHOT STORE
+=====================
+Holds the current market snapshot with a monotonically increasing version.
+
+Views read the latest snapshot instead of fetching on every request; anything
+derived from a snapshot (rendered pages, encodings) can be keyed by its version.
+"""
+
+import os
+import threading
+import time
+
+SNAPSHOT_MAX_AGE = float(os.getenv('SNAPSHOT_MAX_AGE', '15'))  # seconds
+
+
+class SnapshotStore:
+    """Latest market snapshot plus its version and publish time"""
+
+    def __init__(self, max_age=SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self._snapshot = None
+        self._source = None
+        self._last_good = None
+        self._version = 0
+        self._published_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def publish(self, data, good=False, version=None):
+        """Store a new snapshot and return it stamped with its version
+
+        Publishing the same data object again (e.g. from callers that shared
+        one fetch) returns the already-stored snapshot. `good` marks snapshots
+        built from live upstream data, kept as the stale-fallback copy.
+        `version` adopts a version assigned elsewhere (the producer worker's),
+        so every worker serves the same versions and ETags.
+        """
+        with self._lock:
+            if data is self._source:
+                return self._snapshot
+            self._source = data
+            self._version = self._version + 1 if version is None else version
+            snapshot = dict(data, version=self._version)
+            self._snapshot = snapshot
+            self._published_at = time.time()
+            if good:
+                self._last_good = snapshot
+            return snapshot
+
+    def get(self):
+        """Latest snapshot regardless of age (None before the first publish)"""
+        return self._snapshot
+
+    def last_good(self):
+        """Most recent snapshot built from live upstream data"""
+        return self._last_good
+
+    def age(self):
+        if self._snapshot is None:
+            return None
+        return time.time() - self._published_at
+
+    def get_fresh(self):
+        """Latest snapshot if it is younger than max_age, else None"""
+        snapshot, published_at = self._snapshot, self._published_at
+        if snapshot is not None and time.time() - published_at < self.max_age:
+            return snapshot
+        return None
@@ -0,0 +1,111 @@
+"""
+SYNTHETIC INDEX CALCULATOR
+==========================
+Reconstructs an index level between official prints from constituent ticks.
+
+The index is anchored to its last published level and the constituent prices
+at that moment. Each tick then moves the weighted sum of price relatives in
+O(1), so the estimate is always current without refetching everything:
+
+    level = anchor_level * sum(w_i * p_i / p0_i) / sum(w_i)
+
+Weights are index weights in %. When only part of the index is tracked the
+weights are renormalised, i.e. the tracked constituents stand in for the rest.
+Every `recompute_every` ticks the running sum is rebuilt exactly from the
+stored prices, so a long run without official prints does not drift.
+"""
+
+import threading
+import time
+
+RECOMPUTE_EVERY = 1000
+
+
+class SyntheticIndex:
+    def __init__(self, name, weights, recompute_every=RECOMPUTE_EVERY):
+        self.name = name
+        self.weights = dict(weights)
+        self.recompute_every = recompute_every
+        self.total_weight = sum(self.weights.values())
+        self.anchor_level = None
+        self.anchored_at = None
+        self.updated_at = None
+        self._base = {}       # symbol -> price at anchor
+        self._last = {}       # symbol -> latest price
+        self._weighted_relatives = 0.0
+        self._tracked_weight = 0.0
+        self._ticks_since_recompute = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_anchored(self):
+        return self.anchor_level is not None
+
+    def anchor(self, index_level, prices=None):
+        """Re-anchor to an official index level and the constituent prices at that time"""
+        with self._lock:
+            if prices:
+                self._last.update({s: p for s, p in prices.items() if s in self.weights and p})
+            self._base = dict(self._last)
+            self.anchor_level = float(index_level)
+            self.anchored_at = self.updated_at = time.time()
+            # every tracked relative is 1.0 at the anchor; untracked ones are added on first tick
+            self._tracked_weight = sum(self.weights[s] for s in self._base)
+            self._weighted_relatives = self._tracked_weight
+            self._ticks_since_recompute = 0
+
+    def on_tick(self, tick):
+        """Apply one constituent tick in O(1)"""
+        symbol = tick.get('symbol')
+        weight = self.weights.get(symbol)
+        price = tick.get('price')
+        if weight is None or not price:
+            return
+        with self._lock:
+            base = self._base.get(symbol)
+            if base is None:
+                # first sight of this constituent since the anchor: it enters at relative 1.0
+                self._last[symbol] = price
+                if self.anchor_level is not None:
+                    self._base[symbol] = price
+                    self._weighted_relatives += weight
+                    self._tracked_weight += weight
+                return
+            last = self._last.get(symbol, base)
+            self._weighted_relatives += weight * (price - last) / base
+            self._last[symbol] = price
+            self.updated_at = tick.get('ts') or time.time()
+            self._ticks_since_recompute += 1
+            if self._ticks_since_recompute >= self.recompute_every:
+                self._recompute_locked()
+
+    def recompute(self):
+        """Exact recomputation of the running sum (bounds floating-point drift)"""
+        with self._lock:
+            self._recompute_locked()
+
+    def _recompute_locked(self):
+        self._weighted_relatives = sum(
+            self.weights[s] * self._last.get(s, base) / base for s, base in self._base.items()
+        )
+        self._ticks_since_recompute = 0
+
+    @property
+    def level(self):
+        """Current estimated level (None until anchored)"""
+        if self.anchor_level is None:
+            return None
+        if not self._tracked_weight:
+            return self.anchor_level
+        return self.anchor_level * self._weighted_relatives / self._tracked_weight
+
+    def to_dict(self):
+        level = self.level
+        return {
+            'name': self.name,
+            'level': round(level, 2) if level is not None else None,
+            'anchor_level': self.anchor_level,
+            'anchored_at': self.anchored_at,
+            'updated_at': self.updated_at,
+            'tracked_constituents': len(self._base)
+        }
@@ -0,0 +1,35 @@
+"""
+TEST SETUP
+==========
+Puts the repository root on sys.path and points every file the app writes
+(watchlists, alert rules, history, the shared snapshot) at a temp directory
+before anything imports app.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATE_DIR = tempfile.mkdtemp(prefix='bounce-back-tests-')
+atexit.register(shutil.rmtree, STATE_DIR, ignore_errors=True)
+os.environ.update({
+    'WARMUP_MODE': 'off',
+    'BACKGROUND_REFRESH': '0',
+    'WATCHLIST_FILE': os.path.join(STATE_DIR, 'watchlists.json'),
+    'ALERT_RULES_FILE': os.path.join(STATE_DIR, 'alert-rules.json'),
+    'HISTORY_DB': os.path.join(STATE_DIR, 'history.sqlite3'),
+    'SHARED_SNAPSHOT_PATH': os.path.join(STATE_DIR, 'snapshot')
+})
+
+
+@pytest.fixture(scope='session')
+def client():
+    """Flask test client for the dashboard app"""
+    import app
+    return app.app.test_client()
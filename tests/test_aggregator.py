@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from aggregator import IndexAggregator
+
+WEIGHTS = {'RELIANCE': 10.0, 'HDFCBANK': 13.0, 'TCS': 4.0, 'ITC': 3.5}
+
+
+def full_pass(changes, pcrs):
+    impact = sum(c * WEIGHTS[s] / 100 for s, c in changes.items())
+    pcr = round(sum(p * WEIGHTS[s] for s, p in pcrs.items()) / sum(WEIGHTS[s] for s in pcrs), 2) if pcrs else 1.0
+    positive = sum(1 for c in changes.values() if c > 0)
+    return impact, pcr, positive, len(changes) - positive
+
+
+def test_running_sums_match_a_full_pass():
+    rng = random.Random(5)
+    aggregator = IndexAggregator('TEST', WEIGHTS, recompute_every=7)
+    changes, pcrs = {}, {}
+    assert aggregator.pcr() == 1.0
+    for _ in range(200):
+        symbol = rng.choice(list(WEIGHTS) + ['NOT_IN_INDEX'])
+        change = round(rng.uniform(-3, 3), 2) if rng.random() < 0.8 else None
+        pcr = round(rng.uniform(0.5, 1.5), 2) if rng.random() < 0.5 else None
+        aggregator.on_tick({'symbol': symbol, 'change': change, 'pcr_ratio': pcr})
+        if symbol in WEIGHTS:
+            if change is not None:
+                changes[symbol] = change
+            if pcr is not None:
+                pcrs[symbol] = pcr
+
+        impact, expected_pcr, positive, negative = full_pass(changes, pcrs)
+        result = aggregator.impact()
+        assert result['total_impact'] == pytest.approx(impact, abs=1e-9)
+        assert (result['positive_count'], result['negative_count']) == (positive, negative)
+        assert aggregator.pcr() == expected_pcr
+
+
+def test_sentiment_thresholds():
+    aggregator = IndexAggregator('TEST', {'A': 50.0, 'B': 50.0})
+    aggregator.update('A', change=0.6)
+    assert aggregator.impact()['sentiment'] == 'Neutral'
+    aggregator.update('B', change=0.6)
+    assert aggregator.impact()['sentiment'] == 'Bullish'
+    aggregator.update('A', change=-2.0)
+    assert aggregator.impact()['sentiment'] == 'Bearish'
@@ -0,0 +1,121 @@
+import json
+import time
+
+import pytest
+
+from alerts import AlertDispatcher, AlertEngine, MemorySink
+
+
+def fire(engine, symbol, field, *values):
+    for value in values:
+        engine.on_tick({'symbol': symbol, field: value})
+    return [(a['rule_id'], a['previous'], a['value']) for a in engine.recent]
+
+
+def test_threshold_crossings():
+    engine = AlertEngine()
+    above = engine.add({'symbol': 'nifty', 'field': 'spot', 'op': 'above', 'value': 24000, 'cooldown': 0})
+    below = engine.add({'symbol': 'NIFTY', 'field': 'spot', 'op': 'below', 'value': 23900, 'cooldown': 0})
+    far = engine.add({'symbol': 'NIFTY', 'field': 'spot', 'op': 'above', 'value': 25000, 'cooldown': 0})
+
+    fired = fire(engine, 'NIFTY', 'spot', 23950, 24000, 24100, 23800)
+    # the first value only primes the rule; a level is fired on the move that reaches it
+    assert fired == [(above['id'], 23950, 24000), (below['id'], 24100, 23800)]
+    assert far['id'] not in {rule_id for rule_id, _, _ in fired}
+
+
+def test_outside_change_and_spike():
+    engine = AlertEngine()
+    band = engine.add({'symbol': 'NIFTY', 'field': 'pcr', 'op': 'outside', 'low': 0.7, 'high': 1.3, 'cooldown': 0})
+    mood = engine.add({'symbol': 'NIFTY', 'field': 'sentiment', 'op': 'change', 'cooldown': 0})
+    spike = engine.add({'symbol': 'SBIN', 'field': 'oi', 'op': 'spike', 'value': 10, 'cooldown': 0})
+
+    assert fire(engine, 'NIFTY', 'pcr', 1.0, 1.2, 1.4, 1.5) == [(band['id'], 1.2, 1.4)]
+    engine.recent.clear()
+    assert fire(engine, 'NIFTY', 'sentiment', 'Bullish', 'Bullish', 'Neutral') == [(mood['id'], 'Bullish', 'Neutral')]
+    engine.recent.clear()
+    assert fire(engine, 'SBIN', 'oi', 1000, 1050, 1200) == [(spike['id'], 1050, 1200)]
+
+
+def test_cooldown():
+    engine = AlertEngine()
+    engine.add({'symbol': 'TCS', 'field': 'current_price', 'op': 'above', 'value': 3000})
+    assert len(fire(engine, 'TCS', 'current_price', 2990, 3010, 2990, 3010)) == 1
+
+
+def test_snapshot_fields():
+    engine = AlertEngine()
+    rule = engine.add({'symbol': 'BANKNIFTY', 'field': 'pcr', 'op': 'below', 'value': 0.8})
+    for pcr in (0.9, 0.75):
+        engine.on_snapshot({'bank_pcr': pcr, 'bank_impact': {'sentiment': 'Bearish'}, 'fetched_at': time.time()})
+    assert [a['rule_id'] for a in engine.recent] == [rule['id']]
+
+
+@pytest.mark.parametrize('rule', [
+    {'symbol': 'NIFTY', 'field': 'pcr', 'op': 'between'},
+    {'field': 'pcr', 'op': 'above', 'value': 1},
+    {'symbol': 'NIFTY', 'field': 'pcr', 'op': 'above'},
+    {'symbol': 'NIFTY', 'field': 'pcr', 'op': 'outside', 'low': 1.3, 'high': 0.7},
+    {'symbol': 'NIFTY', 'field': 'pcr', 'op': 'above', 'value': 'high'},
+    {'symbol': 'NIFTY', 'field': 'pcr', 'op': 'above', 'value': 1, 'cooldown': None},
+    [1, 2],
+])
+def test_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        AlertEngine().add(rule)
+
+
+def test_dispatch_to_memory_sink():
+    sink = MemorySink()
+    dispatcher = AlertDispatcher([sink])
+    engine = AlertEngine(dispatcher)
+    engine.add({'symbol': 'INFY', 'field': 'current_price', 'op': 'below', 'value': 1500})
+    fire(engine, 'INFY', 'current_price', 1510, 1490)
+    dispatcher.flush()
+    assert [(a['symbol'], a['value']) for a in sink.alerts] == [('INFY', 1490)]
+
+
+def test_rules_file_shared_between_engines(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps([
+        {'symbol': 'NIFTY', 'field': 'pcr', 'op': 'above', 'value': 1.2},
+        {'id': 5, 'symbol': 'SBIN', 'field': 'oi', 'op': 'spike', 'value': 10}
+    ]))
+    producer, other = AlertEngine(path=str(path)), AlertEngine(path=str(path))
+    # rules stored without an id are numbered after the highest one, the same in every process
+    assert sorted(r['id'] for r in producer.rules()) == sorted(r['id'] for r in other.rules()) == [5, 6]
+
+    added = other.add({'symbol': 'TCS', 'field': 'current_price', 'op': 'above', 'value': 3000})
+    assert added['id'] == 7
+    producer.reload()
+    assert fire(producer, 'TCS', 'current_price', 2990, 3010) == [(7, 2990, 3010)]
+
+    assert other.remove(5)
+    assert 5 not in {r['id'] for r in producer.rules()}
+    assert AlertEngine(path=str(path)).add({'symbol': 'ITC', 'field': 'change', 'op': 'change'})['id'] == 8
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'NIFTY', 5])
+def test_alert_body_must_be_an_object(client, body):
+    assert client.post('/api/alerts', json=body).status_code == 400
+
+
+def test_alert_rule_lifecycle(client):
+    response = client.post('/api/alerts', json={'symbol': 'NIFTY', 'field': 'pcr', 'op': 'outside',
+                                                 'low': 0.7, 'high': 1.3})
+    assert response.status_code == 201
+    rule_id = response.get_json()['id']
+    assert rule_id in [r['id'] for r in client.get('/api/alerts').get_json()['rules']]
+    assert client.delete(f'/api/alerts/{rule_id}').status_code == 200
+    assert client.delete(f'/api/alerts/{rule_id}').status_code == 404
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'symbol': 'NIFTY', 'field': 'pcr', 'op': 'above'}, "missing field 'value'"),
+    ({'symbol': 'NIFTY', 'field': 'pcr', 'op': 'outside', 'low': 0.7}, "missing field 'high'"),
+    ({'symbol': 'NIFTY', 'field': 'pcr', 'op': 'above', 'value': [1]}, "field 'value' must be a number"),
+])
+def test_alert_field_errors(client, body, error):
+    response = client.post('/api/alerts', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
@@ -0,0 +1,64 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from bars import BarBuilder
+from market_calendar import IST
+
+
+def candles(start_minute, closes, volume=100):
+    """1-minute candles from 09:15 + start_minute, one per close"""
+    rows = []
+    for i, close in enumerate(closes):
+        minute = 9 * 60 + 15 + start_minute + i
+        rows.append([f"2026-01-05T{minute // 60:02d}:{minute % 60:02d}:00+05:30",
+                     close - 1, close + 2, close - 2, close, volume])
+    return rows
+
+
+def test_candles_roll_up_into_timeframes():
+    builder = BarBuilder()
+    assert builder.on_candles('TCS', candles(0, [100, 101, 102, 103, 104, 105, 106])) == 7
+    bars = builder.get_bars('TCS', 5)
+    assert len(bars['bars']) == 1
+    closed = bars['bars'][0]
+    assert closed['start'] == '2026-01-05T09:15:00'
+    assert (closed['open'], closed['high'], closed['low'], closed['close']) == (99, 106, 98, 104)
+    assert closed['volume'] == 500
+    assert bars['forming']['start'] == '2026-01-05T09:20:00'
+
+
+def test_resent_window_is_applied_once():
+    builder = BarBuilder()
+    window = candles(0, [100, 101, 102])
+    builder.on_candles('TCS', window)
+    # the latest minute is re-sent as a revision, older ones are skipped
+    assert builder.on_candles('TCS', window + candles(3, [103])) == 2
+    assert builder.get_bars('TCS', 15)['forming']['volume'] == 400
+
+
+@pytest.mark.skipif(not hasattr(time, 'tzset'), reason="needs time.tzset")
+def test_ticks_are_bucketed_in_ist_whatever_the_server_timezone(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    try:
+        builder = BarBuilder()
+        ts = datetime(2026, 1, 5, 9, 16, 30, tzinfo=IST).timestamp()
+        builder.on_tick({'symbol': 'TCS', 'price': 3000.0, 'volume': 10, 'ts': ts})
+        builder.on_tick({'symbol': 'TCS', 'price': 3004.0, 'volume': 5, 'ts': ts + 20})
+        forming = builder.get_bars('TCS', 1)['forming']
+    finally:
+        monkeypatch.delenv('TZ')
+        time.tzset()
+    assert forming['start'] == '2026-01-05T09:16:00'
+    assert (forming['open'], forming['high'], forming['close'], forming['volume']) == (3000.0, 3004.0, 3004.0, 15)
+
+
+def test_indicators_warm_up():
+    builder = BarBuilder()
+    builder.on_candles('TCS', candles(0, [100 + (i % 7) for i in range(40)]))
+    indicators = builder.get_indicators('TCS', 1)
+    assert indicators['closed_bars'] == 39
+    assert indicators['ema_9'] is not None
+    assert 0 <= indicators['rsi_14'] <= 100
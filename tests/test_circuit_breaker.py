@@ -0,0 +1,76 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the breaker module"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'time', lambda: now[0])
+    return now
+
+
+def fail():
+    raise ConnectionError("upstream down")
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('ltp', failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == CLOSED
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+
+    # refused without calling upstream
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: pytest.fail("called through an open breaker"))
+    assert breaker.total_rejected == 1
+
+
+def test_success_resets_the_count(clock):
+    breaker = CircuitBreaker('ltp', failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    breaker = CircuitBreaker('candles', failure_threshold=1, reset_timeout=30, half_open_probes=1)
+    breaker.record_failure()
+    clock[0] += 31
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # one probe at a time
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opened_at == clock[0]
+
+    clock[0] += 31
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+
+
+def test_released_probe_frees_the_slot(clock):
+    breaker = CircuitBreaker('quote', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker('ltp', failure_threshold=1, slow_call_threshold=5.0)
+    breaker.record_success(duration=6.0)
+    assert breaker.state == OPEN
+
+
+def test_breakers_are_shared_per_name():
+    assert circuit_breaker.get_breaker('test-shared') is circuit_breaker.get_breaker('test-shared')
+    assert 'test-shared' in circuit_breaker.all_breakers()
@@ -0,0 +1,96 @@
+import itertools
+import time
+
+import pytest
+
+from credentials import CredentialPool, HashRing, NoCredentialError
+
+ACCOUNTS = [{'api_key': f'key{i}', 'username': f'user{i}', 'password': 'pw', 'totp_token': 'totp'} for i in range(3)]
+_endpoints = itertools.count()
+
+
+@pytest.fixture
+def endpoint():
+    """A fresh endpoint name: buckets are process-wide per credential and endpoint"""
+    return f"test-endpoint-{next(_endpoints)}"
+
+
+@pytest.fixture
+def pool():
+    pool = CredentialPool(ACCOUNTS)
+    for credential in pool:
+        credential.auth_token = 'token'
+    return pool
+
+
+def test_ring_moves_only_the_lost_credentials_keys():
+    keys = [f"SYMBOL{i}" for i in range(500)]
+    full = HashRing(['credential-1', 'credential-2', 'credential-3'])
+    owners = {key: full.walk(key)[0] for key in keys}
+    assert set(owners.values()) == {'credential-1', 'credential-2', 'credential-3'}
+
+    smaller = HashRing(['credential-1', 'credential-3'])
+    for key in keys:
+        if owners[key] != 'credential-2':
+            assert smaller.walk(key)[0] == owners[key]
+        # the next owner clockwise is the failover target
+        assert smaller.walk(key)[0] == [n for n in full.walk(key) if n != 'credential-2'][0]
+
+
+def test_pool_names_hide_usernames(pool):
+    assert [c.name for c in pool] == ['credential-1', 'credential-2', 'credential-3']
+    assert 'user' not in repr(pool.to_dict())
+
+
+def test_same_key_same_owner_and_failover_when_out_of_tokens(pool, endpoint):
+    owner = pool.acquire('TCS', endpoint, budget=0)
+    assert pool.acquire('TCS', endpoint, budget=0) is owner
+    owner.bucket(endpoint).tokens = 0
+    standby = pool.acquire('TCS', endpoint, budget=0)
+    assert standby is not owner and standby is pool.candidates('TCS')[1]
+
+
+def test_throttled_and_expired_credentials_leave_the_rotation(pool, endpoint):
+    owner, second, third = pool.candidates('TCS')
+    owner.throttle(seconds=60)
+    second.expire()
+    assert pool.acquire('TCS', endpoint, budget=0) is third
+    assert pool.to_dict()[owner.name]['throttled_for'] > 0
+    assert pool.to_dict()[second.name]['expirations'] == 1
+
+    third.expire()
+    with pytest.raises(NoCredentialError, match='no healthy credential'):
+        pool.acquire('TCS', endpoint, budget=1)
+
+
+def test_waits_within_the_budget_then_gives_up(pool, endpoint):
+    for credential in pool:
+        credential.bucket(endpoint).tokens = 0
+    with pytest.raises(NoCredentialError, match='rate limited'):
+        pool.acquire('TCS', endpoint, budget=0.01)
+    # the default 5/s refill gives a token within 0.2s
+    started = time.monotonic()
+    assert pool.acquire('TCS', endpoint, budget=1) is not None
+    assert time.monotonic() - started < 0.5
+
+
+def test_debug_shows_no_account_details(client):
+    body = client.get('/debug?format=json').get_json()
+    assert 'username' not in body['auth'] and 'api_key' not in body['auth']
+    assert all(name.startswith('credential-') for name in body['auth']['credentials'])
+
+
+class Response:
+    def __init__(self, status_code, content=b'{}'):
+        self.status_code, self.content = status_code, content
+
+
+def test_responses_update_health(pool):
+    first, second, third = pool
+    first.check_response(Response(429))
+    second.check_response(Response(200, b'{"errorcode":"AG8001","message":"Invalid Token"}'))
+    third.check_response(Response(200))
+    assert (first.throttles, first.authenticated, second.authenticated) == (1, True, False)
+    assert pool.healthy() == [third]
+    third.check_response(Response(401))
+    assert pool.healthy() == []
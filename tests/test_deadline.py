@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from deadline import DeadlineExceeded, call_timeout, current_deadline, deadline_scope, run_parallel
+
+
+def test_call_timeout_is_clamped_to_the_budget():
+    assert call_timeout(10) == 10
+    with deadline_scope(0.5):
+        assert 0.4 < call_timeout(10) <= 0.5
+        assert call_timeout(0.1) == 0.1
+    with deadline_scope(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            call_timeout(10)
+
+
+def test_nested_scope_only_tightens():
+    with deadline_scope(0.2) as outer:
+        with deadline_scope(5) as inner:
+            assert inner is outer
+        with deadline_scope(0.05) as inner:
+            assert inner.budget == 0.05
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_run_parallel_reports_late_failed_and_empty_items():
+    def fetch(item):
+        if item == 'slow':
+            time.sleep(1)
+        if item == 'broken':
+            raise ConnectionError("upstream down")
+        if item == 'empty':
+            return None
+        return item.upper()
+
+    started = time.monotonic()
+    with deadline_scope(0.2):
+        results, missed = run_parallel(fetch, ['tcs', 'slow', 'broken', 'empty', 'infy'])
+    assert time.monotonic() - started < 0.6
+    assert results == {'tcs': 'TCS', 'infy': 'INFY'}
+    assert sorted(missed) == ['broken', 'empty', 'slow']
+
+
+def test_deadline_propagates_into_the_pool():
+    with deadline_scope(0.3) as scope:
+        results, _ = run_parallel(lambda item: current_deadline(), [1, 2])
+    assert all(deadline is scope for deadline in results.values())
+
+
+def test_limit_caps_concurrency_and_respects_the_deadline():
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def fetch(item):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return item
+
+    with deadline_scope(0.18):
+        results, missed = run_parallel(fetch, range(20), limit=3)
+    assert peak[0] <= 3
+    assert 6 <= len(results) <= 12
+    assert sorted(list(results) + missed) == list(range(20))
@@ -0,0 +1,58 @@
+import numpy as np
+
+from greeks import GreeksEngine, bs_price, implied_vol, scalar_implied_vol, solve_chains
+
+
+def test_implied_vol_round_trip():
+    spot = 24000.0
+    strikes = np.array([21000, 22500, 23500, 24000, 24500, 25500, 27000], dtype=float)
+    for years in (3 / 365, 30 / 365, 0.5):
+        for is_call in (True, False):
+            vols = np.array([0.35, 0.25, 0.18, 0.15, 0.16, 0.2, 0.3])
+            prices = bs_price(spot, strikes, years, vols, is_call)
+            solved = implied_vol(prices, spot, strikes, years, is_call)
+            fits = np.isfinite(solved)
+            # deep in/out of the money prices can sit at intrinsic and have no unique vol
+            assert fits.sum() >= 5
+            assert np.allclose(bs_price(spot, strikes[fits], years, solved[fits], is_call), prices[fits],
+                               rtol=1e-5, atol=1e-4)
+            # near the money the price pins the vol down
+            near = fits & (np.abs(strikes / spot - 1) <= 0.05)
+            assert np.allclose(solved[near], vols[near], atol=1e-3)
+
+
+def test_implied_vol_without_a_solution():
+    # below intrinsic, above the spot, and expired options have no implied volatility
+    solved = implied_vol([50.0, 30000.0, 100.0], 24000.0, [23000.0, 24000.0, 24000.0], [0.1, 0.1, 0.0], True)
+    assert np.isnan(solved).all()
+
+
+def test_vectorized_matches_scalar_solver():
+    spot, years = 24000.0, 14 / 365
+    strikes = np.array([23000, 23800, 24200, 25000], dtype=float)
+    prices = bs_price(spot, strikes, years, np.array([0.2, 0.16, 0.15, 0.17]), True)
+    solved = implied_vol(prices, spot, strikes, years, True)
+    for price, strike, vol in zip(prices, strikes, solved):
+        assert abs(scalar_implied_vol(price, spot, strike, years, True) - vol) < 1e-4
+
+
+def test_solve_chains_fills_every_row():
+    years = 7 / 365
+    call = float(bs_price(24000.0, 24000.0, years, 0.15, True))
+    chain = {'symbol': 'NIFTY', 'expiry': '30DEC2099', 'spot': 24000.0, 'time_to_expiry': years, 'rows': [
+        {'strike': 24000.0, 'call_ltp': call, 'call_oi': 100, 'put_oi': 150},
+        {'strike': 24100.0, 'call_oi': 50, 'put_oi': 0}
+    ]}
+    (solved,), stats = solve_chains([chain, None])
+    assert stats['options'] == 1 and stats['solved'] == 1
+    atm, wing = solved['rows']
+    assert abs(atm['call_iv'] - 0.15) < 1e-4 and 0.4 < atm['call_delta'] < 0.6
+    assert atm['put_iv'] is None and wing['call_iv'] is None
+    assert solved['atm_strike'] == 24000.0 and solved['pcr'] == 1.0
+
+    engine = GreeksEngine()
+    engine.update([chain])
+    assert engine.pcr('NIFTY') == 1.0 and engine.pcr('BANKNIFTY') is None
+    copy = GreeksEngine()
+    copy.load(engine.export())
+    assert copy.summary() == engine.summary()
@@ -0,0 +1,65 @@
+import pytest
+
+from history_store import MAX_POINTS, HistoryStore, parse_step, parse_time
+
+T0 = 1792300800   # on a 1h boundary
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    store.writer = store._connect()
+    return store
+
+
+def write(store, *samples):
+    store._write(store.writer, [(ts, {'TCS': {'price': price, 'pcr': 1.0}}) for ts, price in samples])
+
+
+def test_rollups_downsample_ohlc(store):
+    write(store, (T0, 100.0), (T0 + 30, 104.0), (T0 + 90, 98.0), (T0 + 301, 101.0))
+    source, points, truncated = store.query('TCS', T0, T0 + 600, step=300)
+    assert (source, truncated) == ('5m', False)
+    assert [(p['ts'], p['open'], p['high'], p['low'], p['close']) for p in points] == [
+        (T0, 100.0, 104.0, 98.0, 98.0), (T0 + 300, 101.0, 101.0, 101.0, 101.0)
+    ]
+    # a step no rollup divides is folded from raw samples
+    assert store.query('TCS', T0, T0 + 600, step=90)[0] == 'raw'
+
+
+def test_resent_sample_is_not_counted_twice(store):
+    write(store, (T0, 100.0), (T0 + 1, 110.0))
+    write(store, (T0 + 1, 90.0))
+    assert store.written == 2
+    rows = store.writer.execute("SELECT samples, low, close FROM rollups WHERE step = 60").fetchall()
+    assert rows == [(2, 100.0, 110.0)]
+
+
+def test_raw_reads_are_capped_and_flagged(store):
+    write(store, *((T0 + i, 100.0) for i in range(MAX_POINTS + 10)))
+    source, points, truncated = store.query('TCS', T0, T0 + 86400)
+    assert (source, len(points), truncated) == ('raw', MAX_POINTS, True)
+    _, rest, truncated = store.query('TCS', points[-1]['ts'] + 1, T0 + 86400)
+    assert (len(rest), truncated) == (10, False)
+
+
+def test_parsing():
+    assert [parse_step(v) for v in (None, 'raw', '300', '5m', '1h', '1d')] == [None, None, 300, 300, 3600, 86400]
+    assert parse_time('2026-10-19T09:15:00', None) == parse_time('2026-10-19T03:45:00+00:00', None)
+    assert parse_time('', 42) == 42
+    for value in ('nan', 'inf', '-1e300', 'yesterday'):
+        with pytest.raises(ValueError):
+            parse_time(value, None)
+
+
+@pytest.mark.parametrize('query', ['from=nan', 'to=inf', 'from=-inf', 'to=1e400', 'from=99999999999999999999',
+                                   'from=yesterday', 'step=-5m', 'step=abc'])
+def test_bad_history_ranges(client, query):
+    assert client.get(f'/api/history?symbol=TCS&{query}').status_code == 400
+
+
+def test_history_response(client):
+    body = client.get('/api/history?symbol=TCS&from=1792300000&to=1792303600').get_json()
+    assert body['source'] == 'raw'
+    assert body['truncated'] is False
+    assert body['from'] == 1792300000
@@ -0,0 +1,45 @@
+from datetime import date, datetime
+
+from market_calendar import (
+    CLOSED, CLOSING, CONTINUOUS, IST, POST_CLOSE, PRE_OPEN_PHASE, candle_range, closing_snapshot_is_current,
+    last_session_day, next_session_start, previous_trading_day, session_phase
+)
+
+
+def ist(*args):
+    return datetime(*args, tzinfo=IST)
+
+
+def test_session_phases():
+    assert session_phase(ist(2026, 1, 5, 8, 59)) == CLOSED
+    assert session_phase(ist(2026, 1, 5, 9, 5)) == PRE_OPEN_PHASE
+    assert session_phase(ist(2026, 1, 5, 9, 15)) == CONTINUOUS
+    assert session_phase(ist(2026, 1, 5, 15, 35)) == CLOSING
+    assert session_phase(ist(2026, 1, 5, 15, 45)) == POST_CLOSE
+    assert session_phase(ist(2026, 1, 5, 16, 0)) == CLOSED
+    # Saturday and a holiday (Republic Day)
+    assert session_phase(ist(2026, 1, 10, 11, 0)) == CLOSED
+    assert session_phase(ist(2026, 1, 26, 11, 0)) == CLOSED
+
+
+def test_trading_days_skip_weekends_and_holidays():
+    assert previous_trading_day(date(2026, 1, 5)) == date(2026, 1, 2)
+    assert previous_trading_day(date(2026, 1, 27)) == date(2026, 1, 23)
+    assert previous_trading_day(date(2026, 10, 21)) == date(2026, 10, 19)
+    assert last_session_day(ist(2026, 1, 5, 9, 0)) == date(2026, 1, 2)
+    assert last_session_day(ist(2026, 1, 5, 9, 15)) == date(2026, 1, 5)
+    assert next_session_start(ist(2026, 1, 23, 17, 0)) == ist(2026, 1, 27, 9, 0)
+
+
+def test_candle_range_covers_two_sessions():
+    start, end = candle_range(ist(2026, 1, 5, 10, 30))
+    assert (start, end) == (datetime(2026, 1, 2, 9, 15), datetime(2026, 1, 5, 10, 30))
+    start, end = candle_range(ist(2026, 1, 10, 12, 0))
+    assert (start, end) == (datetime(2026, 1, 8, 9, 15), datetime(2026, 1, 9, 15, 30))
+
+
+def test_closing_snapshot():
+    evening = ist(2026, 1, 5, 20, 0)
+    assert closing_snapshot_is_current(ist(2026, 1, 5, 16, 1).timestamp(), evening)
+    assert not closing_snapshot_is_current(ist(2026, 1, 5, 15, 50).timestamp(), evening)
+    assert not closing_snapshot_is_current(ist(2026, 1, 5, 16, 1).timestamp(), ist(2026, 1, 6, 10, 0))
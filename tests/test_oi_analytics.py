@@ -0,0 +1,91 @@
+import threading
+
+import numpy as np
+
+from oi_analytics import OIAnalytics, payout_curve, payout_delta
+
+
+def brute_force_payout(strikes, call_oi, put_oi):
+    """Payout matrix the cumulative-sum version replaces: settle at each strike, sum every option"""
+    settle = strikes[:, None]
+    return (np.maximum(settle - strikes, 0) * call_oi + np.maximum(strikes - settle, 0) * put_oi).sum(axis=1)
+
+
+def test_max_pain_matches_brute_force():
+    rng = np.random.default_rng(7)
+    for _ in range(20):
+        strikes = np.sort(rng.choice(np.arange(20000, 26000, 50), size=60, replace=False)).astype(float)
+        call_oi = rng.integers(0, 500000, strikes.size).astype(float)
+        put_oi = rng.integers(0, 500000, strikes.size).astype(float)
+        expected = brute_force_payout(strikes, call_oi, put_oi)
+        curve = payout_curve(strikes, call_oi, put_oi)
+        assert np.allclose(curve, expected)
+        assert np.argmin(curve) == np.argmin(expected)
+
+
+def test_incremental_payout_matches_full():
+    rng = np.random.default_rng(11)
+    strikes = np.arange(100, 200, 5, dtype=float)
+    call_oi = rng.integers(0, 1000, strikes.size).astype(float)
+    put_oi = rng.integers(0, 1000, strikes.size).astype(float)
+    changed = np.array([3, 12])
+    new_call, new_put = call_oi.copy(), put_oi.copy()
+    new_call[changed] += [250, -40]
+    new_put[changed] += [-10, 600]
+
+    updated = payout_curve(strikes, call_oi, put_oi) + payout_delta(
+        strikes, changed, (new_call - call_oi)[changed], (new_put - put_oi)[changed])
+    assert np.allclose(updated, payout_curve(strikes, new_call, new_put))
+
+
+def test_oi_analytics_max_pain():
+    rows = [{'strike': k, 'call_oi': c, 'put_oi': p}
+            for k, c, p in ((100, 10, 900), (110, 200, 500), (120, 800, 100), (130, 900, 0))]
+    result = OIAnalytics().update({'symbol': 'TEST', 'expiry': '30DEC2099', 'spot': 118, 'rows': rows})
+    strikes = np.array([100, 110, 120, 130], dtype=float)
+    expected = strikes[np.argmin(brute_force_payout(strikes, np.array([10, 200, 800, 900.]),
+                                                    np.array([900, 500, 100, 0.])))]
+    assert result['max_pain'] == expected
+    assert result['resistance'][0]['strike'] == 130
+    assert result['support'][0]['strike'] == 100
+
+
+def chain(expiry, call_oi):
+    return {'symbol': 'TEST', 'expiry': expiry, 'spot': 110,
+            'rows': [{'strike': 100 + 10 * i, 'call_oi': c, 'put_oi': 100} for i, c in enumerate(call_oi)]}
+
+
+def test_unchanged_chain_is_a_cache_hit_and_missed_expiries_are_kept():
+    analytics = OIAnalytics()
+    first = analytics.update_many([chain('30DEC2099', [10, 20, 30]), chain('01JAN2000', [5, 5, 5])])
+    assert [r['version'] for r in first] == [1, 1]
+    # the expired chain is dropped, the one that missed this refresh is kept
+    analytics.update_many([chain('29DEC2099', [1, 1, 1])])
+    assert [r['expiry'] for r in analytics.get('TEST')] == ['29DEC2099', '30DEC2099']
+
+    again = analytics.update(chain('30DEC2099', [10, 20, 30]))
+    assert again is first[0] and analytics.stats['hits'] == 1
+    moved = analytics.update(chain('30DEC2099', [10, 25, 30]))
+    assert moved['version'] == 2 and moved['heatmap']['call_oi_change'] == [0, 5, 0]
+    assert analytics.nearest('TEST')['expiry'] == '29DEC2099'
+
+
+def test_reads_while_updating():
+    analytics = OIAnalytics()
+    done = threading.Event()
+    errors = []
+
+    def read_loop():
+        while not done.is_set():
+            try:
+                analytics.results()
+            except RuntimeError as e:
+                errors.append(e)
+
+    reader = threading.Thread(target=read_loop)
+    reader.start()
+    for day in range(1, 29):
+        analytics.update_many([chain(f"{day:02d}DEC2099", [day, 2 * day, 3 * day])])
+    done.set()
+    reader.join()
+    assert not errors and len(analytics.results()) == 28
@@ -0,0 +1,33 @@
+import numpy as np
+
+from oi_buildup import LONG_BUILDUP, LONG_UNWINDING, NEUTRAL, SHORT_BUILDUP, SHORT_COVERING, OIBuildup, classify
+
+
+def test_buildup_quadrants():
+    price_change = np.array([1.0, -1.0, 1.0, -1.0, 0.05, 2.0])
+    oi_change = np.array([3.0, 3.0, -3.0, -3.0, 5.0, 0.1])
+    assert classify(price_change, oi_change).tolist() == [
+        LONG_BUILDUP, SHORT_BUILDUP, SHORT_COVERING, LONG_UNWINDING, NEUTRAL, NEUTRAL
+    ]
+
+
+def test_buildup_thresholds_are_inclusive():
+    assert classify(np.array([0.1]), np.array([0.5])).tolist() == [LONG_BUILDUP]
+    assert classify(np.array([-0.1]), np.array([-0.5])).tolist() == [LONG_UNWINDING]
+
+
+
+def test_previous_session_oi_is_the_baseline():
+    buildup = OIBuildup()
+    result = buildup.update({
+        'TCS': {'price': 3050.0, 'change': 1.2, 'oi': 1100, 'prev_oi': 1000},
+        'INFY': {'price': 1500.0, 'change': -0.8, 'oi': 2000},
+        'WIPRO': {'price': 250.0, 'change': 2.0, 'oi': 0}
+    })
+    assert result['symbols'] == 2
+    assert result['table'][LONG_BUILDUP] == [{'symbol': 'TCS', 'price': 3050.0, 'change': 1.2, 'oi': 1100,
+                                              'oi_change': 100, 'oi_change_pct': 10.0}]
+    # without prev_oi the first OI seen today is the baseline
+    assert result['table'][NEUTRAL][0]['oi_change'] == 0
+    later = buildup.update({'INFY': {'price': 1490.0, 'change': -1.5, 'oi': 2200}})
+    assert later['table'][SHORT_BUILDUP][0]['oi_change_pct'] == 10.0
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from profiling import RequestProfiler, span
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return RequestProfiler(directory=str(tmp_path), sample_rate=0, token='secret', slow_ms=10_000, keep=2,
+                           interval=0.001)
+
+
+def busy(seconds):
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        pass
+
+
+def test_only_token_or_sampled_requests_are_profiled(profiler):
+    assert profiler.start('GET', '/', {}) is None
+    assert profiler.start('GET', '/', {'X-Profile': 'wrong'}) is None
+    profile = profiler.start('GET', '/', {'X-Profile': 'secret'})
+    assert profile.forced
+    profiler.stop(profile, 200)
+
+
+def test_spans_and_samples_are_recorded(profiler):
+    profile = profiler.start('GET', '/api/snapshot', {'X-Profile': 'secret'})
+    with span('fetch'):
+        busy(0.05)
+    with span('render'):
+        pass
+    summary = profiler.stop(profile, 200)
+    assert summary['status'] == 200 and summary['samples'] > 0
+    assert summary['spans']['fetch']['count'] == 1 and summary['spans']['fetch']['ms'] >= 40
+    assert '[fetch]' in profiler.folded(profile.id)
+    # outside a profiled request a span is a no-op
+    with span('fetch'):
+        pass
+
+
+def test_fast_sampled_requests_are_not_kept_and_old_profiles_rotate(profiler):
+    profiler.sample_rate = 1.0
+    assert profiler.stop(profiler.start('GET', '/fast', {}), 200) is None
+    ids = []
+    for _ in range(3):
+        profile = profiler.start('GET', '/', {'X-Profile': 'secret'})
+        profiler.stop(profile, 200)
+        ids.append(profile.id)
+    assert [s['id'] for s in profiler.recent()] == ids[:0:-1]
+    assert profiler.folded(ids[0]) is None
+
+
+def test_profile_endpoints_need_the_token(client, monkeypatch, profiler):
+    import app
+    monkeypatch.setattr(app, 'request_profiler', profiler)
+    assert client.get('/debug/profiles').status_code == 403
+    response = client.get('/api/watchlists/profiled', headers={'X-Profile': 'secret'})
+    profile_id = response.headers['X-Profile-Id']
+    listed = client.get('/debug/profiles', headers={'X-Profile': 'secret'}).get_json()
+    assert listed['profiles'][0]['id'] == profile_id
+    assert client.get(f'/debug/profiles/{profile_id}', headers={'X-Profile': 'secret'}).status_code == 200
+    assert client.get('/debug/profiles/0-0-0', headers={'X-Profile': 'secret'}).status_code == 404
@@ -0,0 +1,79 @@
+import pytest
+
+from providers import INDEX, LTP, OI, MarketDataProvider, ProviderRouter
+
+
+class FakeProvider(MarketDataProvider):
+    capabilities = frozenset({LTP, OI})
+
+    def __init__(self, name, live, latency, prices=None, error=None, available=True):
+        self.name, self.live, self.latency = name, live, latency
+        self.prices, self.error, self.available = prices, error, available
+        self.calls = 0
+
+    def is_available(self):
+        return self.available
+
+    def get_ltp(self, symbols):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {s: p for s, p in (self.prices or {}).items() if s in symbols}
+
+
+def test_live_providers_rank_first_then_by_latency():
+    sim = FakeProvider('sim', live=False, latency=0.0)
+    slow = FakeProvider('slow', live=True, latency=0.5)
+    fast = FakeProvider('fast', live=True, latency=0.1)
+    router = ProviderRouter([sim, slow, fast])
+    assert [p.name for p in router.candidates(LTP)] == ['fast', 'slow', 'sim']
+    assert router.candidates(INDEX) == []
+
+
+def test_fails_over_on_errors_and_empty_answers():
+    broken = FakeProvider('broken', live=True, latency=0.1, error=ConnectionError("reset"))
+    empty = FakeProvider('empty', live=True, latency=0.2, prices={})
+    sim = FakeProvider('sim', live=False, latency=0.0, prices={'TCS': 3000.0})
+    router = ProviderRouter([broken, empty, sim])
+    data, provider = router.fetch(LTP, ['TCS'])
+    assert (data, provider) == ({'TCS': 3000.0}, sim)
+    stats = {p['name']: p for p in router.status()['providers']}
+    assert stats['broken']['failures'] == 1 and stats['empty']['empty'] == 1
+    assert router.status()['served_by'] == {LTP: 'sim'}
+
+
+def test_live_only_never_reaches_the_simulator():
+    live = FakeProvider('live', live=True, latency=0.1, prices={})
+    sim = FakeProvider('sim', live=False, latency=0.0, prices={'TCS': 3000.0})
+    router = ProviderRouter([live, sim])
+    assert router.live_available(LTP)
+    assert router.fetch(LTP, ['TCS'], live_only=True) == (None, None)
+    assert sim.calls == 0
+
+    live.available = False
+    assert not router.live_available(LTP)
+    assert router.fetch(LTP, ['TCS'])[1] is sim
+
+
+@pytest.fixture
+def live_router(monkeypatch):
+    import app
+    live = FakeProvider('angel_rest', live=True, latency=0.1, prices={})
+    monkeypatch.setattr(app, 'market_router', ProviderRouter([live, app.offline_provider]))
+    return live
+
+
+def test_live_session_without_quotes_publishes_no_simulated_ticks(live_router):
+    import app
+    ticks = []
+    app.tick_pipeline.subscribe(ticks.append)
+    steps = app.market_simulator.steps
+    try:
+        data = app.fetch_market_data()
+    finally:
+        app.tick_pipeline.unsubscribe(ticks.append)
+    assert live_router.calls == 1
+    assert app.market_simulator.steps == steps
+    assert data['connection'] == 'live' and data['data_provider'] is None
+    assert data['data_source'] == 'Live Prices (stale)'
+    assert ticks and all('price' not in tick for tick in ticks)
@@ -0,0 +1,61 @@
+import pytest
+
+import rate_limit
+from rate_limit import TokenBucket, get_bucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic() for the bucket module"""
+    now = [100.0]
+    monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_bucket_refills_at_its_rate_up_to_capacity(clock):
+    bucket = TokenBucket('ltp', rate=2, capacity=3)
+    assert all(bucket.try_acquire() for _ in range(3))
+    assert not bucket.try_acquire()
+    assert bucket.retry_after() == pytest.approx(0.5)
+
+    clock[0] += 0.5
+    assert bucket.try_acquire()
+    clock[0] += 60
+    assert bucket.to_dict()['tokens'] == 3
+    assert not bucket.try_acquire(tokens=4)
+    assert (bucket.total_allowed, bucket.total_rejected) == (4, 2)
+
+
+def test_zero_rate_never_refills(clock):
+    bucket = TokenBucket('off', rate=0, capacity=1)
+    assert bucket.try_acquire()
+    assert bucket.retry_after() == float('inf')
+
+
+def test_buckets_are_shared_per_name():
+    first = get_bucket('test-shared', rate=1, capacity=1)
+    assert get_bucket('test-shared', rate=50, capacity=50) is first
+    assert rate_limit.all_buckets()['test-shared'] is first
+
+
+def test_probe_is_rate_limited(client, monkeypatch):
+    import app
+    bucket = TokenBucket('debug_probe', rate=1 / 60, capacity=1)
+    bucket.try_acquire()
+    monkeypatch.setattr(app, 'probe_bucket', bucket)
+    response = client.post('/debug/probe')
+    assert response.status_code == 429
+    assert 55 <= int(response.headers['Retry-After']) <= 61
+    assert response.get_json()['error'] == 'Probe rate limited'
+
+
+def test_debug_makes_no_upstream_calls(client, monkeypatch):
+    import app
+
+    def upstream(*args, **kwargs):
+        raise AssertionError("/debug called upstream")
+
+    monkeypatch.setattr(app.angel_client, 'ensure_session', upstream)
+    body = client.get('/debug?format=json').get_json()
+    assert 'debug_probe' in body['rate_limiters']
+    assert client.get('/debug').status_code == 200
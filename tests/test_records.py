@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from providers import LTP, MarketDataProvider, ProviderRouter
+from records import MarketRow, RowCache
+from snapshot_delta import DeltaRing
+
+
+def test_unchanged_rows_are_shared():
+    cache = RowCache()
+    first = cache.row('TCS', current_price=3000.0, change=0.5, oi=123)
+    assert cache.row('TCS', current_price=3000.0, change=0.5, volume=9) is first
+    assert cache.row('TCS', current_price=3001.0, change=0.5) is not first
+    assert 'oi' not in first
+
+
+def test_weighted_rows_follow_their_base():
+    cache, weights = RowCache(), RowCache()
+    row = cache.row('TCS', current_price=3000.0)
+    weighted = weights.weighted(row, 4.0)
+    assert weighted['weight'] == 4.0 and row['weight'] is None
+    assert weights.weighted(row, 4.0) is weighted
+    assert weights.weighted(cache.row('TCS', current_price=3001.0), 4.0) is not weighted
+    assert isinstance(weighted, MarketRow)
+
+
+class LiveQuotes(MarketDataProvider):
+    name = 'angel_rest'
+    capabilities = frozenset({LTP})
+
+    def __init__(self, prices):
+        self.prices = prices
+
+    def get_ltp(self, symbols):
+        return {s: p for s, p in self.prices.items() if s in symbols}
+
+
+@pytest.fixture
+def live_refresh(monkeypatch):
+    """fetch_market_data() against live quotes, a second later on each call"""
+    import app
+    quotes = LiveQuotes({s: 100.0 for s in app.symbol_registry.symbols()})
+    monkeypatch.setattr(app, 'market_router', ProviderRouter([quotes]))
+    monkeypatch.setattr(app, 'live_price_times', {})
+    clock = [datetime(2026, 10, 19, 10, 0, 0)]
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            clock[0] += timedelta(seconds=1)
+            return clock[0]
+
+    monkeypatch.setattr(app, 'datetime', Clock)
+    return quotes, app.fetch_market_data
+
+
+def test_refreshes_at_constant_prices_share_rows_and_deltas_list_moves(live_refresh):
+    quotes, refresh = live_refresh
+    first, second = refresh(), refresh()
+    assert first['timestamp'] != second['timestamp']
+    assert all(a is b for a, b in zip(first['nifty_data'], second['nifty_data']))
+
+    moved = next(row['symbol'] for row in second['nifty_data'])
+    quotes.prices[moved] = 101.0
+    third = refresh()
+    ring = DeltaRing()
+    ring.add(2, second)
+    ring.add(3, third)
+    assert list(ring.delta(2, 3)['changes']['rows']) == [moved]
+
+
+def test_missed_symbol_is_carried_forward_with_its_last_live_time(live_refresh):
+    quotes, refresh = live_refresh
+    first = refresh()
+    missed = first['nifty_data'][0]['symbol']
+    del quotes.prices[missed]
+    second, third = refresh(), refresh()
+    row = second['nifty_data'][0]
+    assert (row['stale'], row['current_price'], row['as_of']) == (True, 100.0, first['timestamp'])
+    assert third['nifty_data'][0] is row
@@ -0,0 +1,71 @@
+import json
+import math
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+
+from records import MarketRow
+from serializers import BINARY, JSON, from_binary, negotiate, to_binary, to_json
+
+
+def make_payload(version, prices, timestamp='10:15:30'):
+    rows = [MarketRow(symbol, current_price=price, change=0.5, oi_change=1200, pcr_ratio=0.9, weight=2.5)
+            for symbol, price in prices.items()]
+    return {
+        'nifty_data': rows[:2],
+        'bank_data': rows[1:],
+        'nifty_pcr': 0.93,
+        'bank_pcr': None,
+        'nifty_impact': {'total_impact': 0.42, 'sentiment': 'Neutral'},
+        'connection': 'live',
+        'timestamp': timestamp,
+        'fetched_at': 1792300000.0,
+        'version': version
+    }
+
+
+def test_binary_decode():
+    payload = make_payload(7, {'RELIANCE': 1372.0, 'HDFCBANK': 1650.5, 'SBIN': 812.0})
+    snapshot = from_binary(to_binary(payload))
+
+    assert snapshot['version'] == 7
+    assert snapshot['flags'] == 1
+    assert math.isclose(snapshot['nifty_pcr'], 0.93, rel_tol=1e-6)
+    assert math.isnan(snapshot['bank_pcr'])
+    assert math.isnan(snapshot['nifty_spot'])
+    rows = {row['symbol']: row for row in snapshot['rows']}
+    assert list(rows) == ['RELIANCE', 'HDFCBANK', 'SBIN']
+    # HDFCBANK is in both indices: one record with both weights
+    assert rows['HDFCBANK']['nifty_weight'] == 2.5 and rows['HDFCBANK']['bank_weight'] == 2.5
+    assert rows['RELIANCE']['bank_weight'] == 0.0
+    assert rows['SBIN']['price'] == 812.0
+    assert rows['SBIN']['oi_change'] == 1200
+
+
+def test_binary_rejects_other_formats():
+    body = bytearray(to_binary(make_payload(1, {'TCS': 3000.0})))
+    body[:4] = b'XXXX'
+    with pytest.raises(ValueError):
+        from_binary(bytes(body))
+
+
+
+def test_json_encodes_row_records():
+    payload = make_payload(3, {'TCS': 3000.0})
+    decoded = json.loads(to_json(payload))
+    assert decoded['nifty_data'][0]['symbol'] == 'TCS'
+    assert decoded['nifty_data'][0]['current_price'] == 3000.0
+
+
+def test_negotiate_defaults_to_json():
+    assert negotiate(MIMEAccept([])) == JSON
+    assert negotiate(MIMEAccept([('*/*', 1)])) == JSON
+    assert negotiate(MIMEAccept([(BINARY, 1), (JSON, 0.5)])) == BINARY
+    assert negotiate(MIMEAccept([('text/html', 1)])) == JSON
+
+
+def test_snapshot_by_accept_header(client):
+    body = client.get('/api/snapshot', headers={'Accept': BINARY})
+    assert body.headers['Content-Type'].startswith(BINARY)
+    assert from_binary(body.data)['rows']
+    assert 'nifty_data' in client.get('/api/snapshot').get_json()
@@ -0,0 +1,83 @@
+import os
+import struct
+import threading
+
+import pytest
+
+from shared_snapshot import HEADER, ProducerElection, SharedBuffer, fcntl
+
+
+def test_readers_see_each_version(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    writer, reader = SharedBuffer(path, capacity=1 << 16), SharedBuffer(path, capacity=1 << 16)
+    assert reader.read() is None
+
+    writer.write({'version': 1, 'rows': list(range(100))})
+    first = reader.read()
+    assert first == {'version': 1, 'rows': list(range(100))}
+    # an unchanged version is not decoded again
+    assert reader.read() is first
+
+    writer.write({'version': 2})
+    assert reader.read() == {'version': 2}
+    assert reader.age() is not None and reader.age() < 5
+
+
+def test_oversized_payload_is_refused(tmp_path):
+    writer = SharedBuffer(str(tmp_path / 'snapshot.bin'), capacity=64)
+    assert writer.write({'version': 1}) is True
+    assert writer.write({'rows': 'x' * 1000}) is False
+    assert SharedBuffer(writer.path).read() == {'version': 1}
+
+
+def test_write_in_progress_keeps_previous_version(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    writer, reader = SharedBuffer(path, capacity=1 << 12), SharedBuffer(path, capacity=1 << 12)
+    writer.write({'version': 1})
+    assert reader.read() == {'version': 1}
+    # an odd sequence number is a write in progress: readers keep what they have
+    seq = HEADER.unpack_from(writer._map, 0)[0]
+    struct.pack_into('<Q', writer._map, 0, seq + 1)
+    assert reader.read() == {'version': 1}
+
+
+def test_concurrent_reads_are_never_torn(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    writer = SharedBuffer(path, capacity=1 << 20)
+    writer.write({'version': 0, 'rows': [0] * 5000})
+    done = threading.Event()
+    torn = []
+
+    def read_loop():
+        reader = SharedBuffer(path, capacity=1 << 20)
+        while not done.is_set():
+            state = reader.read()
+            if state is not None and set(state['rows']) != {state['version']}:
+                torn.append(state['version'])
+
+    readers = [threading.Thread(target=read_loop) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for version in range(1, 300):
+        writer.write({'version': version, 'rows': [version] * 5000})
+    done.set()
+    for thread in readers:
+        thread.join()
+    assert not torn
+    assert os.path.getsize(path) >= 1 << 20
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs flock")
+def test_one_producer_per_lock_and_takeover(tmp_path):
+    path = str(tmp_path / 'producer.lock')
+    first, second = ProducerElection(path), ProducerElection(path, retry_interval=0.01)
+    elected = threading.Event()
+    first.start(lambda: None)
+    second.start(elected.set)
+    assert first.is_producer and not first.is_follower
+    assert second.is_follower and not elected.is_set()
+
+    # the producer exits: its lock goes with it and a follower takes over
+    os.close(first._fd)
+    assert elected.wait(2)
+    assert second.is_producer and not second.is_follower
@@ -0,0 +1,33 @@
+from fno_universe import FNO_UNIVERSE
+from providers import SimulatorProvider
+from simulator import MarketSimulator
+from tick_pipeline import TickPipeline
+
+
+def test_same_seed_same_ticks():
+    a, b = MarketSimulator(seed=7), MarketSimulator(seed=7)
+    assert a.universe == list(FNO_UNIVERSE)
+    for _ in range(5):
+        assert a.step(now=0) == b.step(now=0)
+
+
+def test_added_symbols_start_the_same_whenever_they_join():
+    early = MarketSimulator(seed=7, universe=['TCS', 'INFY'])
+    late = MarketSimulator(seed=7, universe=['TCS', 'INFY'])
+    assert early.add_symbols(['TCS', 'MYWATCH', 'MYWATCH']) == ['MYWATCH']
+    late.step(now=0)
+    late.add_symbols(['MYWATCH'])
+    assert late.prices['MYWATCH'] == early.prices['MYWATCH']
+    assert late.step(now=0)[-1]['symbol'] == 'MYWATCH'
+
+
+def test_provider_simulates_requested_symbols_and_throttles_steps():
+    pipeline = TickPipeline()
+    ticks = []
+    pipeline.subscribe(ticks.append)
+    provider = SimulatorProvider(MarketSimulator(seed=1, universe=['TCS']), pipeline, min_interval=60)
+    prices = provider.get_ltp(['TCS', 'NEWCO'])
+    assert set(prices) == {'TCS', 'NEWCO'}
+    assert len(ticks) == 2
+    provider.get_oi(['TCS', 'NEWCO'])
+    assert len(ticks) == 2
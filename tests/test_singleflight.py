@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(count, target):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls = SingleFlight(), []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'price': 1372.0}
+
+    results, errors = run_concurrently(8, lambda: flight.do('RELIANCE', fetch))
+    assert len(calls) == 1
+    assert not errors and len(results) == 8
+    assert all(result is results[0] for result in results)
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    flight, calls = SingleFlight(), []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ConnectionError("upstream down")
+
+    results, errors = run_concurrently(4, lambda: flight.do('ltp', fail))
+    assert len(calls) == 1 and not results
+    assert len(errors) == 4 and all(isinstance(e, ConnectionError) for e in errors)
+    # a finished call leaves nothing behind, so the next caller fetches again
+    assert flight.do('ltp', lambda: 'ok') == 'ok'
+
+
+def test_keys_are_independent():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_result_shared_across_processes(tmp_path):
+    flight = SingleFlight(lock_dir=str(tmp_path))
+    marker = tmp_path / 'calls'
+
+    def fetch():
+        with open(marker, 'a') as f:
+            f.write('x')
+        time.sleep(0.5)
+        return 'token'
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os._exit(0 if flight.do('login', fetch) == 'token' else 1)
+        except BaseException:
+            os._exit(1)
+    time.sleep(0.1)
+    assert flight.do('login', fetch) == 'token'
+    assert os.waitpid(pid, 0)[1] == 0
+    # the second process waited on the lock and took the first one's result
+    assert marker.read_text() == 'x'
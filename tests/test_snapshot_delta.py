@@ -0,0 +1,65 @@
+from records import MarketRow
+from render_cache import RenderCache
+from snapshot_delta import DeltaRing, apply_delta
+
+
+def make_payload(version, prices, timestamp='10:15:30'):
+    rows = [MarketRow(symbol, current_price=price, change=0.5, oi_change=1200, pcr_ratio=0.9, weight=2.5)
+            for symbol, price in prices.items()]
+    return {
+        'nifty_data': rows[:2],
+        'bank_data': rows[1:],
+        'nifty_pcr': 0.93,
+        'bank_pcr': None,
+        'nifty_impact': {'total_impact': 0.42, 'sentiment': 'Neutral'},
+        'connection': 'live',
+        'timestamp': timestamp,
+        'fetched_at': 1792300000.0,
+        'version': version
+    }
+
+
+def test_delta_round_trip():
+    old = make_payload(41, {'RELIANCE': 1372.0, 'HDFCBANK': 1650.5, 'SBIN': 812.0})
+    new = make_payload(42, {'RELIANCE': 1373.2, 'HDFCBANK': 1650.5}, timestamp='10:15:45')
+    new['nifty_impact'] = dict(old['nifty_impact'], total_impact=0.44)
+    del new['bank_pcr']
+
+    ring = DeltaRing()
+    ring.add(41, old)
+    ring.add(42, new)
+    delta = ring.delta(41, 42)
+
+    assert apply_delta(old, delta) == new
+    assert ['rows', 'SBIN'] in delta['removed']
+    assert 'HDFCBANK' not in delta['changes'].get('rows', {})
+
+
+def test_delta_outside_the_ring():
+    ring = DeltaRing(size=2)
+    for version in (1, 2, 3):
+        ring.add(version, make_payload(version, {'TCS': 3000.0 + version}))
+    assert ring.delta(1, 3) is None
+    assert ring.delta(2, 3) is not None
+
+
+def test_render_cache_keeps_nothing_for_an_empty_render():
+    cache = RenderCache()
+    assert cache.get_or_render(1, 'application/json', lambda: None, variant=0) is None
+    rendered = cache.get_or_render(1, 'application/json', lambda: '{}', variant=0)
+    assert rendered.body == b'{}' and cache.renders == 1
+
+
+def test_evicted_base_gets_the_full_snapshot(client, monkeypatch):
+    import app
+    version = client.get('/api/snapshot').get_json()['version']
+    response = client.get(f'/api/snapshot?since={version}')
+    assert response.headers['X-Snapshot-Delta'] == str(version)
+    assert response.get_json()['changes'] == {}
+
+    # the base is in the ring when checked but evicted before the delta is computed
+    app.delta_ring.add(-version, {'version': -version})
+    monkeypatch.setattr(app.delta_ring, 'delta', lambda base, version: None)
+    response = client.get(f'/api/snapshot?since={-version}')
+    assert 'X-Snapshot-Delta' not in response.headers
+    assert response.get_json()['version'] == version
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from synthetic_index import SyntheticIndex
+
+WEIGHTS = {'RELIANCE': 10.0, 'HDFCBANK': 13.0, 'TCS': 4.0}
+PRICES = {'RELIANCE': 1370.0, 'HDFCBANK': 1650.0, 'TCS': 3050.0}
+
+
+def exact_level(anchor_level, base, prices, weights):
+    tracked = [s for s in base if s in weights]
+    total = sum(weights[s] for s in tracked)
+    return anchor_level * sum(weights[s] * prices[s] / base[s] for s in tracked) / total
+
+
+def test_level_follows_constituent_ticks():
+    index = SyntheticIndex('TEST', WEIGHTS)
+    assert index.level is None
+    index.anchor(24000.0, PRICES)
+    assert index.level == pytest.approx(24000.0)
+
+    index.on_tick({'symbol': 'HDFCBANK', 'price': 1683.0})
+    index.on_tick({'symbol': 'NOT_IN_INDEX', 'price': 10.0})
+    prices = dict(PRICES, HDFCBANK=1683.0)
+    assert index.level == pytest.approx(exact_level(24000.0, PRICES, prices, WEIGHTS))
+
+
+def test_constituent_first_seen_after_anchor_enters_at_par():
+    index = SyntheticIndex('TEST', WEIGHTS)
+    index.anchor(24000.0, {'RELIANCE': 1370.0})
+    index.on_tick({'symbol': 'TCS', 'price': 3050.0})
+    assert index.level == pytest.approx(24000.0)
+    index.on_tick({'symbol': 'TCS', 'price': 3111.0})
+    assert index.level > 24000.0
+
+
+def test_running_sum_is_rebuilt_every_n_ticks():
+    rng = random.Random(3)
+    index = SyntheticIndex('TEST', WEIGHTS, recompute_every=50)
+    index.anchor(24000.0, PRICES)
+    prices = dict(PRICES)
+    for i in range(120):
+        symbol = rng.choice(list(WEIGHTS))
+        prices[symbol] = round(prices[symbol] * rng.uniform(0.99, 1.01), 2)
+        index.on_tick({'symbol': symbol, 'price': prices[symbol]})
+    assert index._ticks_since_recompute == 20
+    assert index.level == pytest.approx(exact_level(24000.0, PRICES, prices, WEIGHTS), rel=1e-12)
+
+
+def test_anchor_resets_to_the_official_level():
+    index = SyntheticIndex('TEST', WEIGHTS)
+    index.anchor(24000.0, PRICES)
+    index.on_tick({'symbol': 'RELIANCE', 'price': 1400.0})
+    index.anchor(24100.0, dict(PRICES, RELIANCE=1400.0))
+    assert index.level == pytest.approx(24100.0)
+    assert index.to_dict()['tracked_constituents'] == 3
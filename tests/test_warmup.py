@@ -0,0 +1,38 @@
+from warmup import BOOT, WORKER, Warmup, wait_for
+
+
+def test_phases_run_once_and_failures_do_not_block_readiness():
+    warmup = Warmup()
+    calls = []
+    warmup.step(BOOT, 'instruments', lambda: calls.append('instruments'))
+    warmup.step(BOOT, 'login', lambda: 1 / 0)
+    warmup.step(WORKER, 'snapshot', lambda: calls.append('snapshot'))
+
+    warmup.run(BOOT)
+    warmup.run(BOOT)
+    assert calls == ['instruments']
+    assert not warmup.ready and warmup.status()['phases_done'] == [BOOT]
+
+    warmup.run_in_background(WORKER).join(2)
+    status = warmup.status()
+    assert status['ready'] and calls == ['instruments', 'snapshot']
+    assert status['steps']['login']['ok'] is False and 'division' in status['steps']['login']['error']
+
+
+def test_wait_for_returns_the_last_result():
+    answers = iter([None, None, 'ready'])
+    assert wait_for(lambda: next(answers), timeout=1, interval=0) == 'ready'
+    assert wait_for(lambda: None, timeout=0.05, interval=0.01) is None
+
+
+def test_healthz_reports_readiness(client, monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'warmup', Warmup())
+    response = client.get('/healthz')
+    assert response.status_code == 503
+    assert response.get_json()['role'] in ('producer', 'follower', 'standalone')
+
+    app.warmup.run(BOOT)
+    app.warmup.run(WORKER)
+    response = client.get('/healthz')
+    assert response.status_code == 200 and response.get_json()['ready']
@@ -0,0 +1,89 @@
+import pytest
+
+from watchlists import Basket, PriceTable, SymbolRegistry, WatchlistManager
+
+
+@pytest.mark.parametrize('weights', ['TCS', 5, None, {'TCS': 'heavy'}, {'TCS': [1]}])
+def test_basket_rejects_bad_weights(weights):
+    with pytest.raises(ValueError):
+        Basket('main', weights)
+
+
+def test_basket_normalizes_weights():
+    basket = Basket('banks', {'hdfcbank': 3, 'sbin': 1, 'yesbank': 0, 'axisbank': float('nan')}, normalize=True)
+    assert basket.weights == {'HDFCBANK': 75.0, 'SBIN': 25.0}
+    assert Basket('it', ['tcs', 'infy']).weights == {'TCS': 1.0, 'INFY': 1.0}
+
+
+def test_registry_counts_subscribers():
+    registry = SymbolRegistry()
+    manager = WatchlistManager(registry)
+    manager.set_watchlist('a', 'main', ['TCS', 'INFY'])
+    manager.set_watchlist('b', 'main', ['TCS'])
+    assert registry.symbols() == ['INFY', 'TCS']
+    assert registry.subscribers('TCS') == 2
+    manager.delete_watchlist('a', 'main')
+    assert registry.symbols() == ['TCS']
+
+
+def test_view_is_built_from_the_price_table():
+    registry, prices = SymbolRegistry(), PriceTable()
+    manager = WatchlistManager(registry)
+    manager.set_watchlist('a', 'main', {'TCS': 1, 'INFY': 1})
+    prices.update([{'symbol': 'TCS', 'current_price': 3000.0}])
+    view, = manager.build_view('a', prices)
+    assert [(row['symbol'], row['weight']) for row in view['rows']] == [('TCS', 50.0)]
+    assert view['missing'] == ['INFY']
+
+
+def test_file_is_shared_between_managers(tmp_path):
+    path = str(tmp_path / 'watchlists.json')
+    first, second = SymbolRegistry(), SymbolRegistry()
+    writer, reader = WatchlistManager(first, path=path), WatchlistManager(second, path=path)
+
+    writer.set_watchlist('a', 'main', ['TCS'])
+    reader.set_watchlist('b', 'main', ['INFY'])
+    # each save is a read-modify-write, so neither list is lost
+    assert set(WatchlistManager(SymbolRegistry(), path=path).get_watchlists('a')) == {'main'}
+    reader.reload()
+    assert second.symbols() == ['INFY', 'TCS']
+
+    writer.reload()
+    writer.delete_watchlist('b', 'main')
+    reader.reload()
+    assert second.symbols() == ['TCS']
+
+
+def test_limits():
+    manager = WatchlistManager(SymbolRegistry(), is_known_symbol=lambda symbol: symbol != 'NOPE')
+    with pytest.raises(ValueError):
+        manager.set_watchlist('a', 'main', ['NOPE'])
+    with pytest.raises(ValueError):
+        manager.set_watchlist('a', 'main', [])
+
+
+@pytest.mark.parametrize('body', [
+    {'symbols': 'TCS'},
+    {'symbols': 5},
+    [1, 2],
+    {'symbols': {'TCS': 'heavy'}},
+    {'symbols': ['NOT_A_SYMBOL']},
+])
+def test_bad_watchlist_bodies(client, body):
+    assert client.put('/api/watchlists/tester/main', json=body).status_code == 400
+
+
+def test_watchlist_saved(client):
+    response = client.put('/api/watchlists/tester/banks', json={'symbols': {'HDFCBANK': 3, 'SBIN': 1}})
+    assert response.status_code == 200
+    assert response.get_json()['weights'] == {'HDFCBANK': 75.0, 'SBIN': 25.0}
+    assert 'banks' in client.get('/api/watchlists/tester').get_json()
+
+
+def test_write_token(client, monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'WATCHLIST_TOKEN', 'secret')
+    body = {'symbols': ['TCS']}
+    assert client.put('/api/watchlists/tester/it', json=body).status_code == 403
+    assert client.put('/api/watchlists/tester/it', json=body, headers={'X-Watchlist-Token': 'wrong'}).status_code == 403
+    assert client.put('/api/watchlists/tester/it', json=body, headers={'X-Watchlist-Token': 'secret'}).status_code == 200
@@ -0,0 +1,48 @@
+"""
+TICK INGESTION PIPELINE
+=======================
+Single ingestion path for price updates. Whatever produces data (a REST
+refresh, a streaming feed, the simulator) publishes ticks here and every
+incremental consumer subscribes to it.
+
+A tick is a dict with at least 'symbol'; 'price' is present when a fresh
+trade price is known. Optional keys are 'ts' (epoch seconds), 'change' (%),
+'oi', 'oi_change', 'volume' and 'pcr_ratio'.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TickPipeline:
+    def __init__(self):
+        self._handlers = []
+        self._lock = threading.Lock()
+        self.ticks_published = 0
+
+    def subscribe(self, handler):
+        """Register handler(tick); returns it so it can be used as a decorator"""
+        with self._lock:
+            self._handlers = self._handlers + [handler]
+        return handler
+
+    def unsubscribe(self, handler):
+        with self._lock:
+            self._handlers = [h for h in self._handlers if h is not handler]
+
+    def publish(self, tick):
+        if 'ts' not in tick:
+            tick['ts'] = time.time()
+        self.ticks_published += 1
+        for handler in self._handlers:
+            try:
+                handler(tick)
+            except Exception as e:
+                logger.error(f"❌ Tick handler {getattr(handler, '__qualname__', handler)} failed: {e}")
+
+    def publish_many(self, ticks):
+        for tick in ticks:
+            self.publish(tick)
@@ -0,0 +1,85 @@
+"""
+STARTUP WARM-UP & READINESS
+===========================
+Named warm-up steps grouped in phases, each run once per process:
+
+    boot     before forking (gunicorn preload_app) or at import: work that is
+             safe to share with forked workers (instrument master, compiled
+             templates, the login token)
+    worker   in every worker after the fork: connection pools, background
+             threads, the first snapshot
+
+A failing step is recorded and warm-up carries on (the app degrades to the
+built-in tokens or sample data); readiness means every phase has finished,
+so a load balancer polling /healthz only sends traffic to warm instances.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BOOT = 'boot'
+WORKER = 'worker'
+
+
+class Warmup:
+    def __init__(self, phases=(BOOT, WORKER)):
+        self.phases = phases
+        self._steps = {}
+        self._results = {}
+        self._done = set()
+        self._lock = threading.Lock()
+
+    def step(self, phase, name, fn):
+        """Register fn() as a warm-up step of `phase`"""
+        self._steps.setdefault(phase, []).append((name, fn))
+
+    def run(self, phase):
+        """Run a phase's steps in order (a phase only runs once per process)"""
+        with self._lock:
+            if phase in self._done:
+                return
+            started = time.time()
+            for name, fn in self._steps.get(phase, ()):
+                step_started = time.time()
+                try:
+                    fn()
+                    result = {'ok': True}
+                except Exception as e:
+                    logger.warning(f"⚠️ Warm-up step {name} failed: {e}")
+                    result = {'ok': False, 'error': str(e)}
+                result['seconds'] = round(time.time() - step_started, 3)
+                self._results[name] = result
+            self._done.add(phase)
+        logger.info(f"🔥 Warm-up phase {phase} finished in {time.time() - started:.2f}s")
+
+    def run_in_background(self, *phases):
+        """Run phases in order on a daemon thread"""
+        thread = threading.Thread(
+            target=lambda: [self.run(phase) for phase in phases], name='warmup', daemon=True
+        )
+        thread.start()
+        return thread
+
+    @property
+    def ready(self):
+        return all(phase in self._done for phase in self.phases)
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'phases_done': [phase for phase in self.phases if phase in self._done],
+            'steps': dict(self._results)
+        }
+
+
+def wait_for(condition, timeout, interval=0.2):
+    """Poll condition() until it is true or `timeout` seconds pass; returns the last result"""
+    deadline = time.time() + timeout
+    while True:
+        result = condition()
+        if result or time.time() >= deadline:
+            return result
+        time.sleep(interval)
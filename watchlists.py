@@ -0,0 +1,270 @@
+"""
+WATCHLISTS & SHARED SYMBOL SUBSCRIPTIONS
+========================================
+Per-user watchlists and weighted baskets on top of one shared symbol registry.
+
+Every basket subscribes its symbols in SymbolRegistry, so a refresh fetches
+each unique symbol once no matter how many users watch it. Prices land in the
+shared PriceTable and each user's view is derived from it without any extra
+upstream calls.
+
+With a JSON file the watchlists are shared by every worker on the host:
+changes are read-modify-write under an flock on <path>.lock, and each process
+reloads the file (and its registry subscriptions) when it has been replaced,
+so lists saved through any worker are fetched by the producer.
+"""
+
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; writes are only serialized within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAX_WATCHLISTS_PER_USER = 20
+MAX_SYMBOLS_PER_WATCHLIST = 50
+
+
+class Basket:
+    """Named set of symbols with weights (in %)"""
+
+    def __init__(self, name, weights, normalize=False):
+        """`weights` is a list of symbols (equal weights) or {symbol: weight}; raises ValueError otherwise"""
+        if isinstance(weights, (list, tuple)):
+            weights = {symbol: 1.0 for symbol in weights}
+        if not isinstance(weights, dict):
+            raise ValueError("symbols must be a list of symbols or an object of {symbol: weight}")
+        try:
+            weights = {str(s).upper(): float(w) for s, w in weights.items()}
+        except (TypeError, ValueError):
+            raise ValueError("weights must be numbers")
+        weights = {s: w for s, w in weights.items() if math.isfinite(w) and w > 0}
+        if normalize and weights:
+            total = sum(weights.values())
+            weights = {s: round(w * 100 / total, 4) for s, w in weights.items()}
+        self.name = name
+        self.weights = weights
+
+    @property
+    def symbols(self):
+        return list(self.weights)
+
+    def __contains__(self, symbol):
+        return symbol in self.weights
+
+    def to_dict(self):
+        return {'name': self.name, 'weights': self.weights}
+
+
+class SymbolRegistry:
+    """Reference-counted set of symbols subscribed by any basket"""
+
+    def __init__(self):
+        self._owners = {}
+        self._refcounts = {}
+        self._lock = threading.Lock()
+
+    def replace(self, owner, symbols):
+        """Set the full symbol list for one owner (basket key)"""
+        with self._lock:
+            old = self._owners.pop(owner, set())
+            new = set(symbols)
+            for symbol in old - new:
+                self._refcounts[symbol] -= 1
+                if self._refcounts[symbol] == 0:
+                    del self._refcounts[symbol]
+            for symbol in new - old:
+                self._refcounts[symbol] = self._refcounts.get(symbol, 0) + 1
+            if new:
+                self._owners[owner] = new
+
+    def remove(self, owner):
+        self.replace(owner, ())
+
+    def symbols(self):
+        """Unique symbols to fetch upstream this refresh"""
+        with self._lock:
+            return sorted(self._refcounts)
+
+    def subscribers(self, symbol):
+        with self._lock:
+            return self._refcounts.get(symbol, 0)
+
+
+class PriceTable:
+    """Latest row per symbol, shared by every view (rows are immutable records, stored as is)"""
+
+    def __init__(self):
+        self._rows = {}
+        self._updated_at = {}
+        self._lock = threading.Lock()
+
+    def update(self, rows):
+        now = time.time()
+        with self._lock:
+            for row in rows:
+                self._rows[row['symbol']] = row
+                self._updated_at[row['symbol']] = now
+
+    def get(self, symbol):
+        with self._lock:
+            return self._rows.get(symbol)
+
+    def rows(self, symbols):
+        with self._lock:
+            return {s: self._rows[s] for s in symbols if s in self._rows}
+
+    def updated_at(self, symbol):
+        return self._updated_at.get(symbol)
+
+
+class WatchlistManager:
+    """Per-user baskets backed by the shared registry, optionally persisted to JSON"""
+
+    def __init__(self, registry, is_known_symbol=None, path=None):
+        self.registry = registry
+        self.is_known_symbol = is_known_symbol or (lambda symbol: True)
+        self.path = path
+        self._users = {}
+        self._file_id = None
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _owner(user_id, name):
+        return f"user:{user_id}:{name}"
+
+    def get_watchlists(self, user_id):
+        self.reload()
+        with self._lock:
+            return dict(self._users.get(user_id, {}))
+
+    def set_watchlist(self, user_id, name, weights):
+        """Create or replace a watchlist; raises ValueError on bad input"""
+        basket = Basket(name, weights, normalize=True)
+        if not basket.weights:
+            raise ValueError("Watchlist needs at least one symbol with a positive weight")
+        if len(basket.weights) > MAX_SYMBOLS_PER_WATCHLIST:
+            raise ValueError(f"Watchlist is limited to {MAX_SYMBOLS_PER_WATCHLIST} symbols")
+        unknown = [s for s in basket.symbols if not self.is_known_symbol(s)]
+        if unknown:
+            raise ValueError(f"Unknown symbols: {', '.join(unknown)}")
+
+        with self._file_lock():
+            self.reload()
+            with self._lock:
+                user = self._users.setdefault(user_id, {})
+                if name not in user and len(user) >= MAX_WATCHLISTS_PER_USER:
+                    raise ValueError(f"Users are limited to {MAX_WATCHLISTS_PER_USER} watchlists")
+                user[name] = basket
+            self.registry.replace(self._owner(user_id, name), basket.symbols)
+            self.save()
+        logger.info(f"📋 Watchlist {user_id}/{name} set with {len(basket.weights)} symbols")
+        return basket
+
+    def delete_watchlist(self, user_id, name):
+        with self._file_lock():
+            self.reload()
+            with self._lock:
+                removed = self._users.get(user_id, {}).pop(name, None)
+            if removed is None:
+                return False
+            self.registry.remove(self._owner(user_id, name))
+            self.save()
+        return True
+
+    def build_view(self, user_id, price_table):
+        """Derive a user's rows from the shared price table (no upstream calls)"""
+        views = []
+        for name, basket in self.get_watchlists(user_id).items():
+            table_rows = price_table.rows(basket.symbols)
+            rows = [dict(table_rows[s], weight=w, updated_at=price_table.updated_at(s))
+                    for s, w in basket.weights.items() if s in table_rows]
+            views.append({
+                'name': name,
+                'rows': rows,
+                'missing': [s for s in basket.symbols if s not in table_rows]
+            })
+        return views
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize read-modify-write of the file across worker processes"""
+        if not self.path or fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stat(self):
+        # saves replace the file, so a new inode means another process wrote it
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def reload(self):
+        """Adopt the file if another process replaced it since this one last read or wrote it"""
+        if self.path and self._stat() != self._file_id:
+            self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        file_id = self._stat()
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load watchlists from {self.path}: {e}")
+            return
+        users = {}
+        for user_id, baskets in stored.items():
+            for name, weights in baskets.items():
+                try:
+                    users.setdefault(user_id, {})[name] = Basket(name, weights)
+                except ValueError as e:
+                    logger.warning(f"⚠️ Skipping stored watchlist {user_id}/{name}: {e}")
+        with self._lock:
+            previous, self._users, self._file_id = self._users, users, file_id
+        for user_id, baskets in previous.items():
+            for name in baskets:
+                if name not in users.get(user_id, {}):
+                    self.registry.remove(self._owner(user_id, name))
+        for user_id, baskets in users.items():
+            for name, basket in baskets.items():
+                self.registry.replace(self._owner(user_id, name), basket.symbols)
+        logger.info(f"📋 Loaded watchlists for {len(users)} users")
+
+    def save(self):
+        if not self.path:
+            return
+        # written under the lock through a temp file of its own, so concurrent saves cannot interleave
+        with self._lock:
+            stored = {u: {n: b.weights for n, b in baskets.items()} for u, baskets in self._users.items()}
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                                prefix='.watchlists-', suffix='.tmp')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(stored, f)
+                os.replace(tmp_path, self.path)
+                self._file_id = self._stat()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not save watchlists to {self.path}: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)